@@ -1,12 +1,107 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 import os
 
 class Settings(BaseModel):
     env: str = os.getenv("ENV", "dev")
     port: int = int(os.getenv("PORT", "8000"))
+    # procesos de uvicorn (scripts/serve.py) y hilos por proceso; 0 = núcleos / web_workers.
+    # Sin esto cada worker usa todos los núcleos en torch y OpenCV (ver scripts/sweep_threads.py)
+    web_workers: int = int(os.getenv("WEB_WORKERS", "1"))
+    torch_intra_threads: int = int(os.getenv("TORCH_INTRA_THREADS", "0"))
+    torch_interop_threads: int = int(os.getenv("TORCH_INTEROP_THREADS", "1"))
+    cv2_threads: int = int(os.getenv("CV2_THREADS", "0"))
+    # el proceso padre carga los modelos una vez y hace fork de los workers (páginas compartidas
+    # copy-on-write; ver scripts/serve.py y scripts/mem_report.py)
+    web_preload: bool = os.getenv("WEB_PRELOAD", "false").lower() in {"1", "true", "yes", "y"}
     database_url: str = os.getenv("DATABASE_URL", "sqlite:///./local.db")
     ocr_languages: list[str] = os.getenv("OCR_LANGUAGES", "es,en").split(",")
     upload_dir: str = os.getenv("UPLOAD_DIR", "./uploads")
     max_upload_mb: int = int(os.getenv("MAX_UPLOAD_MB", "15"))
+    # tope del cuerpo completo de un request /ocr* (batch incluido), se corta antes de parsear
+    max_request_mb: int = int(os.getenv("MAX_REQUEST_MB", "200"))
+    # corta las variantes en cuanto una supera este confidence_mean (0 = desactivado)
+    ocr_early_exit_conf: float = float(os.getenv("OCR_EARLY_EXIT_CONF", "0"))
+    # ordena las variantes según su tasa de victorias en requests anteriores
+    ocr_adaptive_order: bool = os.getenv("OCR_ADAPTIVE_ORDER", "true").lower() in {"1", "true", "yes", "y"}
+    # "sequential" (un solo reader) o "parallel" (pool de procesos con un reader cada uno)
+    ocr_exec_mode: str = os.getenv("OCR_EXEC_MODE", "sequential").lower()
+    ocr_pool_size: int = int(os.getenv("OCR_POOL_SIZE", str(min(4, os.cpu_count() or 1))))
+    # motor del Reader: "torch" (easyocr tal cual), "onnx" u "onnx-int8" (detector y reconocedor
+    # exportados una vez a ocr_onnx_dir y ejecutados con onnxruntime; ver scripts/compare_ocr_backends.py)
+    ocr_backend: str = os.getenv("OCR_BACKEND", "torch").lower()
+    ocr_onnx_dir: str = os.getenv("OCR_ONNX_DIR", "./models/onnx")
+    # estimación de inclinación: "hough" (método original) o "projection" (miniatura, rápido).
+    # projection queda opcional hasta que scripts/bench_deskew.py salga con código 0
+    deskew_method: str = os.getenv("DESKEW_METHOD", "hough").lower()
+    deskew_max_angle: float = float(os.getenv("DESKEW_MAX_ANGLE", "15"))
+    # diferencia aceptada entre ambos métodos en scripts/bench_deskew.py (por encima, el bench falla)
+    deskew_tolerance_deg: float = float(os.getenv("DESKEW_TOLERANCE_DEG", "1.0"))
+    # detecta cajas una vez sobre la imagen base y solo reconoce por variante
+    ocr_shared_detection: bool = os.getenv("OCR_SHARED_DETECTION", "true").lower() in {"1", "true", "yes", "y"}
+    # /ocr?mode=roi: detector YOLO de campos y margen (px) alrededor de cada recorte.
+    # Los pesos no están en el repo (runs/ solo guarda las métricas del entrenamiento): sin el
+    # archivo, mode=roi falla con FileNotFoundError y, con WARMUP_YOLO, /ready queda en 503
+    yolo_model_path: str = os.getenv("YOLO_MODEL_PATH", "runs/detect/train4/weights/best.pt")
+    yolo_conf: float = float(os.getenv("YOLO_CONF", "0.25"))
+    roi_pad_px: int = int(os.getenv("ROI_PAD_PX", "6"))
+    # carga y una inferencia de prueba al arrancar (en segundo plano); /ready responde 503 hasta terminar
+    warmup_enabled: bool = os.getenv("WARMUP_ENABLED", "true").lower() in {"1", "true", "yes", "y"}
+    # incluir el detector YOLO en el warm-up (activar si se usa mode=roi)
+    warmup_yolo: bool = os.getenv("WARMUP_YOLO", "false").lower() in {"1", "true", "yes", "y"}
+    # "torch" (pesos .pt) u "onnx" (se exporta una vez junto al .pt; requiere onnx y onnxruntime)
+    yolo_backend: str = os.getenv("YOLO_BACKEND", "torch").lower()
+    yolo_imgsz: int = int(os.getenv("YOLO_IMGSZ", "640"))
+    # imágenes por llamada al detector en /ocr/batch?mode=roi y batch_cli --mode roi
+    yolo_batch_size: int = int(os.getenv("YOLO_BATCH_SIZE", "8"))
+    # executor de los endpoints /ocr: hilos ejecutando + peticiones en espera antes de responder 429
+    ocr_workers: int = int(os.getenv("OCR_WORKERS", "2"))
+    ocr_queue_depth: int = int(os.getenv("OCR_QUEUE_DEPTH", "8"))
+    ocr_retry_after_s: int = int(os.getenv("OCR_RETRY_AFTER_S", "5"))
+    # workers en segundo plano para /ocr/jobs
+    job_workers: int = int(os.getenv("JOB_WORKERS", "1"))
+    job_poll_interval_s: float = float(os.getenv("JOB_POLL_INTERVAL_S", "2"))
+    # un job 'processing' sin heartbeat durante job_lease_s se considera abandonado (worker caído):
+    # vuelve a la cola, o queda 'failed' si ya se intentó job_max_attempts veces
+    job_lease_s: int = int(os.getenv("JOB_LEASE_S", "120"))
+    job_max_attempts: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    # caché por SHA-256 de la imagen (0 = sin límite de entradas / de edad)
+    ocr_cache_enabled: bool = os.getenv("OCR_CACHE_ENABLED", "true").lower() in {"1", "true", "yes", "y"}
+    ocr_cache_max_entries: int = int(os.getenv("OCR_CACHE_MAX_ENTRIES", "10000"))
+    ocr_cache_ttl_s: int = int(os.getenv("OCR_CACHE_TTL_S", str(7 * 24 * 3600)))
+    # la limpieza (vencidas + exceso de entradas) corre cada N guardados, no en cada uno
+    ocr_cache_evict_every: int = int(os.getenv("OCR_CACHE_EVICT_EVERY", "100"))
+    # near-duplicados por dHash: distancia de Hamming máxima (-1 = desactivado; como mucho
+    # DEDUP_MAX_INDEXED_DISTANCE). Tickets distintos del mismo formulario llegan a distancia <= 3,
+    # así que cada candidato se confirma comparando píxeles con la imagen guardada (máxima
+    # diferencia media por bloque, 0..1)
+    dedup_max_distance: int = int(os.getenv("DEDUP_MAX_DISTANCE", "-1"))
+    dedup_max_pixel_diff: float = float(os.getenv("DEDUP_MAX_PIXEL_DIFF", "0.15"))
+    dedup_candidates: int = int(os.getenv("DEDUP_CANDIDATES", "50"))
+    # archivos de /ocr/batch/stream procesándose a la vez
+    batch_concurrency: int = int(os.getenv("BATCH_CONCURRENCY", os.getenv("OCR_WORKERS", "2")))
+    # descargas por URL: cliente httpx compartido
+    fetch_timeout_s: float = float(os.getenv("FETCH_TIMEOUT_S", "20"))
+    fetch_max_connections: int = int(os.getenv("FETCH_MAX_CONNECTIONS", "20"))
+    fetch_concurrency: int = int(os.getenv("FETCH_CONCURRENCY", "8"))
+    # URLs por request en /ocr/by-url/batch
+    url_batch_max: int = int(os.getenv("URL_BATCH_MAX", "100"))
+    # escritor único con group commit para los documentos nuevos: un COMMIT (y un fsync) por lote,
+    # esperando como mucho max_delay_ms a que lleguen más (ver scripts/bench_db_writer.py)
+    db_group_commit: bool = os.getenv("DB_GROUP_COMMIT", "false").lower() in {"1", "true", "yes", "y"}
+    db_writer_max_batch: int = int(os.getenv("DB_WRITER_MAX_BATCH", "64"))
+    db_writer_max_delay_ms: float = float(os.getenv("DB_WRITER_MAX_DELAY_MS", "2"))
+
+    @model_validator(mode="after")
+    def _check_dedup_distance(self):
+        if self.dedup_max_distance > DEDUP_MAX_INDEXED_DISTANCE:
+            raise ValueError(
+                f"DEDUP_MAX_DISTANCE={self.dedup_max_distance}: el índice de image_hashes solo encuentra "
+                f"hashes a distancia <= {DEDUP_MAX_INDEXED_DISTANCE}"
+            )
+        return self
+
+# image_hashes parte el dHash en 4 bandas (services.dedupe.BANDS): dos hashes a distancia d
+# comparten una banda exacta solo si d < 4, más allá se pierden near-duplicados sin aviso
+DEDUP_MAX_INDEXED_DISTANCE = 3
 
 settings = Settings()
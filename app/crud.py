@@ -1,8 +1,22 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, update, delete, select, union_all, bindparam, text, and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload, load_only
+from sqlalchemy.sql import func
 from typing import List, Tuple, Optional
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
+import itertools, json, uuid
 from . import models
+from .utils.bbox import bbox_columns
+from .services.ticket_fields import extract_ticket_fields, ticket_columns, normalize_placa
 
-def create_document(db: Session, *, filename: str, content_type: str, size_bytes: int, storage_path: Optional[str], full_text: Optional[str], blocks: List[dict]) -> models.Document:
+def _ticket_columns(full_text: Optional[str], ticket: Optional[dict]) -> dict:
+    # ticket: campos ya extraídos por el llamador (evita parsear dos veces)
+    if ticket is None:
+        ticket = extract_ticket_fields(full_text)
+    return ticket_columns(ticket)
+
+def create_document(db: Session, *, filename: str, content_type: str, size_bytes: int, storage_path: Optional[str], full_text: Optional[str], blocks: List[dict], ticket: Optional[dict] = None) -> models.Document:
     doc = models.Document(
         filename=filename,
         content_type=content_type,
@@ -10,6 +24,7 @@ def create_document(db: Session, *, filename: str, content_type: str, size_bytes
         storage_path=storage_path,
         status="processed",
         full_text=full_text,
+        **_ticket_columns(full_text, ticket),
     )
     db.add(doc)
     db.flush()
@@ -18,17 +33,369 @@ def create_document(db: Session, *, filename: str, content_type: str, size_bytes
             document_id=doc.id,
             text=b.get("text"),
             confidence=b.get("confidence"),
-            bbox=None if b.get("bbox") is None else str(b.get("bbox"))
+            **bbox_columns(b.get("bbox")),
         ))
+    index_full_text(db, doc.id, full_text)
     db.commit()
     db.refresh(doc)
     return doc
 
+_DOCUMENTS = models.Document.__table__
+_OCR_BLOCKS = models.OcrBlock.__table__
+
+def insert_document(db: Session, *, filename: str, content_type: str, size_bytes: int, storage_path: Optional[str], full_text: Optional[str], blocks: List[dict], commit: bool = True, ticket: Optional[dict] = None) -> int:
+    # camino rápido: un INSERT para el documento y un executemany para todos sus bloques,
+    # sin instanciar objetos ORM ni recargar el documento; devuelve solo el id.
+    # Sobre la Table (no la entidad) y con parámetros aparte: el SQL compilado sale de la caché
+    doc_id = db.execute(insert(_DOCUMENTS), {
+        "filename": filename,
+        "content_type": content_type,
+        "size_bytes": size_bytes,
+        "storage_path": storage_path,
+        "status": "processed",
+        "full_text": full_text,
+        **_ticket_columns(full_text, ticket),
+    }).inserted_primary_key[0]
+    if blocks:
+        db.execute(insert(_OCR_BLOCKS), [
+            {
+                "document_id": doc_id,
+                "text": b.get("text"),
+                "confidence": b.get("confidence"),
+                **bbox_columns(b.get("bbox")),
+            }
+            for b in blocks
+        ])
+    index_full_text(db, doc_id, full_text)
+    if commit:
+        db.commit()
+    return doc_id
+
+# --- búsqueda de texto completo ---
+# El índice lo crea migrations.ensure_fulltext_index. En SQLite la tabla FTS5 es de contenido
+# externo y se alimenta aquí, en la misma transacción que el documento (los cambios y borrados
+# los propagan triggers); MySQL y Postgres mantienen su índice solos.
+
+def index_full_text(db: Session, doc_id: int, full_text: Optional[str]) -> None:
+    if not full_text or db.get_bind().dialect.name != "sqlite":
+        return
+    db.execute(
+        text("INSERT INTO documents_fts(rowid, full_text) VALUES (:id, :t)"),
+        {"id": doc_id, "t": full_text},
+    )
+
+def _fts_phrase(q: str) -> str:
+    # la consulta del usuario se trata como frase literal (sin operadores FTS5)
+    return '"' + q.replace('"', '""') + '"'
+
+def search_documents(db: Session, q: str, limit: int = 20, offset: int = 0) -> List[dict]:
+    """Documentos cuyo texto contiene q, ordenados por relevancia. Devuelve hasta limit+1 filas
+    para que el llamador sepa si hay otra página."""
+    dialect = db.get_bind().dialect.name
+    params = {"q": q, "n": limit + 1, "off": offset}
+    if dialect == "sqlite":
+        params["q"] = _fts_phrase(q)
+        sql = (
+            "SELECT d.id, d.filename, d.created_at, bm25(documents_fts) AS rank, "
+            "snippet(documents_fts, 0, '[', ']', '…', 12) AS snippet "
+            "FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid "
+            "WHERE documents_fts MATCH :q ORDER BY rank, d.id DESC LIMIT :n OFFSET :off"
+        )
+    elif dialect == "mysql":
+        params["q"] = _fts_phrase(q)
+        sql = (
+            "SELECT id, filename, created_at, "
+            "-MATCH(full_text) AGAINST (:q IN BOOLEAN MODE) AS rank, NULL AS snippet "
+            "FROM documents WHERE MATCH(full_text) AGAINST (:q IN BOOLEAN MODE) "
+            "ORDER BY rank, id DESC LIMIT :n OFFSET :off"
+        )
+    elif dialect == "postgresql":
+        # ILIKE usa el índice trigram (fragmentos de placa); ts_rank ordena por palabras
+        params["like"] = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        sql = (
+            "SELECT id, filename, created_at, "
+            "-ts_rank(to_tsvector('simple', coalesce(full_text, '')), plainto_tsquery('simple', :q)) AS rank, "
+            "NULL AS snippet FROM documents WHERE full_text ILIKE :like "
+            "ORDER BY rank, id DESC LIMIT :n OFFSET :off"
+        )
+    else:
+        raise ValueError(f"búsqueda no soportada para {dialect}")
+    rows = db.execute(text(sql), params).mappings().all()
+    return [dict(r) for r in rows]
+
 def get_document(db: Session, doc_id: int) -> Optional[models.Document]:
     return db.query(models.Document).filter(models.Document.id == doc_id).first()
 
-def list_documents(db: Session, skip: int = 0, limit: int = 50) -> Tuple[List[models.Document], int]:
-    q = db.query(models.Document).order_by(models.Document.id.desc())
-    total = q.count()
-    items = q.offset(skip).limit(limit).all()
-    return items, total
+def find_blocks_in_region(db: Session, document_id: int, x_min: float, y_min: float, x_max: float, y_max: float) -> List[models.OcrBlock]:
+    # bloques cuya caja intersecta el rectángulo pedido
+    B = models.OcrBlock
+    return (
+        db.query(B)
+        .filter(
+            B.document_id == document_id,
+            B.x_min <= x_max,
+            B.x_max >= x_min,
+            B.y_min <= y_max,
+            B.y_max >= y_min,
+        )
+        .order_by(B.y_min, B.x_min)
+        .all()
+    )
+
+def list_documents(
+    db: Session,
+    cursor: Optional[int] = None,
+    limit: int = 50,
+    with_blocks: bool = False,
+    total: str = "exact",
+    skip: int = 0,
+) -> Tuple[List[models.Document], int, Optional[int]]:
+    """Página por keyset sobre Document.id (descendente).
+
+    cursor: id del último documento de la página anterior. Devuelve (items, total, next_cursor);
+    total sale de un COUNT ("exact") o de las estadísticas del motor ("approx").
+    """
+    D = models.Document
+    q = db.query(D)
+    if cursor is not None:
+        q = q.filter(D.id < cursor)
+    q = q.order_by(D.id.desc())
+    if with_blocks:
+        # una sola consulta extra para los bloques de toda la página (sin N+1)
+        q = q.options(selectinload(D.blocks))
+    else:
+        q = q.options(load_only(D.id, D.filename, D.content_type, D.size_bytes, D.storage_path, D.status, D.created_at))
+    if skip:
+        # compatibilidad con clientes que aún paginan con skip
+        q = q.offset(skip)
+    items = q.limit(limit + 1).all()
+    next_cursor = items[limit - 1].id if len(items) > limit else None
+    items = items[:limit]
+
+    if total == "approx":
+        count = approx_document_count(db)
+    else:
+        count = db.query(func.count(D.id)).scalar()
+    return items, count, next_cursor
+
+def find_tickets(
+    db: Session,
+    *,
+    placa: Optional[str] = None,
+    ticket_num: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    cursor: Optional[int] = None,
+    limit: int = 50,
+) -> Tuple[List[models.Document], Optional[int]]:
+    """Filtra por los campos del ticket. Con placa y rango de fechas usa ix_documents_placa_ingreso;
+    solo fechas, ix_documents_ingreso_at; ticket_num, ix_documents_ticket_num."""
+    D = models.Document
+    q = db.query(D).options(load_only(
+        D.id, D.filename, D.created_at, D.ticket_num, D.placa, D.peso_neto_kg, D.ingreso_at, D.salida_at,
+    ))
+    if placa:
+        q = q.filter(D.placa == normalize_placa(placa))
+    if ticket_num:
+        q = q.filter(D.ticket_num == ticket_num.strip())
+    if desde is not None:
+        q = q.filter(D.ingreso_at >= desde)
+    if hasta is not None:
+        q = q.filter(D.ingreso_at < hasta)
+    if cursor is not None:
+        q = q.filter(D.id < cursor)
+    items = q.order_by(D.id.desc()).limit(limit + 1).all()
+    next_cursor = items[limit - 1].id if len(items) > limit else None
+    return items[:limit], next_cursor
+
+def approx_document_count(db: Session) -> int:
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        n = db.execute(text(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'documents'"
+        )).scalar()
+        return int(n or 0)
+    if dialect == "postgresql":
+        n = db.execute(text("SELECT reltuples::bigint FROM pg_class WHERE relname = 'documents'")).scalar()
+        return max(int(n or 0), 0)
+    # SQLite: MAX(id) sale directo del índice de la PK; exacto si no hubo borrados
+    return db.query(func.max(models.Document.id)).scalar() or 0
+
+def create_job(db: Session, *, filename: str, content_type: str, size_bytes: int, storage_path: str, job_id: Optional[str] = None) -> models.OcrJob:
+    job = models.OcrJob(
+        id=job_id or uuid.uuid4().hex,
+        status="queued",
+        filename=filename,
+        content_type=content_type,
+        size_bytes=size_bytes,
+        storage_path=storage_path,
+    )
+    db.add(job)
+    db.commit()
+    return job
+
+def get_job(db: Session, job_id: str) -> Optional[models.OcrJob]:
+    return db.query(models.OcrJob).filter(models.OcrJob.id == job_id).first()
+
+def claim_next_job(db: Session) -> Optional[models.OcrJob]:
+    # reclamo optimista: solo gana el worker cuyo UPDATE encuentra el job aún en 'queued'
+    while True:
+        job_id = (
+            db.query(models.OcrJob.id)
+            .filter(models.OcrJob.status == "queued")
+            .order_by(models.OcrJob.created_at, models.OcrJob.id)
+            .limit(1)
+            .scalar()
+        )
+        if job_id is None:
+            return None
+        res = db.execute(
+            update(models.OcrJob)
+            .where(models.OcrJob.id == job_id, models.OcrJob.status == "queued")
+            .values(status="processing", started_at=func.now(), heartbeat_at=_utcnow(),
+                    attempts=models.OcrJob.attempts + 1)
+        )
+        db.commit()
+        if res.rowcount == 1:
+            return get_job(db, job_id)
+
+def finish_job(db: Session, job_id: str, *, result: Optional[dict] = None, error: Optional[str] = None) -> None:
+    values = {"finished_at": func.now()}
+    if error is None:
+        values.update(
+            status="done",
+            result=json.dumps(result, ensure_ascii=False, default=str),
+            document_id=(result or {}).get("document_id"),
+            error=None,
+        )
+    else:
+        values.update(status="failed", error=error)
+    db.execute(update(models.OcrJob).where(models.OcrJob.id == job_id).values(**values))
+    db.commit()
+
+def heartbeat_jobs(db: Session, job_ids: List[str]) -> None:
+    # renueva el lease de los jobs que este proceso tiene en curso
+    if not job_ids:
+        return
+    db.execute(
+        update(models.OcrJob)
+        .where(models.OcrJob.id.in_(job_ids), models.OcrJob.status == "processing")
+        .values(heartbeat_at=_utcnow())
+    )
+    db.commit()
+
+def requeue_stale_jobs(db: Session, lease_s: float, max_attempts: int) -> Tuple[int, int]:
+    """Jobs 'processing' cuyo lease venció (su worker murió): a la cola, o 'failed' si agotaron
+    los intentos. Los que siguen con heartbeat (de este u otro proceso) no se tocan.
+
+    Devuelve (re-encolados, fallidos).
+    """
+    J = models.OcrJob
+    stale = and_(
+        J.status == "processing",
+        or_(J.heartbeat_at.is_(None), J.heartbeat_at < _utcnow() - timedelta(seconds=lease_s)),
+    )
+    failed = db.execute(
+        update(J)
+        .where(stale, J.attempts >= max_attempts)
+        .values(status="failed", finished_at=func.now(),
+                error=f"el worker se detuvo durante el proceso ({max_attempts} intentos)")
+    ).rowcount
+    requeued = db.execute(
+        update(J).where(stale).values(status="queued", started_at=None, heartbeat_at=None)
+    ).rowcount
+    db.commit()
+    return requeued, failed
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def get_cached_result(db: Session, sha256: str, max_age_s: int) -> Optional[dict]:
+    entry = db.get(models.OcrCacheEntry, sha256)
+    now = _utcnow()
+    if entry is None or (max_age_s > 0 and entry.created_at < now - timedelta(seconds=max_age_s)):
+        # el llamador sigue con el OCR: la transacción de esta lectura no debe quedar abierta
+        db.rollback()
+        return None
+    entry.hits += 1
+    entry.last_hit_at = now
+    db.commit()
+    return json.loads(entry.payload)
+
+# puts desde el arranque del proceso; evict_cache corre cada evict_every de ellos
+_cache_puts = itertools.count(1)
+
+def put_cached_result(db: Session, sha256: str, *, document_id: int, payload: dict, size_bytes: int, max_entries: int, max_age_s: int, evict_every: int = 100) -> None:
+    now = _utcnow()
+    db.merge(models.OcrCacheEntry(
+        sha256=sha256,
+        document_id=document_id,
+        payload=json.dumps(payload, ensure_ascii=False, default=str),
+        size_bytes=size_bytes,
+        hits=0,
+        created_at=now,
+        last_hit_at=now,
+    ))
+    try:
+        db.commit()
+    except IntegrityError:
+        # otro proceso guardó el mismo hash a la vez; nos quedamos con el suyo
+        db.rollback()
+        return
+    # el COUNT(*) de evict_cache no va en cada put: la tabla puede pasar max_entries en hasta
+    # evict_every filas y las vencidas ya no se sirven (get_cached_result mira la edad)
+    if evict_every <= 1 or next(_cache_puts) % evict_every == 0:
+        evict_cache(db, max_entries=max_entries, max_age_s=max_age_s)
+
+def evict_cache(db: Session, *, max_entries: int, max_age_s: int) -> int:
+    removed = 0
+    if max_age_s > 0:
+        cutoff = _utcnow() - timedelta(seconds=max_age_s)
+        removed += db.execute(
+            delete(models.OcrCacheEntry).where(models.OcrCacheEntry.created_at < cutoff)
+        ).rowcount
+    if max_entries > 0:
+        count = db.query(func.count(models.OcrCacheEntry.sha256)).scalar() or 0
+        if count > max_entries:
+            # LRU: fuera los que llevan más tiempo sin acierto
+            oldest = (
+                select(models.OcrCacheEntry.sha256)
+                .order_by(models.OcrCacheEntry.last_hit_at)
+                .limit(count - max_entries)
+            )
+            removed += db.execute(
+                delete(models.OcrCacheEntry).where(models.OcrCacheEntry.sha256.in_(list(db.scalars(oldest))))
+            ).rowcount
+    db.commit()
+    return removed
+
+def add_image_hash(db: Session, document_id: int, phash: int, bands: List[int], commit: bool = True) -> None:
+    db.merge(models.ImageHash(
+        document_id=document_id,
+        phash=phash,
+        band0=bands[0], band1=bands[1], band2=bands[2], band3=bands[3],
+    ))
+    if commit:
+        db.commit()
+
+@lru_cache(maxsize=8)
+def _hash_candidates_stmt(per_band: int):
+    # UNION ALL de una consulta por banda sobre (bandN, document_id): cada rama es
+    # un rango de índice acotado. Se construye una vez; solo cambian los parámetros
+    t = models.ImageHash.__table__
+    parts = [
+        select(t.c.document_id, t.c.phash)
+        .where(t.c[f"band{i}"] == bindparam(f"b{i}"))
+        .order_by(t.c.document_id.desc())
+        .limit(per_band)
+        .subquery()
+        .select()
+        for i in range(4)
+    ]
+    return union_all(*parts)
+
+def find_hash_candidates(db: Session, bands: List[int], per_band: int = 50) -> List[Tuple[int, int]]:
+    params = {f"b{i}": v for i, v in enumerate(bands)}
+    rows = db.execute(_hash_candidates_stmt(per_band), params)
+    return list({doc_id: phash for doc_id, phash in rows}.items())
@@ -1,17 +1,58 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 import os
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./local.db")
 is_sqlite = DATABASE_URL.startswith("sqlite")
-connect_args = {"check_same_thread": False} if is_sqlite else {}
 
-engine = create_engine(DATABASE_URL, echo=False, pool_pre_ping=True, connect_args=connect_args)
+# modo producción de SQLite: WAL (lectores no bloquean al escritor) y un fsync por checkpoint
+# en lugar de uno por commit; busy_timeout para esperar el lock en vez de fallar
+SQLITE_PRODUCTION = os.getenv(
+    "SQLITE_PRODUCTION", "true" if os.getenv("ENV", "dev") == "prod" else "false"
+).lower() in {"1", "true", "yes", "y"}
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    # NORMAL en WAL puede perder los últimos commits ante un corte de luz (no corrompe); FULL no
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": "5000",
+    "temp_store": "MEMORY",
+    "cache_size": "-65536",      # 64 MiB por conexión
+    "mmap_size": "268435456",    # 256 MiB
+    "wal_autocheckpoint": "1000",
+}
+
+def make_engine(url: str, sqlite_production: bool = False):
+    if not url.startswith("sqlite"):
+        return create_engine(url, echo=False, pool_pre_ping=True)
+    # el driver mantiene su modo por defecto: las lecturas no abren transacción (un SELECT antes
+    # del OCR no retiene el lock durante el proceso) y el BEGIN lo emite el primer INSERT/UPDATE.
+    # DbWriter abre la suya con BEGIN IMMEDIATE (ver db_writer._write)
+    engine = create_engine(url, echo=False, connect_args={"check_same_thread": False})
+    if sqlite_production:
+        @event.listens_for(engine, "connect")
+        def _set_pragmas(dbapi_conn, _record):
+            cur = dbapi_conn.cursor()
+            for name, value in SQLITE_PRAGMAS.items():
+                cur.execute(f"PRAGMA {name}={value}")
+            cur.close()
+    return engine
+
+engine = make_engine(DATABASE_URL, SQLITE_PRODUCTION)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
 class Base(DeclarativeBase):
     pass
 
+_initialized = False
+
 def init_db():
+    # una vez por proceso; con scripts/serve.py --preload corre en el padre y los workers
+    # heredan _initialized = True por el fork (no compiten por el CREATE TABLE / ALTER TABLE)
+    global _initialized
+    if _initialized:
+        return
     from . import models
+    from .migrations import run_migrations
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    _initialized = True
@@ -1,11 +1,19 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from .config import settings
+from .utils.upload_limit import BodySizeLimitMiddleware
 from .database import init_db
-from .routers.ocr import router as ocr_router
+from .routers.ocr import router as ocr_router, ocr_executor, job_workers, db_writer
+from .services.ocr_pool import shutdown_pool
+from .services.fetch import close_client
+from .services.runtime import configure_threads
+from .services.warmup import start_warmup, warmup_status
 
 app = FastAPI(title="OCR API (EasyOCR)", version="1.0.0")
 
+app.add_middleware(BodySizeLimitMiddleware, max_bytes=settings.max_request_mb * 1024 * 1024, path_prefix="/ocr")
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -16,10 +24,30 @@ app.add_middleware(
 
 @app.on_event("startup")
 def on_startup():
+    # antes de que el primer request cargue el Reader
+    configure_threads()
     init_db()
+    if settings.db_group_commit:
+        db_writer.start()
+    job_workers.start()
+    start_warmup()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    job_workers.stop(timeout=5)
+    ocr_executor.shutdown(wait=False)
+    db_writer.stop(timeout=5)
+    shutdown_pool()
+    await close_client()
 
 app.include_router(ocr_router)
 
 @app.get("/health")
 def health():
     return {"status": "ok", "env": settings.env, "port": settings.port, "version": "1.0.0"}
+
+@app.get("/ready")
+def ready():
+    # 200 solo con los modelos cargados y probados; el balanceador saca al worker mientras tanto
+    status = warmup_status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
@@ -0,0 +1,252 @@
+import logging
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from .utils.bbox import bbox_columns, parse_legacy_bbox
+
+log = logging.getLogger(__name__)
+
+# create_all solo crea tablas nuevas; los cambios sobre tablas existentes van aquí.
+# Cada paso es idempotente y se ejecuta en cada arranque (init_db).
+
+def _columns(engine: Engine, table: str) -> set[str]:
+    insp = inspect(engine)
+    if not insp.has_table(table):
+        return set()
+    return {c["name"] for c in insp.get_columns(table)}
+
+def _add_columns(engine: Engine, table: str, cols: dict[str, str]):
+    existing = _columns(engine, table)
+    with engine.begin() as conn:
+        for name, ddl_type in cols.items():
+            if name not in existing:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl_type}"))
+
+def _ensure_indexes(engine: Engine, table):
+    for idx in table.indexes:
+        idx.create(bind=engine, checkfirst=True)
+
+def migrate_block_bbox(engine: Engine) -> bool:
+    """Columnas x_min..y_max + bbox_poly en ocr_blocks (solo esquema).
+
+    Convertir el bbox de texto de las filas antiguas reescribe toda la tabla: no corre en init_db
+    sino con scripts/migrate_bbox.py (convert_legacy_bbox / drop_legacy_bbox). Devuelve True si
+    quedan filas por convertir.
+    """
+    from . import models
+
+    cols = _columns(engine, "ocr_blocks")
+    if not cols:
+        return False
+    blob_type = "BLOB" if engine.dialect.name in ("sqlite", "mysql") else "BYTEA"
+    _add_columns(engine, "ocr_blocks", {
+        "x_min": "FLOAT", "y_min": "FLOAT", "x_max": "FLOAT", "y_max": "FLOAT", "bbox_poly": blob_type,
+    })
+    _ensure_indexes(engine, models.OcrBlock.__table__)
+    if "bbox" not in cols:
+        return False
+    with engine.connect() as conn:
+        pending = conn.execute(text(
+            "SELECT 1 FROM ocr_blocks WHERE bbox IS NOT NULL AND bbox_poly IS NULL LIMIT 1"
+        )).first() is not None
+    if pending:
+        log.warning("ocr_blocks tiene bbox sin convertir: ejecutar scripts/migrate_bbox.py")
+    return pending
+
+def convert_legacy_bbox(engine: Engine, batch_size: int = 5000) -> tuple[int, list[int]]:
+    """ocr_blocks.bbox (str() del polígono) -> x_min..y_max + bbox_poly, por lotes de id.
+
+    No modifica la columna bbox: las filas que no se pueden parsear quedan como estaban y se
+    informan. Devuelve (convertidas, ids sin parsear).
+    """
+    if "bbox" not in _columns(engine, "ocr_blocks"):
+        return 0, []
+    converted = 0
+    unparseable: list[int] = []
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text(
+                    "SELECT id, bbox FROM ocr_blocks WHERE id > :last AND bbox IS NOT NULL "
+                    "AND bbox_poly IS NULL ORDER BY id LIMIT :n"
+                ),
+                {"last": last_id, "n": batch_size},
+            ).fetchall()
+            if not rows:
+                break
+            params = []
+            for block_id, legacy in rows:
+                poly = parse_legacy_bbox(legacy)
+                if poly is None:
+                    log.warning("ocr_blocks.id=%d: bbox sin parsear %r", block_id, legacy[:200])
+                    unparseable.append(block_id)
+                    continue
+                params.append({"id": block_id, **bbox_columns(poly)})
+            if params:
+                conn.execute(
+                    text(
+                        "UPDATE ocr_blocks SET x_min = :x_min, y_min = :y_min, x_max = :x_max, y_max = :y_max, "
+                        "bbox_poly = :bbox_poly WHERE id = :id"
+                    ),
+                    params,
+                )
+            last_id = rows[-1][0]
+            converted += len(params)
+    log.info("convertidos %d bbox de ocr_blocks (%d sin parsear)", converted, len(unparseable))
+    return converted, unparseable
+
+def drop_legacy_bbox(engine: Engine, force: bool = False, backup_table: str = "ocr_blocks_bbox_backup") -> bool:
+    """Elimina ocr_blocks.bbox después de verificar la conversión.
+
+    Sin force, se niega si queda alguna fila con bbox y sin bbox_poly. Antes de borrar copia
+    (id, bbox) a backup_table.
+    """
+    if "bbox" not in _columns(engine, "ocr_blocks"):
+        return False
+    with engine.begin() as conn:
+        pending = conn.execute(text(
+            "SELECT COUNT(*) FROM ocr_blocks WHERE bbox IS NOT NULL AND bbox_poly IS NULL"
+        )).scalar()
+        if pending and not force:
+            raise RuntimeError(f"{pending} filas de ocr_blocks con bbox sin convertir; revisar o usar force")
+        if not inspect(conn).has_table(backup_table):
+            conn.execute(text(
+                f"CREATE TABLE {backup_table} AS SELECT id, bbox FROM ocr_blocks WHERE bbox IS NOT NULL"
+            ))
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE ocr_blocks DROP COLUMN bbox"))
+    log.info("eliminada ocr_blocks.bbox (copia en %s)", backup_table)
+    return True
+
+def migrate_ticket_fields(engine: Engine, batch_size: int = 2000) -> int:
+    """Columnas de campos del ticket en documents + backfill desde full_text.
+
+    Reprocesa también los documentos parseados con una TICKET_FIELDS_VERSION anterior.
+    """
+    from . import models
+    from .services.ticket_fields import extract_ticket_fields, ticket_columns, TICKET_FIELDS_VERSION
+
+    if not _columns(engine, "documents"):
+        return 0
+    _add_columns(engine, "documents", {
+        "ticket_num": "VARCHAR(50)", "placa": "VARCHAR(20)", "peso_neto_kg": "BIGINT",
+        "ingreso_at": "TIMESTAMP" if engine.dialect.name == "postgresql" else "DATETIME",
+        "salida_at": "TIMESTAMP" if engine.dialect.name == "postgresql" else "DATETIME",
+        "fields_version": "SMALLINT",
+    })
+    _ensure_indexes(engine, models.Document.__table__)
+
+    updated = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text(
+                    "SELECT id, full_text FROM documents WHERE id > :last "
+                    "AND (fields_version IS NULL OR fields_version < :v) ORDER BY id LIMIT :n"
+                ),
+                {"last": last_id, "v": TICKET_FIELDS_VERSION, "n": batch_size},
+            ).fetchall()
+            if not rows:
+                break
+            params = [{"id": doc_id, **ticket_columns(extract_ticket_fields(full_text))} for doc_id, full_text in rows]
+            conn.execute(
+                text(
+                    "UPDATE documents SET ticket_num = :ticket_num, placa = :placa, peso_neto_kg = :peso_neto_kg, "
+                    "ingreso_at = :ingreso_at, salida_at = :salida_at, fields_version = :fields_version WHERE id = :id"
+                ),
+                params,
+            )
+            last_id = rows[-1][0]
+            updated += len(params)
+    if updated:
+        log.info("campos de ticket extraídos para %d documentos", updated)
+    return updated
+
+def _sqlite_has_trigram(conn) -> bool:
+    # el tokenizer trigram existe desde SQLite 3.34
+    try:
+        conn.execute(text("CREATE VIRTUAL TABLE temp._fts_probe USING fts5(x, tokenize='trigram')"))
+        conn.execute(text("DROP TABLE temp._fts_probe"))
+        return True
+    except Exception:
+        return False
+
+# documents_fts es de contenido externo: al cambiar o borrar un documento hay que sacar del índice
+# el texto viejo con el comando 'delete' (y los mismos valores que se indexaron). crud solo
+# indexa textos no vacíos, así que solo esos se sacan
+_SQLITE_FTS_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS documents_fts_ad AFTER DELETE ON documents BEGIN "
+    "INSERT INTO documents_fts(documents_fts, rowid, full_text) "
+    "SELECT 'delete', old.id, old.full_text WHERE old.full_text <> ''; END",
+    "CREATE TRIGGER IF NOT EXISTS documents_fts_au AFTER UPDATE OF full_text ON documents BEGIN "
+    "INSERT INTO documents_fts(documents_fts, rowid, full_text) "
+    "SELECT 'delete', old.id, old.full_text WHERE old.full_text <> ''; "
+    "INSERT INTO documents_fts(rowid, full_text) SELECT new.id, new.full_text WHERE new.full_text <> ''; END",
+)
+
+def ensure_fulltext_index(engine: Engine) -> bool:
+    """Índice de texto completo sobre documents.full_text; True si se creó en esta llamada.
+
+    SQLite: tabla FTS5 de contenido externo (documents_fts); crud la alimenta al insertar y los
+    triggers la mantienen al actualizar o borrar.
+    MySQL: índice FULLTEXT (ngram). Postgres: GIN sobre to_tsvector + GIN trigram para fragmentos.
+    """
+    dialect = engine.dialect.name
+    insp = inspect(engine)
+    if dialect == "sqlite":
+        created = not insp.has_table("documents_fts")
+        with engine.begin() as conn:
+            if created:
+                tokenize = "trigram" if _sqlite_has_trigram(conn) else "unicode61 remove_diacritics 2"
+                conn.execute(text(
+                    "CREATE VIRTUAL TABLE documents_fts USING fts5("
+                    f"full_text, content='documents', content_rowid='id', tokenize='{tokenize}')"
+                ))
+                # indexa lo que ya hubiera en documents
+                conn.execute(text("INSERT INTO documents_fts(documents_fts) VALUES ('rebuild')"))
+                log.info("creado documents_fts (tokenize=%s)", tokenize)
+            # también en bases donde documents_fts ya existía sin triggers
+            for ddl in _SQLITE_FTS_TRIGGERS:
+                conn.execute(text(ddl))
+        return created
+    if dialect == "mysql":
+        if any(i["name"] == "ft_documents_full_text" for i in insp.get_indexes("documents")):
+            return False
+        with engine.begin() as conn:
+            # parser ngram para que coincidan fragmentos (placas parciales), no solo palabras
+            conn.execute(text(
+                "ALTER TABLE documents ADD FULLTEXT INDEX ft_documents_full_text (full_text) WITH PARSER ngram"
+            ))
+        return True
+    if dialect == "postgresql":
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_documents_full_text_tsv ON documents "
+                "USING GIN (to_tsvector('simple', coalesce(full_text, '')))"
+            ))
+        try:
+            with engine.begin() as conn:
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                conn.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_documents_full_text_trgm ON documents "
+                    "USING GIN (full_text gin_trgm_ops)"
+                ))
+        except Exception as e:
+            # sin permisos para la extensión: queda solo la búsqueda por palabras
+            log.warning("no se pudo crear el índice trigram: %s", e)
+        return True
+    return False
+
+def migrate_ocr_jobs(engine: Engine):
+    if _columns(engine, "ocr_jobs"):
+        _add_columns(engine, "ocr_jobs", {
+            "heartbeat_at": "TIMESTAMP" if engine.dialect.name == "postgresql" else "DATETIME",
+        })
+
+def run_migrations(engine: Engine):
+    migrate_ocr_jobs(engine)
+    migrate_block_bbox(engine)
+    migrate_ticket_fields(engine)
+    ensure_fulltext_index(engine)
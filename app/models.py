@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Float
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Text, ForeignKey, Float, Index, LargeBinary, SmallInteger
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from .database import Base
+from .utils.bbox import unpack_poly
 
 class Document(Base):
     __tablename__ = "documents"
@@ -13,7 +14,15 @@ class Document(Base):
     status = Column(String(50), default="processed", nullable=False)
     full_text = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # campos del ticket (services.ticket_fields); fields_version NULL = aún sin parsear
+    ticket_num = Column(String(50), nullable=True, index=True)
+    placa = Column(String(20), nullable=True)
+    peso_neto_kg = Column(BigInteger, nullable=True)
+    ingreso_at = Column(DateTime, nullable=True, index=True)
+    salida_at = Column(DateTime, nullable=True)
+    fields_version = Column(SmallInteger, nullable=True)
     blocks = relationship("OcrBlock", back_populates="document", cascade="all, delete-orphan")
+    __table_args__ = (Index("ix_documents_placa_ingreso", "placa", "ingreso_at"),)
 
 class OcrBlock(Base):
     __tablename__ = "ocr_blocks"
@@ -21,5 +30,62 @@ class OcrBlock(Base):
     document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), index=True, nullable=False)
     text = Column(Text, nullable=True)
     confidence = Column(Float, nullable=True)
-    bbox = Column(Text, nullable=True)
+    # caja envolvente como columnas numéricas (consultas espaciales) + polígono empaquetado
+    x_min = Column(Float, nullable=True)
+    y_min = Column(Float, nullable=True)
+    x_max = Column(Float, nullable=True)
+    y_max = Column(Float, nullable=True)
+    bbox_poly = Column(LargeBinary, nullable=True)  # float32 LE x,y por vértice (32 bytes)
     document = relationship("Document", back_populates="blocks")
+    __table_args__ = (Index("ix_ocr_blocks_doc_xy", "document_id", "x_min", "y_min"),)
+
+    @property
+    def bbox(self):
+        return unpack_poly(self.bbox_poly)
+
+class OcrJob(Base):
+    __tablename__ = "ocr_jobs"
+    id = Column(String(32), primary_key=True)
+    status = Column(String(20), default="queued", nullable=False)  # queued | processing | done | failed
+    filename = Column(String(255), nullable=False)
+    content_type = Column(String(100), nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    storage_path = Column(String(500), nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="SET NULL"), nullable=True)
+    result = Column(Text, nullable=True)  # JSON con el mismo payload que devuelve /ocr
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    # lease del worker que lo procesa; UTC escrito desde Python (se compara igual en cualquier backend)
+    heartbeat_at = Column(DateTime, nullable=True)
+    __table_args__ = (Index("ix_ocr_jobs_status_created", "status", "created_at"),)
+
+class OcrCacheEntry(Base):
+    __tablename__ = "ocr_cache"
+    sha256 = Column(String(64), primary_key=True)
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
+    payload = Column(Text, nullable=False)  # JSON de la respuesta de /ocr
+    size_bytes = Column(Integer, nullable=False)
+    hits = Column(Integer, default=0, nullable=False)
+    # UTC escrito desde Python para poder comparar igual en cualquier backend
+    created_at = Column(DateTime, nullable=False, index=True)
+    last_hit_at = Column(DateTime, nullable=False, index=True)
+
+class ImageHash(Base):
+    # dHash de 64 bits partido en 4 bandas de 16: dos hashes a distancia <= 3
+    # comparten al menos una banda exacta, así la búsqueda va por índice
+    __tablename__ = "image_hashes"
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True)
+    phash = Column(BigInteger, nullable=False)  # con signo, cabe en BIGINT
+    band0 = Column(Integer, nullable=False)
+    band1 = Column(Integer, nullable=False)
+    band2 = Column(Integer, nullable=False)
+    band3 = Column(Integer, nullable=False)
+    __table_args__ = (
+        Index("ix_image_hashes_band0", "band0", "document_id"),
+        Index("ix_image_hashes_band1", "band1", "document_id"),
+        Index("ix_image_hashes_band2", "band2", "document_id"),
+        Index("ix_image_hashes_band3", "band3", "document_id"),
+    )
@@ -1,56 +1,50 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Literal
 from datetime import datetime
-import os, time, httpx, re
+import os, time, json, uuid, hashlib, asyncio, logging
 
 from ..database import SessionLocal
 from ..config import settings
-from ..utils.storage import save_bytes
-from ..services.ocr_run import run_ocr
-from ..services.parse_ticket import parse_ticket_text
+from ..utils.storage import save_bytes, save_file, discard, SpooledFile, UploadTooLarge
+from ..utils.multipart_spool import spool_multipart, discard_parts, MultipartError
+from ..utils.workqueue import BoundedExecutor, QueueFullError
+from ..utils.singleflight import SingleFlight
+from ..services.job_worker import JobWorkers
+from ..services.db_writer import DbWriter
+from ..services.fetch import download_to_spool, filename_from_url, DownloadError
+from ..services.ocr_run import run_ocr, run_ocr_roi, detect_fields_batch
+from ..services.ticket_fields import extract_ticket_fields
+from ..services.dedupe import image_dhash, find_near_duplicate, index_document
 from .. import crud
 from .. import schemas
 
-def _kg_to_int_str(s: str | None) -> str | None:
-    if not s:
-        return None
-    digits = re.sub(r"\D", "", s)
-    return str(int(digits)) if digits else None
-
-def _combine_date_time(date_str: str | None, time_str: str | None) -> str | None:
-    """
-    date_str: 'dd/mm/yyyy'
-    time_str: 'HH:MM' ó 'HH:MM a.m/p.m'
-    return:  'dd-mm-yyyy HH:MM:00' (24h)
-    """
-    if not date_str or not time_str:
-        return None
-
-    # normaliza fecha a 'dd-mm-yyyy'
-    ds = date_str.strip().replace("/", "-")
-
-    # extrae hora y posible am/pm
-    m = re.match(r"^\s*(\d{2}):(\d{2})(?:\s*([ap])\.?\s*m\.?)?\s*$", time_str, re.IGNORECASE)
-    if not m:
-        return None
-    hh = int(m.group(1)); mm = int(m.group(2))
-    ap = (m.group(3) or "").lower()
-
-    # convierte a 24h si hay am/pm
-    if ap == "p" and hh < 12:
-        hh += 12
-    if ap == "a" and hh == 12:
-        hh = 0
+router = APIRouter()
+log = logging.getLogger(__name__)
 
-    return f"{ds} {hh:02d}:{mm:02d}:00"
+# OCR, disco y BD corren fuera del event loop, con cola acotada
+ocr_executor = BoundedExecutor(settings.ocr_workers, settings.ocr_queue_depth)
+db_writer = DbWriter(settings.db_writer_max_batch, settings.db_writer_max_delay_ms)
 
-router = APIRouter()
+async def _run_blocking(fn, *args):
+    try:
+        return await ocr_executor.run(fn, *args)
+    except QueueFullError:
+        raise HTTPException(
+            status_code=429,
+            detail="Servidor ocupado, reintente más tarde",
+            headers={"Retry-After": str(settings.ocr_retry_after_s)},
+        )
 
 class UrlIn(BaseModel):
     url: str
 
+class UrlBatchIn(BaseModel):
+    urls: List[str]
+
 class IdIn(BaseModel):
     image_id: str
 
@@ -61,88 +55,351 @@ def get_db():
     finally:
         db.close()
 
-def _process(image_bytes: bytes, filename: str, content_type: str, db: Session):
+def _validate_upload(image_bytes: bytes, content_type: str):
     if not content_type or not content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="Tipo no válido")
     if len(image_bytes) > settings.max_upload_mb * 1024 * 1024:
         raise HTTPException(status_code=413, detail="Archivo demasiado grande")
+
+# uploads idénticos simultáneos comparten un único cálculo
+_inflight = SingleFlight()
+
+def _process(image_bytes: bytes, filename: str, content_type: str, db: Session, storage_path: str | None = None,
+             digest: str | None = None, spool_path: str | None = None, mode: str = "full", regions: list | None = None):
+    _validate_upload(image_bytes, content_type)
     t0 = time.perf_counter()
-    ocr = run_ocr(image_bytes)
-    storage_path = save_bytes(settings.upload_dir, filename, image_bytes)
-    doc = crud.create_document(
-        db,
-        filename=filename,
-        content_type=content_type,
-        size_bytes=len(image_bytes),
-        storage_path=storage_path,
-        full_text=ocr.get("full_text"),
-        blocks=ocr.get("blocks", []),
-    )
-    parsed = parse_ticket_text(ocr.get("full_text") or "")
+    if digest is None:
+        digest = hashlib.sha256(image_bytes).hexdigest()
+    # cada modo tiene su propia entrada de caché (misma longitud que un sha256)
+    cache_key = digest if mode == "full" else hashlib.sha256(f"{digest}:{mode}".encode()).hexdigest()
+
+    def _lookup_or_compute():
+        if settings.ocr_cache_enabled:
+            hit = crud.get_cached_result(db, cache_key, settings.ocr_cache_ttl_s)
+            if hit is not None:
+                return hit, "hit"
+        payload = _ocr_and_store(image_bytes, filename, content_type, db, storage_path, spool_path, mode, regions)
+        if settings.ocr_cache_enabled:
+            crud.put_cached_result(
+                db,
+                cache_key,
+                document_id=payload["document_id"],
+                payload=payload,
+                size_bytes=len(image_bytes),
+                max_entries=settings.ocr_cache_max_entries,
+                max_age_s=settings.ocr_cache_ttl_s,
+                evict_every=settings.ocr_cache_evict_every,
+            )
+        return payload, "miss"
+
+    (payload, cache_status), shared = _inflight.do(cache_key, _lookup_or_compute)
+    # copia: los hilos que esperaron comparten el mismo dict
+    out = dict(payload)
+    out["debug"] = dict(payload.get("debug") or {})
+    out["debug"]["cache"] = "coalesced" if shared else cache_status
+    out["debug"]["sha256"] = digest
+    if shared or cache_status == "hit":
+        out["processing_time_ms"] = int((time.perf_counter() - t0) * 1000)
+    return out
+
+def _ocr_and_store(image_bytes: bytes, filename: str, content_type: str, db: Session, storage_path: str | None = None,
+                   spool_path: str | None = None, mode: str = "full", regions: list | None = None):
+    t0 = time.perf_counter()
+    phash = None
+    if settings.dedup_max_distance >= 0:
+        phash = image_dhash(image_bytes)
+        dup = find_near_duplicate(db, phash, settings.dedup_max_distance, settings.dedup_candidates,
+                                  image_bytes=image_bytes, max_pixel_diff=settings.dedup_max_pixel_diff)
+        if dup is not None:
+            doc, dist = dup
+            return _build_payload(doc.id, doc.full_text, {"duplicate": True, "hamming_distance": dist}, t0, duplicate_of=doc.id)
+    # ninguna transacción de lectura (caché, dedup) queda abierta durante el OCR
+    db.rollback()
+    if mode == "roi":
+        # recortes de campos -> parser; página completa solo si falta algún campo
+        ocr = run_ocr_roi(image_bytes, regions=regions)
+        fields = ocr["fields"]
+    else:
+        ocr = run_ocr(image_bytes)
+        fields = extract_ticket_fields(ocr.get("full_text"))
+    if storage_path is None:
+        if spool_path is not None:
+            storage_path = save_file(settings.upload_dir, filename, spool_path)
+        else:
+            storage_path = save_bytes(settings.upload_dir, filename, image_bytes)
 
-    ##from ..utils.textnorm import normalize_weight_to_intkg
-    from ..utils.dates import format_ddmmyyyy, format_time_pmam
+    def store(wdb: Session) -> int:
+        doc_id = crud.insert_document(
+            wdb,
+            filename=filename,
+            content_type=content_type,
+            size_bytes=len(image_bytes),
+            storage_path=storage_path,
+            full_text=ocr.get("full_text"),
+            blocks=ocr.get("blocks", []),
+            ticket=fields,
+            commit=False,
+        )
+        index_document(wdb, doc_id, phash, commit=False)
+        return doc_id
 
-    peso_fmt = _kg_to_int_str(parsed.get("peso_neto"))
-    ingreso_fecha_fmt = format_ddmmyyyy(parsed.get("ingreso_fecha"))
-    salida_fecha_fmt = format_ddmmyyyy(parsed.get("salida_fecha"))
-    ingreso_hora_fmt = format_time_pmam(parsed.get("ingreso_hora"))
-    salida_hora_fmt = format_time_pmam(parsed.get("salida_hora"))
+    if settings.db_group_commit:
+        # el hilo escritor agrupa este INSERT con los de otros requests en un solo COMMIT
+        doc_id = db_writer.run(store)
+    else:
+        doc_id = store(db)
+        db.commit()
+    debug = {
+        "best_preset": ocr.get("best_preset"),
+        "rotation_deg": ocr.get("rotation_deg"),
+        "confidence_mean": ocr.get("confidence_mean"),
+        "variant_metrics": ocr.get("variant_metrics"),
+        "exec_mode": ocr.get("exec_mode"),
+        "detect_ms": ocr.get("detect_ms"),
+        "wall_time_ms": ocr.get("wall_time_ms"),
+        "variant_time_ms_total": ocr.get("variant_time_ms_total"),
+    }
+    if mode == "roi":
+        debug["roi_missing"] = ocr.get("roi_missing")
+        debug["roi_fallback"] = ocr.get("roi_fallback")
+        debug["roi_ocr_ms"] = ocr.get("roi_ocr_ms")
+    return _build_payload(doc_id, ocr.get("full_text"), debug, t0, fields=fields)
 
-    ingreso_fecha_hora = _combine_date_time(ingreso_fecha_fmt, ingreso_hora_fmt)
-    salida_fecha_hora  = _combine_date_time(salida_fecha_fmt,  salida_hora_fmt)
+def _build_payload(document_id: int, full_text: str | None, debug: dict, t0: float, duplicate_of: int | None = None,
+                   fields: dict | None = None):
+    if fields is None:
+        fields = extract_ticket_fields(full_text)
 
     elapsed_ms = int((time.perf_counter() - t0) * 1000)
-    return {
-        "document_id": doc.id,
-        "ticket_num": parsed.get("ticket_num"),
-        "placa": parsed.get("placa"),
-        "peso_neto": peso_fmt,  # <-- sin 'Kg'
-        "ingreso_fecha_hora": ingreso_fecha_hora,  # <-- nuevo campo combinado
-        "salida_fecha_hora":  salida_fecha_hora,   # <-- nuevo campo combinado
+    payload = {
+        "document_id": document_id,
+        **fields,
         "processing_time_ms": elapsed_ms,
-        "debug": {
-            "best_preset": ocr.get("best_preset"),
-            "rotation_deg": ocr.get("rotation_deg"),
-            "confidence_mean": ocr.get("confidence_mean"),
-            "variant_metrics": ocr.get("variant_metrics"),
-        },
+        "debug": debug,
     }
+    if duplicate_of is not None:
+        payload["duplicate_of"] = duplicate_of
+    return payload
+
 
+def _upload_body(field: str, many: bool) -> dict:
+    # el cuerpo se parsea a mano (_spool_form): se describe aquí para /docs
+    binary = {"type": "string", "format": "binary"}
+    schema = {"type": "array", "items": binary} if many else binary
+    return {"requestBody": {"required": True, "content": {"multipart/form-data": {
+        "schema": {"type": "object", "required": [field], "properties": {field: schema}},
+    }}}}
 
-@router.post("/ocr")
-async def ocr_single(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    raw = await file.read()
-    return _process(raw, file.filename, file.content_type or "image/unknown", db)
+async def _spool_form(request: Request, field: str) -> list:
+    """Archivos del campo `field` -> [(SpooledFile | HTTPException 413, filename, content_type)].
+
+    Cada archivo se escribe a upload_dir mientras llega el cuerpo, con hash y corte por
+    MAX_UPLOAD_MB en ese momento (no después de recibir todo el request).
+    """
+    try:
+        parts = await spool_multipart(request.headers, request.stream(), settings.upload_dir,
+                                      settings.max_upload_mb * 1024 * 1024)
+    except MultipartError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    uploads = []
+    for part in parts:
+        if part.field != field:
+            discard_parts([part])
+            continue
+        spool = part.spool or HTTPException(status_code=413, detail="Archivo demasiado grande")
+        uploads.append((spool, part.filename, part.content_type or "image/unknown"))
+    if not uploads:
+        raise HTTPException(status_code=422, detail=f"Falta el archivo en el campo '{field}'")
+    return uploads
+
+async def _spool_one(request: Request) -> tuple[SpooledFile, str, str]:
+    uploads = await _spool_form(request, "file")
+    for spool, _, _ in uploads[1:]:
+        if isinstance(spool, SpooledFile):
+            discard(spool.path)
+    spool, filename, content_type = uploads[0]
+    if isinstance(spool, HTTPException):
+        raise spool
+    return spool, filename, content_type
+
+def _process_spooled(spool: SpooledFile, filename: str, content_type: str, db: Session, mode: str = "full",
+                     regions: list | None = None):
+    try:
+        # imdecode trabaja sobre un buffer: el archivo (<= MAX_UPLOAD_MB) se lee entero una vez
+        with open(spool.path, "rb") as f:
+            raw = f.read()
+        return _process(raw, filename, content_type, db, digest=spool.sha256, spool_path=spool.path, mode=mode,
+                        regions=regions)
+    finally:
+        # si el documento se guardó, el spool ya se renombró; si no (caché, duplicado, error), se borra
+        discard(spool.path)
+
+async def _run_spooled(spool: SpooledFile, fn, *args):
+    try:
+        return await _run_blocking(fn, spool, *args)
+    except HTTPException:
+        discard(spool.path)
+        raise
+
+@router.post("/ocr", openapi_extra=_upload_body("file", many=False))
+async def ocr_single(
+    request: Request,
+    mode: Literal["full", "roi"] = Query("full", description="roi: OCR solo de los campos detectados por YOLO"),
+    db: Session = Depends(get_db),
+):
+    spool, filename, content_type = await _spool_one(request)
+    return await _run_spooled(spool, _process_spooled, filename, content_type, db, mode)
+
+def _detect_spooled(spools: List[SpooledFile]) -> dict:
+    # una sola inferencia YOLO para todo el lote; path del spool -> regiones
+    raws = []
+    for spool in spools:
+        with open(spool.path, "rb") as f:
+            raws.append(f.read())
+    return {spool.path: regions for spool, regions in zip(spools, detect_fields_batch(raws))}
+
+@router.post("/ocr/batch", openapi_extra=_upload_body("files", many=True))
+async def ocr_batch(
+    request: Request,
+    mode: Literal["full", "roi"] = Query("full", description="roi: OCR solo de los campos detectados por YOLO"),
+    db: Session = Depends(get_db),
+):
+    uploads = await _spool_form(request, "files")
 
-@router.post("/ocr/batch")
-async def ocr_batch(files: List[UploadFile] = File(...), db: Session = Depends(get_db)):
     items = []
     succeeded = 0
     failed = 0
-    for f in files:
+    busy = None  # primer 429: lo que queda del lote se reporta fallido, lo ya procesado se conserva
+    # en modo roi se detecta de a yolo_batch_size imágenes y luego se procesa ese tramo
+    step = max(1, settings.yolo_batch_size) if mode == "roi" else max(1, len(uploads))
+    for start in range(0, len(uploads), step):
+        chunk = uploads[start:start + step]
+        regions = {}
+        if mode == "roi" and busy is None:
+            spools = [s for s, _, _ in chunk if isinstance(s, SpooledFile)]
+            try:
+                regions = await _run_blocking(_detect_spooled, spools) if spools else {}
+            except HTTPException as e:
+                busy = e
+            except Exception:
+                # sin detección por lote, cada archivo detecta por su cuenta (regions=None)
+                log.exception("falló la detección YOLO del lote; se detecta por archivo")
+        for spool, filename, content_type in chunk:
+            try:
+                if isinstance(spool, HTTPException):
+                    raise spool
+                if busy is not None:
+                    discard(spool.path)
+                    raise busy
+                res = await _run_spooled(spool, _process_spooled, filename, content_type, db, mode,
+                                         regions.get(spool.path))
+                items.append({"filename": filename, "success": True, "result": res})
+                succeeded += 1
+            except HTTPException as e:
+                if e.status_code == 429:
+                    busy = e
+                items.append({"filename": filename, "success": False, "error": e.detail})
+                failed += 1
+            except Exception as e:
+                items.append({"filename": filename, "success": False, "error": str(e)})
+                failed += 1
+    return {"items": items, "total": len(items), "succeeded": succeeded, "failed": failed}
+
+def _process_own_session(spool: SpooledFile, filename: str, content_type: str):
+    # cada item concurrente necesita su propia Session (no son thread-safe)
+    db = SessionLocal()
+    try:
+        return _process_spooled(spool, filename, content_type, db)
+    finally:
+        db.close()
+
+async def _batch_item(spool: SpooledFile | HTTPException, filename: str, content_type: str, sem: asyncio.Semaphore):
+    async with sem:
         try:
-            raw = await f.read()
-            res = _process(raw, f.filename, f.content_type or "image/unknown", db)
-            items.append({"filename": f.filename, "success": True, "result": res})
-            succeeded += 1
+            if isinstance(spool, HTTPException):
+                raise spool
+            res = await _run_spooled(spool, _process_own_session, filename, content_type)
+            return {"filename": filename, "success": True, "result": res}
         except HTTPException as e:
-            items.append({"filename": f.filename, "success": False, "error": e.detail})
-            failed += 1
+            return {"filename": filename, "success": False, "error": e.detail}
         except Exception as e:
-            items.append({"filename": f.filename, "success": False, "error": str(e)})
-            failed += 1
-    return {"items": items, "total": len(items), "succeeded": succeeded, "failed": failed}
+            return {"filename": filename, "success": False, "error": str(e)}
+
+@router.post("/ocr/batch/stream", openapi_extra=_upload_body("files", many=True))
+async def ocr_batch_stream(request: Request):
+    # se pasa todo a disco antes de responder: el cuerpo ya no se puede leer desde el generador
+    uploads = await _spool_form(request, "files")
+    sem = asyncio.Semaphore(max(1, settings.batch_concurrency))
+
+    async def _lines():
+        tasks = [asyncio.create_task(_batch_item(spool, name, ct, sem)) for spool, name, ct in uploads]
+        succeeded = 0
+        failed = 0
+        try:
+            for fut in asyncio.as_completed(tasks):
+                item = await fut
+                if item["success"]:
+                    succeeded += 1
+                else:
+                    failed += 1
+                yield json.dumps(item, ensure_ascii=False, default=str) + "\n"
+        finally:
+            for t in tasks:
+                t.cancel()
+            for spool, _, _ in uploads:
+                if isinstance(spool, SpooledFile):
+                    discard(spool.path)
+        summary = {"summary": True, "total": succeeded + failed, "succeeded": succeeded, "failed": failed}
+        yield json.dumps(summary) + "\n"
+
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
+
+async def _download(url: str) -> tuple[SpooledFile, str]:
+    try:
+        return await download_to_spool(url, settings.upload_dir, settings.max_upload_mb * 1024 * 1024)
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail="Archivo demasiado grande")
+    except DownloadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/ocr/by-url")
 async def ocr_by_url(payload: UrlIn, db: Session = Depends(get_db)):
-    async with httpx.AsyncClient(timeout=20) as client:
-        r = await client.get(payload.url, follow_redirects=True)
-        if r.status_code != 200:
-            raise HTTPException(status_code=400, detail="No se pudo descargar")
-        ct = r.headers.get("content-type", "")
-        raw = r.content
-    return _process(raw, os.path.basename(payload.url.split("?")[0]) or "image", ct, db)
+    spool, ct = await _download(payload.url)
+    return await _run_spooled(spool, _process_spooled, filename_from_url(payload.url), ct, db)
+
+@router.post("/ocr/by-url/batch")
+async def ocr_by_url_batch(payload: UrlBatchIn):
+    if len(payload.urls) > settings.url_batch_max:
+        raise HTTPException(status_code=422, detail=f"Demasiadas URLs (máximo {settings.url_batch_max})")
+    # las descargas corren en paralelo mientras el OCR avanza con las ya bajadas
+    fetch_sem = asyncio.Semaphore(max(1, settings.fetch_concurrency))
+    ocr_sem = asyncio.Semaphore(max(1, settings.batch_concurrency))
+    # cada item ocupa un cupo desde que empieza a bajar hasta que termina su OCR: las descargas
+    # se adelantan al OCR como mucho fetch_concurrency archivos, no el lote entero en disco
+    inflight = asyncio.Semaphore(max(1, settings.fetch_concurrency) + max(1, settings.batch_concurrency))
+
+    async def _one(url: str):
+        filename = filename_from_url(url)
+        try:
+            async with inflight:
+                async with fetch_sem:
+                    spool, ct = await _download(url)
+                async with ocr_sem:
+                    res = await _run_spooled(spool, _process_own_session, filename, ct)
+            return {"url": url, "filename": filename, "success": True, "result": res}
+        except HTTPException as e:
+            return {"url": url, "filename": filename, "success": False, "error": e.detail}
+        except Exception as e:
+            return {"url": url, "filename": filename, "success": False, "error": str(e)}
+
+    items = await asyncio.gather(*[_one(u) for u in payload.urls])
+    succeeded = sum(1 for i in items if i["success"])
+    return {"items": items, "total": len(items), "succeeded": succeeded, "failed": len(items) - succeeded}
+
+def _process_path(path: str, filename: str, db: Session):
+    with open(path, "rb") as f:
+        raw = f.read()
+    return _process(raw, filename, "image/unknown", db)
 
 @router.post("/ocr/by-id")
 async def ocr_by_id(payload: IdIn, db: Session = Depends(get_db)):
@@ -153,14 +410,111 @@ async def ocr_by_id(payload: IdIn, db: Session = Depends(get_db)):
     path = os.path.join(base, safe)
     if not os.path.exists(path):
         raise HTTPException(status_code=404, detail="No encontrado")
-    with open(path, "rb") as f:
+    return await _run_blocking(_process_path, path, safe, db)
+
+@router.get("/ocr/queue")
+def ocr_queue():
+    return ocr_executor.stats()
+
+def _run_job(job, db: Session):
+    with open(job.storage_path, "rb") as f:
         raw = f.read()
-    return _process(raw, safe, "image/unknown", db)
+    return _process(raw, job.filename, job.content_type, db, storage_path=job.storage_path)
+
+job_workers = JobWorkers(_run_job, settings.job_workers, settings.job_poll_interval_s,
+                         settings.job_lease_s, settings.job_max_attempts)
+
+def _enqueue_job(spool: SpooledFile, filename: str, content_type: str, db: Session):
+    try:
+        if not content_type or not content_type.startswith("image/"):
+            raise HTTPException(status_code=400, detail="Tipo no válido")
+        if not settings.upload_dir:
+            raise HTTPException(status_code=400, detail="Upload deshabilitado")
+        job_id = uuid.uuid4().hex
+        # prefijo con el id: dos uploads con el mismo nombre no se pisan mientras esperan
+        storage_path = save_file(settings.upload_dir, f"{job_id}_{filename}", spool.path)
+    except Exception:
+        discard(spool.path)
+        raise
+    return crud.create_job(
+        db,
+        job_id=job_id,
+        filename=filename,
+        content_type=content_type,
+        size_bytes=spool.size,
+        storage_path=storage_path,
+    )
+
+@router.post("/ocr/jobs", status_code=202, openapi_extra=_upload_body("file", many=False))
+async def create_ocr_job(request: Request, db: Session = Depends(get_db)):
+    spool, filename, content_type = await _spool_one(request)
+    job = await run_in_threadpool(_enqueue_job, spool, filename, content_type, db)
+    job_workers.notify()
+    return {"job_id": job.id, "status": job.status}
+
+@router.get("/ocr/jobs/{job_id}", response_model=schemas.JobOut)
+def get_ocr_job(job_id: str, db: Session = Depends(get_db)):
+    job = crud.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="No encontrado")
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "filename": job.filename,
+        "attempts": job.attempts,
+        "document_id": job.document_id,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
 
 @router.get("/documents", response_model=schemas.DocumentListOut)
-def list_documents(skip: int = 0, limit: int = 50, db: Session = Depends(get_db)):
-    items, total = crud.list_documents(db, skip=skip, limit=limit)
-    return {"items": items, "total": total}
+def list_documents(
+    cursor: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=500),
+    include_blocks: bool = False,
+    total: Literal["approx", "exact"] = "exact",
+    skip: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    items, count, next_cursor = crud.list_documents(
+        db, cursor=cursor, limit=limit, with_blocks=include_blocks, total=total, skip=skip
+    )
+    out_model = schemas.DocumentOut if include_blocks else schemas.DocumentSummaryOut
+    return {
+        "items": [out_model.model_validate(d) for d in items],
+        "total": count,
+        "next_cursor": next_cursor,
+    }
+
+@router.get("/tickets", response_model=schemas.TicketListOut)
+def list_tickets(
+    placa: Optional[str] = None,
+    ticket_num: Optional[str] = None,
+    desde: Optional[datetime] = Query(None, description="ingreso >= desde (hora local del ticket)"),
+    hasta: Optional[datetime] = Query(None, description="ingreso < hasta"),
+    cursor: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    items, next_cursor = crud.find_tickets(
+        db, placa=placa, ticket_num=ticket_num, desde=desde, hasta=hasta, cursor=cursor, limit=limit
+    )
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/documents/search", response_model=schemas.SearchOut)
+def search_documents(
+    q: str = Query(..., min_length=3, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    # mínimo 3 caracteres: el índice trigram no puede resolver fragmentos más cortos
+    rows = crud.search_documents(db, q.strip(), limit=limit, offset=offset)
+    next_offset = offset + limit if len(rows) > limit else None
+    return {"items": rows[:limit], "next_offset": next_offset}
 
 @router.get("/documents/{doc_id}", response_model=schemas.DocumentOut)
 def get_document(doc_id: int, db: Session = Depends(get_db)):
@@ -168,3 +522,9 @@ def get_document(doc_id: int, db: Session = Depends(get_db)):
     if not doc:
         raise HTTPException(status_code=404, detail="No encontrado")
     return doc
+
+@router.get("/documents/{doc_id}/blocks", response_model=List[schemas.OcrBlockOut])
+def get_document_blocks(doc_id: int, x_min: float, y_min: float, x_max: float, y_max: float, db: Session = Depends(get_db)):
+    if not crud.get_document(db, doc_id):
+        raise HTTPException(status_code=404, detail="No encontrado")
+    return crud.find_blocks_in_region(db, doc_id, x_min, y_min, x_max, y_max)
@@ -1,11 +1,15 @@
 from pydantic import BaseModel
-from typing import List, Optional, Any
+from typing import List, Optional, Any, Union
 from datetime import datetime
 
 class OcrBlockOut(BaseModel):
     text: Optional[str]
     confidence: Optional[float]
-    bbox: Optional[Any]
+    bbox: Optional[List[List[float]]]
+    x_min: Optional[float] = None
+    y_min: Optional[float] = None
+    x_max: Optional[float] = None
+    y_max: Optional[float] = None
 
     class Config:
         from_attributes = True
@@ -24,9 +28,50 @@ class DocumentOut(BaseModel):
     class Config:
         from_attributes = True
 
+class DocumentSummaryOut(BaseModel):
+    id: int
+    filename: str
+    content_type: str
+    size_bytes: int
+    storage_path: Optional[str]
+    status: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
 class DocumentListOut(BaseModel):
-    items: List[DocumentOut]
+    items: List[Union[DocumentOut, DocumentSummaryOut]]
     total: int
+    next_cursor: Optional[int] = None
+
+class TicketOut(BaseModel):
+    id: int
+    filename: str
+    created_at: datetime
+    ticket_num: Optional[str] = None
+    placa: Optional[str] = None
+    peso_neto_kg: Optional[int] = None
+    ingreso_at: Optional[datetime] = None
+    salida_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class TicketListOut(BaseModel):
+    items: List[TicketOut]
+    next_cursor: Optional[int] = None
+
+class SearchHitOut(BaseModel):
+    id: int
+    filename: str
+    created_at: datetime
+    rank: float
+    snippet: Optional[str] = None
+
+class SearchOut(BaseModel):
+    items: List[SearchHitOut]
+    next_offset: Optional[int] = None
 
 class OcrItemOut(BaseModel):
     filename: str
@@ -39,3 +84,15 @@ class BatchOut(BaseModel):
     total: int
     succeeded: int
     failed: int
+
+class JobOut(BaseModel):
+    job_id: str
+    status: str
+    filename: str
+    attempts: int
+    document_id: Optional[int] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
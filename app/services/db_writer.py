@@ -0,0 +1,114 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from sqlalchemy import text
+
+from ..database import SessionLocal
+
+log = logging.getLogger(__name__)
+
+class DbWriter:
+    """Un único hilo escritor con group commit.
+
+    `submit(fn)` encola `fn(db)`; el hilo junta lo que llegue durante max_delay_ms (o hasta
+    max_batch), ejecuta cada fn en su propio SAVEPOINT y hace un solo COMMIT para todo el lote.
+    Un fn que falla solo revierte lo suyo; el Future recibe el resultado después del COMMIT.
+    Las fn no deben hacer commit.
+    """
+
+    def __init__(self, max_batch: int = 64, max_delay_ms: float = 2, session_factory=SessionLocal):
+        self.max_batch = max(1, max_batch)
+        self.max_delay_s = max(0.0, max_delay_ms) / 1000
+        self.session_factory = session_factory
+        self._q: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.writes = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, name="db-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float | None = None):
+        with self._lock:
+            t, self._thread = self._thread, None
+        if t is None:
+            return
+        self._q.put(None)  # procesa lo pendiente y termina
+        t.join(timeout)
+
+    def submit(self, fn) -> Future:
+        if self._thread is None:
+            self.start()
+        fut: Future = Future()
+        self._q.put((fn, fut))
+        return fut
+
+    def run(self, fn, timeout: float | None = None):
+        return self.submit(fn).result(timeout)
+
+    def stats(self) -> dict:
+        return {"batches": self.batches, "writes": self.writes, "pending": self._q.qsize()}
+
+    def _next_batch(self):
+        item = self._q.get()
+        if item is None:
+            return None, True
+        batch = [item]
+        deadline = time.monotonic() + self.max_delay_s
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._q.get(timeout=remaining) if remaining > 0 else self._q.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _loop(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch):
+        db = self.session_factory()
+        done = []
+        try:
+            if db.get_bind().dialect.name == "sqlite":
+                # pysqlite no emite BEGIN antes de un SAVEPOINT (cada uno haría commit en su RELEASE).
+                # IMMEDIATE toma el lock de escritura al empezar: espera busy_timeout si otro escribe,
+                # en vez de fallar al pasar de lectura a escritura a mitad del lote
+                db.execute(text("BEGIN IMMEDIATE"))
+            for fn, fut in batch:
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                try:
+                    with db.begin_nested():
+                        done.append((fut, fn(db), None))
+                except Exception as e:
+                    done.append((fut, None, e))
+            db.commit()
+        except Exception as e:
+            log.exception("falló el commit del lote (%d escrituras)", len(batch))
+            db.rollback()
+            done = [(fut, None, e) for fut, _, _ in done]
+        finally:
+            db.close()
+        self.batches += 1
+        self.writes += len(done)
+        for fut, result, err in done:
+            if err is not None:
+                fut.set_exception(err)
+            else:
+                fut.set_result(result)
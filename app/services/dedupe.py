@@ -0,0 +1,93 @@
+import os
+from typing import List, Optional, Tuple
+import cv2
+import numpy as np
+from sqlalchemy.orm import Session
+
+from .. import crud, models
+
+def image_dhash(image_bytes: bytes) -> Optional[int]:
+    # IMREAD_REDUCED_GRAYSCALE_8 deja que el decoder JPEG trabaje a 1/8 de resolución
+    arr = np.frombuffer(image_bytes, dtype=np.uint8)
+    gray = cv2.imdecode(arr, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if gray is None:
+        return None
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    h = 0
+    for b in bits:
+        h = (h << 1) | int(b)
+    return h
+
+def _gray_square(image_bytes: bytes, size: int):
+    arr = np.frombuffer(image_bytes, dtype=np.uint8)
+    gray = cv2.imdecode(arr, cv2.IMREAD_REDUCED_GRAYSCALE_2)
+    if gray is None:
+        return None
+    return cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+def pixel_diff(a: bytes, b: bytes, size: int = 512, grid: int = 32) -> float:
+    """Máxima diferencia media (0..1) entre bloques de las dos imágenes llevadas al mismo tamaño.
+
+    Una copia recomprimida o reescalada queda por debajo de ~0.1 en todos los bloques; otro
+    ticket del mismo formulario difiere al menos en los bloques de sus números (>0.3).
+    """
+    ga, gb = _gray_square(a, size), _gray_square(b, size)
+    if ga is None or gb is None:
+        return 1.0
+    k = size // grid
+    d = np.abs(ga - gb) / 255.0
+    return float(d.reshape(grid, k, grid, k).mean(axis=(1, 3)).max())
+
+def _same_image(image_bytes: bytes, doc: models.Document, max_pixel_diff: float) -> bool:
+    # sin la imagen guardada no hay cómo confirmar: mejor repetir el OCR que devolver otro ticket
+    if not doc.storage_path or not os.path.isfile(doc.storage_path):
+        return False
+    with open(doc.storage_path, "rb") as f:
+        stored = f.read()
+    return pixel_diff(image_bytes, stored) <= max_pixel_diff
+
+# bandas de 16 bits del índice (image_hashes.band0..band3). Por pigeonhole, dos hashes a
+# distancia <= BANDS - 1 comparten al menos una banda exacta; a distancia mayor pueden no tener
+# ninguna y la búsqueda no los ve
+BANDS = 4
+MAX_INDEXED_DISTANCE = BANDS - 1
+
+def to_signed64(h: int) -> int:
+    return h - (1 << 64) if h >= (1 << 63) else h
+
+def split_bands(h: int) -> List[int]:
+    h &= (1 << 64) - 1
+    return [(h >> (16 * i)) & 0xFFFF for i in range(BANDS)]
+
+def hamming(a: int, b: int) -> int:
+    return bin((a ^ b) & ((1 << 64) - 1)).count("1")
+
+def index_document(db: Session, document_id: int, h: Optional[int], commit: bool = True) -> None:
+    if h is None:
+        return
+    crud.add_image_hash(db, document_id, to_signed64(h), split_bands(h), commit=commit)
+
+def find_near_duplicate(db: Session, h: Optional[int], max_distance: int, per_band: int = 50,
+                        image_bytes: Optional[bytes] = None,
+                        max_pixel_diff: float = 0.15) -> Optional[Tuple[models.Document, int]]:
+    """Documento ya procesado con la misma imagen: dHash a distancia <= max_distance y, si se pasa
+    image_bytes, confirmado píxel a píxel contra el archivo guardado (el dHash solo no distingue
+    tickets del mismo formulario)."""
+    if max_distance > MAX_INDEXED_DISTANCE:
+        raise ValueError(f"max_distance={max_distance}: el índice por bandas solo garantiza distancias <= {MAX_INDEXED_DISTANCE}")
+    if h is None or max_distance < 0:
+        return None
+    near = []
+    for doc_id, phash in crud.find_hash_candidates(db, split_bands(h), per_band=per_band):
+        d = hamming(h, phash)
+        if d <= max_distance:
+            near.append((d, -doc_id))
+    # el más cercano primero; a igual distancia, el más reciente
+    for d, neg_id in sorted(near):
+        doc = crud.get_document(db, -neg_id)
+        if doc is None:
+            continue
+        if image_bytes is None or _same_image(image_bytes, doc, max_pixel_diff):
+            return doc, d
+    return None
@@ -0,0 +1,50 @@
+import os
+import httpx
+
+from ..config import settings
+from ..utils.storage import Spooler, SpooledFile, UploadTooLarge, CHUNK_SIZE
+
+# cliente compartido: reutiliza conexiones (keep-alive, TLS) entre requests
+_client: httpx.AsyncClient | None = None
+
+class DownloadError(Exception):
+    pass
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=settings.fetch_timeout_s,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=settings.fetch_max_connections,
+                max_keepalive_connections=settings.fetch_max_connections,
+            ),
+        )
+    return _client
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def filename_from_url(url: str) -> str:
+    return os.path.basename(url.split("?")[0]) or "image"
+
+async def download_to_spool(url: str, base_dir: str, max_bytes: int, client: httpx.AsyncClient | None = None) -> tuple[SpooledFile, str]:
+    """Descarga en streaming a un spool; corta con UploadTooLarge en cuanto se pasa de max_bytes."""
+    client = client or get_client()
+    try:
+        async with client.stream("GET", url) as r:
+            if r.status_code != 200:
+                raise DownloadError(f"No se pudo descargar (HTTP {r.status_code})")
+            length = r.headers.get("content-length")
+            if length and length.isdigit() and int(length) > max_bytes:
+                raise UploadTooLarge()
+            with Spooler(base_dir, max_bytes) as sp:
+                async for chunk in r.aiter_bytes(CHUNK_SIZE):
+                    sp.write(chunk)
+                return sp.finish(), r.headers.get("content-type", "")
+    except httpx.HTTPError as e:
+        raise DownloadError(f"No se pudo descargar: {e.__class__.__name__}") from e
@@ -0,0 +1,108 @@
+import logging
+import threading
+
+from ..database import SessionLocal
+from .. import crud
+
+log = logging.getLogger(__name__)
+
+class JobWorkers:
+    """Hilos que drenan la tabla ocr_jobs; `handler(job, db)` devuelve el payload del job.
+
+    Cada job en curso tiene un lease (heartbeat_at) que este proceso renueva cada lease_s / 3.
+    Con varios procesos (WEB_WORKERS) solo se re-encolan los jobs cuyo lease venció, no los que
+    otro proceso sigue procesando.
+    """
+
+    def __init__(self, handler, workers: int = 1, poll_interval_s: float = 2.0, lease_s: float = 120.0,
+                 max_attempts: int = 3):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.poll_interval_s = poll_interval_s
+        self.lease_s = lease_s
+        self.max_attempts = max(1, max_attempts)
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._active_lock = threading.Lock()
+        self._active: set[str] = set()
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._loop, name=f"ocr-job-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        t = threading.Thread(target=self._lease_loop, name="ocr-job-lease", daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def stop(self, timeout: float | None = None):
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def notify(self):
+        self._wake.set()
+
+    def maintain_leases(self):
+        """Renueva el lease de los jobs propios y recupera los abandonados por otros workers."""
+        with self._active_lock:
+            active = list(self._active)
+        db = SessionLocal()
+        try:
+            crud.heartbeat_jobs(db, active)
+            requeued, failed = crud.requeue_stale_jobs(db, self.lease_s, self.max_attempts)
+            if requeued:
+                log.info("re-encolados %d jobs con el lease vencido", requeued)
+                self._wake.set()
+            if failed:
+                log.warning("%d jobs agotaron los %d intentos", failed, self.max_attempts)
+        finally:
+            db.close()
+
+    def _lease_loop(self):
+        while True:
+            try:
+                self.maintain_leases()
+            except Exception:
+                log.exception("error renovando leases de jobs")
+            if self._stop.wait(max(1.0, self.lease_s / 3)):
+                return
+
+    def _loop(self):
+        while not self._stop.is_set():
+            if not self._run_one():
+                self._wake.wait(self.poll_interval_s)
+                self._wake.clear()
+
+    def _run_one(self) -> bool:
+        db = SessionLocal()
+        try:
+            job = crud.claim_next_job(db)
+            if job is None:
+                return False
+            with self._active_lock:
+                self._active.add(job.id)
+            try:
+                result = self.handler(job, db)
+            except Exception as e:
+                db.rollback()
+                detail = getattr(e, "detail", None) or str(e) or e.__class__.__name__
+                log.warning("job %s falló: %s", job.id, detail)
+                crud.finish_job(db, job.id, error=str(detail))
+            else:
+                crud.finish_job(db, job.id, result=result)
+            finally:
+                with self._active_lock:
+                    self._active.discard(job.id)
+            return True
+        except Exception:
+            log.exception("error en el worker de jobs")
+            return False
+        finally:
+            db.close()
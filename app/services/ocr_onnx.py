@@ -0,0 +1,107 @@
+import hashlib
+import logging
+import sys
+from pathlib import Path
+
+import numpy as np
+import torch
+import easyocr
+
+from ..utils.storage import atomic_path
+
+log = logging.getLogger(__name__)
+
+ONNX_OPSET = 17
+
+class _OrtNet(torch.nn.Module):
+    """Reemplaza a la red de torch dentro del Reader; mismo forward, ejecutado por onnxruntime.
+
+    easyocr llama a detector(x) -> (y, feature) y a recognizer(image, text) -> preds, y solo usa
+    `y` y `preds`; el resto de su pre/posproceso queda igual.
+    """
+
+    def __init__(self, path: Path, detector: bool):
+        super().__init__()
+        import onnxruntime as ort
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        opts.intra_op_num_threads = torch.get_num_threads()
+        self.session = ort.InferenceSession(str(path), opts, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.detector = detector
+
+    def forward(self, x, text=None):
+        out = self.session.run(None, {self.input_name: x.detach().cpu().numpy().astype(np.float32, copy=False)})
+        y = torch.from_numpy(out[0])
+        return (y, None) if self.detector else y
+
+class _DetectorExport(torch.nn.Module):
+    def __init__(self, net):
+        super().__init__()
+        self.net = net
+
+    def forward(self, x):
+        return self.net(x)[0]
+
+class _RecognizerExport(torch.nn.Module):
+    # los modelos de easyocr ignoran `text` en inferencia
+    def __init__(self, net):
+        super().__init__()
+        self.net = net
+
+    def forward(self, image):
+        return self.net(image, None)
+
+def _recognizer_height() -> int:
+    # alto fijo de las líneas que easyocr pasa al reconocedor (64 en los modelos incluidos)
+    return int(getattr(sys.modules[easyocr.Reader.__module__], "imgH", 64))
+
+def export_models(reader, out_dir: Path, langs: list[str]) -> tuple[Path, Path]:
+    """Exporta detector y reconocedor float32 a ONNX (si no existen) con lote y tamaño dinámicos."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    key = hashlib.sha1(",".join(sorted(langs)).encode()).hexdigest()[:8]
+    det_path = out_dir / "craft.onnx"
+    rec_path = out_dir / f"recognizer-{key}.onnx"
+    with torch.no_grad():
+        # a un temporal y rename: varios workers pueden exportar a la vez y ninguno debe cargar
+        # un .onnx a medio escribir
+        if not det_path.exists():
+            log.info("exportando detector a %s", det_path)
+            with atomic_path(det_path) as tmp:
+                torch.onnx.export(
+                    _DetectorExport(reader.detector).eval(), torch.zeros(1, 3, 640, 640), str(tmp),
+                    input_names=["image"], output_names=["y"], opset_version=ONNX_OPSET,
+                    dynamic_axes={"image": {0: "batch", 2: "height", 3: "width"}, "y": {0: "batch", 1: "h", 2: "w"}},
+                )
+        if not rec_path.exists():
+            log.info("exportando reconocedor a %s", rec_path)
+            with atomic_path(rec_path) as tmp:
+                torch.onnx.export(
+                    _RecognizerExport(reader.recognizer).eval(), torch.zeros(1, 1, _recognizer_height(), 256),
+                    str(tmp), input_names=["image"], output_names=["preds"], opset_version=ONNX_OPSET,
+                    dynamic_axes={"image": {0: "batch", 3: "width"}, "preds": {0: "batch", 1: "steps"}},
+                )
+    return det_path, rec_path
+
+def quantize_int8(path: Path) -> Path:
+    """Cuantización dinámica int8 (pesos) de MatMul y LSTM, lo mismo que easyocr hace con
+    quantize_dynamic en torch. Las convoluciones quedan en float32."""
+    dst = path.with_name(path.stem + "-int8.onnx")
+    if not dst.exists():
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        with atomic_path(dst) as tmp:
+            quantize_dynamic(str(path), str(tmp), op_types_to_quantize=["MatMul", "LSTM"], weight_type=QuantType.QInt8)
+    return dst
+
+def build_onnx_reader(langs: list[str], out_dir: str, int8: bool = False):
+    """easyocr.Reader con detector y reconocedor en onnxruntime (solo CPU).
+
+    La exportación necesita los pesos float32, por eso el Reader se crea con quantize=False.
+    """
+    reader = easyocr.Reader(langs, gpu=False, quantize=False)
+    det_path, rec_path = export_models(reader, Path(out_dir), langs)
+    if int8:
+        rec_path = quantize_int8(rec_path)
+    reader.detector = _OrtNet(det_path, detector=True)
+    reader.recognizer = _OrtNet(rec_path, detector=False)
+    return reader
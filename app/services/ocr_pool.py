@@ -0,0 +1,67 @@
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from ..config import settings
+
+# Pool de procesos; cada worker carga su propio easyocr.Reader al arrancar.
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+def _init_worker(torch_threads: int):
+    from .runtime import uses_torch
+    if uses_torch():
+        try:
+            import torch
+            torch.set_num_threads(torch_threads)
+        except Exception:
+            pass
+    from .ocr_reader import get_reader
+    get_reader()
+
+def _read_variant(name: str, img, boxes=None):
+    from .ocr_reader import read_ndarray, recognize_ndarray
+    t0 = time.perf_counter()
+    if boxes is None:
+        blocks = read_ndarray(img)
+    else:
+        blocks = recognize_ndarray(img, *boxes)
+    dt = (time.perf_counter() - t0) * 1000.0
+    return name, blocks, dt
+
+def _detect(img):
+    from .ocr_reader import detect_ndarray
+    t0 = time.perf_counter()
+    boxes = detect_ndarray(img)
+    return boxes, (time.perf_counter() - t0) * 1000.0
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            size = max(1, settings.ocr_pool_size)
+            # reparte los núcleos entre workers para no sobre-suscribir torch
+            threads = max(1, (os.cpu_count() or 1) // size)
+            _pool = ProcessPoolExecutor(
+                max_workers=size,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(threads,),
+            )
+        return _pool
+
+def submit_variant(name: str, img, boxes=None):
+    return get_pool().submit(_read_variant, name, img, boxes)
+
+def submit_detect(img):
+    # detección compartida en un worker: el proceso principal no carga su propio Reader
+    return get_pool().submit(_detect, img)
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
@@ -1,12 +1,45 @@
 import os
+import threading
 from functools import lru_cache
-import easyocr
 
-@lru_cache(maxsize=1)
-def get_reader():
+from ..config import settings
+
+OCR_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+def build_reader(backend: str = "torch"):
     langs = os.getenv("OCR_LANGUAGES", "es,en").split(",")
     gpu = os.getenv("OCR_GPU", "false").lower() in {"1", "true", "yes", "y"}
-    return easyocr.Reader(langs, gpu=gpu)
+    if backend not in OCR_BACKENDS:
+        raise ValueError(f"OCR_BACKEND desconocido: {backend!r} (use {', '.join(OCR_BACKENDS)})")
+    if backend == "torch":
+        # easyocr (y torch) se importan al cargar el Reader, no al importar este módulo
+        import easyocr
+        # en CPU easyocr ya cuantiza el reconocedor a int8 (quantize=True por defecto)
+        return easyocr.Reader(langs, gpu=gpu)
+    from .ocr_onnx import build_onnx_reader
+    return build_onnx_reader(langs, settings.ocr_onnx_dir, int8=backend == "onnx-int8")
+
+@lru_cache(maxsize=1)
+def _cached_reader():
+    return build_reader(settings.ocr_backend)
+
+_reader_lock = threading.Lock()
+
+def get_reader():
+    # lru_cache no evita cargas simultáneas: el warm-up y un request temprano cargarían dos Readers
+    with _reader_lock:
+        return _cached_reader()
 
 def read_ndarray(img):
     return get_reader().readtext(img)
+
+def detect_ndarray(img):
+    # solo el detector CRAFT; devuelve las cajas de la primera (única) imagen
+    horizontal_list, free_list = get_reader().detect(img)
+    return horizontal_list[0], free_list[0]
+
+def recognize_ndarray(img, horizontal_list, free_list):
+    # mismo formato de salida que readtext, reutilizando cajas ya detectadas
+    if not horizontal_list and not free_list:
+        return []
+    return get_reader().recognize(img, horizontal_list=horizontal_list, free_list=free_list)
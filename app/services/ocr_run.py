@@ -1,10 +1,21 @@
 import time
+import threading
+from concurrent.futures import as_completed
 from typing import List, Tuple, Dict, Any
 import numpy as np
 import cv2
-from .preprocess import build_variants
-from .ocr_reader import read_ndarray
-from .yolo_detector import YOLODetector
+from .preprocess import prepare, imdecode_bytes, resize_max_side, to_rgb
+from .ocr_reader import read_ndarray, detect_ndarray, recognize_ndarray
+from .ocr_pool import submit_variant, submit_detect
+from .yolo_detector import get_detector, FIELD_CLASSES
+from .parse_ticket import parse_ticket_fields
+from .ticket_fields import extract_ticket_fields, format_ticket_fields
+from ..config import settings
+
+# victorias por preset entre requests (proceso local), para ordenar variantes
+_stats_lock = threading.Lock()
+_preset_runs: Dict[str, int] = {}
+_preset_wins: Dict[str, int] = {}
 
 def _ensure_rgb(img):
     if img is None:
@@ -26,18 +37,118 @@ def _to_blocks(blocks):
         out.append({"bbox": bbox, "text": text, "confidence": float(conf)})
     return out
 
-def run_ocr(image_bytes: bytes) -> Dict[str, Any]:
-    variants, angle = build_variants(image_bytes)
-    best = None
-    metrics: List[Tuple[str, float, float]] = []
-    results: Dict[str, Any] = {}
+def preset_win_rate(name: str) -> float:
+    # suavizado de Laplace: un preset sin historial arranca en 0.5
+    with _stats_lock:
+        runs = _preset_runs.get(name, 0)
+        wins = _preset_wins.get(name, 0)
+    return (wins + 1) / (runs + 2)
+
+def _record_outcome(ran: List[str], winner: str | None):
+    with _stats_lock:
+        for name in ran:
+            _preset_runs[name] = _preset_runs.get(name, 0) + 1
+        if winner is not None:
+            _preset_wins[winner] = _preset_wins.get(winner, 0) + 1
+
+def _order_presets(names):
+    # sorted es estable: a igual tasa se respeta el orden de preprocess.PRESETS
+    return sorted(names, key=lambda n: -preset_win_rate(n))
+
+def _run_sequential(variants, early_exit_conf: float, boxes=None):
+    runs: Dict[str, Tuple[Any, float, float]] = {}
     for name, img in variants:
         rgb = _ensure_rgb(img)
         t0 = time.perf_counter()
-        ocr_blocks = read_ndarray(rgb)
+        ocr_blocks = read_ndarray(rgb) if boxes is None else recognize_ndarray(rgb, *boxes)
         dt = (time.perf_counter() - t0) * 1000.0
         conf = _mean_conf(ocr_blocks)
-        metrics.append((name, conf, dt))
+        runs[name] = (ocr_blocks, conf, dt)
+        if early_exit_conf > 0 and conf >= early_exit_conf:
+            break
+    return runs
+
+def _run_parallel(variants, early_exit_conf: float, boxes=None):
+    """Variantes en el pool de procesos. Devuelve (runs, abandonadas).
+
+    Con early exit no se espera al resto: las que ningún worker tomó se cancelan (quedan como
+    skipped) y las que ya estaban en un worker siguen hasta terminar allí, pero su resultado
+    no se usa (abandonadas).
+    """
+    futures = {submit_variant(name, _ensure_rgb(img), boxes): name for name, img in variants}
+    runs: Dict[str, Tuple[Any, float, float]] = {}
+
+    def collect(fut):
+        name, ocr_blocks, dt = fut.result()
+        runs[name] = (ocr_blocks, _mean_conf(ocr_blocks), dt)
+        return runs[name][1]
+
+    pending = set(futures)
+    for fut in as_completed(futures):
+        pending.discard(fut)
+        if collect(fut) >= early_exit_conf > 0:
+            break
+    abandoned = []
+    for fut in pending:
+        if fut.cancel():
+            continue
+        if fut.done():
+            collect(fut)  # terminó mientras tanto: el resultado ya está
+        else:
+            abandoned.append(futures[fut])
+    return runs, abandoned
+
+def run_ocr(image_bytes: bytes, early_exit_conf: float | None = None, adaptive_order: bool | None = None, mode: str | None = None, shared_detection: bool | None = None) -> Dict[str, Any]:
+    if early_exit_conf is None:
+        early_exit_conf = settings.ocr_early_exit_conf
+    if adaptive_order is None:
+        adaptive_order = settings.ocr_adaptive_order
+    if mode is None:
+        mode = settings.ocr_exec_mode
+    if shared_detection is None:
+        shared_detection = settings.ocr_shared_detection
+    graph, angle = prepare(image_bytes)
+    order = graph.presets
+    if adaptive_order:
+        order = _order_presets(order)
+    # generador: cada preset se construye justo antes de usarse y lo que corta el
+    # early exit ni siquiera se calcula
+    variants = graph.variants(order)
+    t_wall = time.perf_counter()
+    boxes = None
+    detect_ms = None
+    if shared_detection:
+        # las variantes están alineadas píxel a píxel con la imagen base:
+        # se detecta una sola vez y cada preset solo pasa por el reconocedor
+        base = graph.preset("original")
+        if mode == "parallel":
+            # en un worker del pool: el proceso principal no carga su propio Reader
+            boxes, detect_ms = submit_detect(_ensure_rgb(base)).result()
+        else:
+            t0 = time.perf_counter()
+            boxes = detect_ndarray(base)
+            detect_ms = (time.perf_counter() - t0) * 1000.0
+        del base
+    abandoned: List[str] = []
+    if mode == "parallel":
+        runs, abandoned = _run_parallel(variants, early_exit_conf, boxes)
+    else:
+        runs = _run_sequential(variants, early_exit_conf, boxes)
+    wall_ms = (time.perf_counter() - t_wall) * 1000.0
+
+    best = None
+    results: Dict[str, Any] = {}
+    metrics = []
+    for name in order:
+        if name not in runs:
+            # abandoned: ya estaba en un worker cuando llegó el early exit; corre igual, no se usa
+            status = "abandoned" if name in abandoned else "skipped"
+            metrics.append({"preset": name, "confidence_mean": None, "time_ms": None,
+                            "skipped": status == "skipped", "status": status})
+            continue
+        ocr_blocks, conf, dt = runs[name]
+        metrics.append({"preset": name, "confidence_mean": float(conf), "time_ms": float(dt),
+                        "skipped": False, "status": "ran"})
         if best is None or conf > best[1] or (abs(conf - best[1]) < 1e-9 and dt < best[2]):
             best = (name, conf, dt)
             results = {
@@ -47,55 +158,119 @@ def run_ocr(image_bytes: bytes) -> Dict[str, Any]:
                 "blocks": _to_blocks(ocr_blocks),
                 "full_text": "\n".join([b[1] for b in ocr_blocks if b and len(b) == 3]).strip()
             }
-    results["variant_metrics"] = [{"preset": n, "confidence_mean": float(c), "time_ms": float(t)} for n, c, t in metrics]
+    _record_outcome(list(runs), best[0] if best else None)
+    results["variant_metrics"] = metrics
+    results["exec_mode"] = mode
+    results["detect_ms"] = detect_ms
+    results["wall_time_ms"] = float(wall_ms)
+    results["variant_time_ms_total"] = float(sum(r[2] for r in runs.values()))
     return results
 
-def run_ocr_with_yolo(image_bytes: bytes, yolo_model_path: str) -> Dict[str, Any]:
-    """
-    Run OCR on specific regions detected by YOLO.
+def _pad_box(bbox, shape, pad: int):
+    x1, y1, x2, y2 = bbox
+    h, w = shape[:2]
+    return max(0, x1 - pad), max(0, y1 - pad), min(w, x2 + pad), min(h, y2 + pad)
 
-    Args:
-        image_bytes (bytes): The input image in bytes.
-        yolo_model_path (str): Path to the YOLO model.
+def _best_per_label(regions):
+    best = {}
+    for r in regions:
+        cur = best.get(r["label"])
+        if cur is None or r["confidence"] > cur["confidence"]:
+            best[r["label"]] = r
+    return best
 
-    Returns:
-        Dict[str, Any]: OCR results for each detected region.
-    """
-    # Initialize YOLO detector
-    detector = YOLODetector(yolo_model_path)
-
-    # Decode the image from bytes
-    img = imdecode_bytes(image_bytes)
-
-    # Detect regions using YOLO
-    regions = detector.detect_regions(img)
-
-    # Process each detected region with OCR
-    ocr_results = []
-    for region in regions:
-        x1, y1, x2, y2 = region['bbox']
-        cropped_img = img[y1:y2, x1:x2]  # Crop the region
-        rgb = _ensure_rgb(cropped_img)  # Ensure the image is in RGB format
-        ocr_blocks = read_ndarray(rgb)  # Perform OCR on the cropped region
-        ocr_results.append({
-            "region": region,
-            "ocr_blocks": _to_blocks(ocr_blocks)
-        })
+def _roi_page(image_bytes: bytes):
+    # las cajas de YOLO están en coordenadas de esta imagen (la misma en ambos caminos)
+    return resize_max_side(imdecode_bytes(image_bytes), 1600)
 
-    return {
-        "regions": regions,
-        "ocr_results": ocr_results
-    }
+def _field_detector(model_path: str | None = None):
+    return get_detector(model_path or settings.yolo_model_path, settings.yolo_backend, settings.yolo_imgsz)
+
+def detect_fields_batch(images: List[bytes], model_path: str | None = None) -> List[Any]:
+    """Regiones YOLO de varias imágenes con inferencia por lotes, para pasarlas a run_ocr_roi.
 
-def imdecode_bytes(image_bytes: bytes) -> np.ndarray:
+    Las imágenes que no se pueden decodificar quedan en None (run_ocr_roi detecta por su cuenta
+    y falla con el error de siempre).
     """
-    Decode an image from bytes to a NumPy array.
+    pages = []
+    for b in images:
+        try:
+            pages.append(_roi_page(b))
+        except Exception:
+            pages.append(None)
+    ok = [i for i, p in enumerate(pages) if p is not None]
+    out: List[Any] = [None] * len(pages)
+    if ok:
+        found = _field_detector(model_path).detect_regions_batch(
+            [pages[i] for i in ok], conf=settings.yolo_conf, batch_size=settings.yolo_batch_size,
+        )
+        for i, regions in zip(ok, found):
+            out[i] = regions
+    return out
 
-    Args:
-        image_bytes (bytes): The input image in bytes.
+def run_ocr_roi(image_bytes: bytes, model_path: str | None = None, fallback: bool = True,
+                regions: List[Dict[str, Any]] | None = None) -> Dict[str, Any]:
+    """OCR solo sobre los recortes de los campos que detecta YOLO.
 
-    Returns:
-        np.ndarray: The decoded image as a NumPy array.
+    El texto de cada recorte va directo a parse_ticket_fields; el OCR de página completa
+    (run_ocr) corre únicamente si falta algún campo, y solo rellena los que faltan.
+    `regions` permite reutilizar una detección ya hecha por detect_fields_batch.
     """
-    image_array = np.frombuffer(image_bytes, np.uint8)
-    return cv2.imdecode(image_array, cv2.IMREAD_COLOR)
+    t_wall = time.perf_counter()
+    img = _roi_page(image_bytes)
+    t0 = time.perf_counter()
+    if regions is None:
+        regions = _field_detector(model_path).detect_regions(img, conf=settings.yolo_conf)
+        detect_ms = (time.perf_counter() - t0) * 1000.0
+    else:
+        detect_ms = None  # medido en el lote, no por imagen
+
+    crops_text: Dict[str, str] = {}
+    blocks = []
+    confs = []
+    t0 = time.perf_counter()
+    for label, region in _best_per_label(regions).items():
+        x1, y1, x2, y2 = _pad_box(region["bbox"], img.shape, settings.roi_pad_px)
+        if x2 <= x1 or y2 <= y1:
+            continue
+        ocr_blocks = read_ndarray(to_rgb(img[y1:y2, x1:x2]))
+        crops_text[label] = "\n".join(b[1] for b in ocr_blocks if b and len(b) == 3)
+        for bbox, text, conf in ocr_blocks:
+            # cajas del recorte -> coordenadas de la página
+            page_bbox = [[float(px) + x1, float(py) + y1] for px, py in bbox]
+            blocks.append({"bbox": page_bbox, "text": text, "confidence": float(conf), "field": label})
+            confs.append(float(conf))
+    roi_ms = (time.perf_counter() - t0) * 1000.0
+
+    fields = format_ticket_fields(parse_ticket_fields(crops_text))
+    missing = [k for k in FIELD_CLASSES if not fields.get(k)]
+    full = None
+    if missing and fallback:
+        full = run_ocr(image_bytes)
+        page_fields = extract_ticket_fields(full.get("full_text"))
+        for k in missing:
+            fields[k] = page_fields.get(k)
+
+    results: Dict[str, Any] = {
+        "fields": fields,
+        "regions": regions,
+        "roi_missing": missing,
+        "roi_fallback": full is not None,
+        "detect_ms": detect_ms,
+        "roi_ocr_ms": roi_ms,
+        "exec_mode": "roi",
+    }
+    if full is not None:
+        # se guarda el resultado de página completa (bloques y texto para búsqueda)
+        results.update({k: v for k, v in full.items() if k not in ("detect_ms", "exec_mode")})
+    else:
+        results.update({
+            "best_preset": "roi",
+            "rotation_deg": 0.0,
+            "confidence_mean": float(np.mean(confs)) if confs else 0.0,
+            "blocks": blocks,
+            "full_text": "\n".join(crops_text[k] for k in FIELD_CLASSES if crops_text.get(k)),
+            "variant_metrics": [],
+        })
+    results["wall_time_ms"] = float((time.perf_counter() - t_wall) * 1000.0)
+    return results
@@ -477,3 +477,59 @@ def parse_ticket_text(full_text: str):
         "salida_hora": salida_hora,
     }
 
+
+def _crop_lines(text: str | None):
+    return [l.strip() for l in (text or "").splitlines() if l.strip()]
+
+def _date_time_from_crop(text: str | None):
+    fecha = hora = None
+    for ln in _crop_lines(text):
+        if fecha is None:
+            d = _normalize_date_token(ln) or _normalize_date_token_loose(ln)
+            if d:
+                fecha = d
+                continue
+        if hora is None:
+            hora = _normalize_time_token(ln)
+    return fecha, hora
+
+def parse_ticket_fields(crops: dict):
+    """Como parse_ticket_text, pero a partir del texto de cada recorte del detector de campos.
+
+    crops: {"ticket_num": ..., "placa": ..., "peso_neto": ..., "ingreso_fecha_hora": ...,
+    "salida_fecha_hora": ...}; las claves ausentes quedan en None.
+    """
+    ticket_num = None
+    t = crops.get("ticket_num")
+    if t:
+        m = re.search(r"(?<!\d)(\d{6,12})(?!\d)", re.sub(r"(?<=\d)\s+(?=\d)", "", t))
+        ticket_num = m.group(1) if m else None
+
+    placa = None
+    t = (crops.get("placa") or "").upper()
+    if t:
+        placa = _first_group(PLACA_RX, t)
+        if not placa:
+            m = re.search(r"\b([A-Z0-9]{3})[\s\-_.]?([A-Z0-9]{3,4})\b", t)
+            placa = f"{m.group(1)}-{m.group(2)}" if m else None
+
+    peso_neto = None
+    t = crops.get("peso_neto")
+    if t:
+        # el recorte solo trae el número (con o sin separadores de miles y 'Kg')
+        m = re.search(r"\d[\d.,\s]*\d|\d", t)
+        val = _norm_number(m.group(0)) if m else None
+        peso_neto = f"{int(val)} Kg" if val is not None else None
+
+    ingreso_fecha, ingreso_hora = _date_time_from_crop(crops.get("ingreso_fecha_hora"))
+    salida_fecha, salida_hora = _date_time_from_crop(crops.get("salida_fecha_hora"))
+
+    return {
+        "ticket_num": ticket_num,
+        "placa": placa,
+        "peso_neto": peso_neto,
+        "ingreso_fecha": ingreso_fecha,
+        "ingreso_hora": ingreso_hora,
+        "salida_fecha": salida_fecha,
+        "salida_hora": salida_hora,
+    }
@@ -1,6 +1,11 @@
+import threading
+from functools import lru_cache
+
 import cv2
 import numpy as np
 
+from ..config import settings
+
 def imdecode_bytes(image_bytes: bytes):
     arr = np.frombuffer(image_bytes, dtype=np.uint8)
     img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
@@ -29,27 +34,83 @@ def _rotate_bound(image, angle):
     M[1, 2] += (nH / 2) - cY
     return cv2.warpAffine(image, M, (nW, nH), flags=cv2.INTER_LINEAR)
 
-def deskew(img):
+def estimate_skew_hough(img) -> float:
+    # método original: NL-means + Canny + HoughLines sobre la imagen completa (lento)
     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
     gray = cv2.fastNlMeansDenoising(gray, h=3)
     edges = cv2.Canny(gray, 50, 150, apertureSize=3)
     lines = cv2.HoughLines(edges, 1, np.pi / 180, 150)
     if lines is None:
-        return img, 0.0
+        return 0.0
     angles = []
     for rho, theta in lines[:, 0]:
         angle = (theta * 180 / np.pi) - 90
         if -45 <= angle <= 45:
             angles.append(angle)
     if not angles:
+        return 0.0
+    return float(np.median(angles))
+
+def estimate_skew_projection(img, thumb: int = 600, max_angle: float = 15.0, coarse: float = 0.5, fine: float = 0.05,
+                             margin: float = 0.2) -> float:
+    """Ángulo que endereza las líneas de texto, por perfil de proyección sobre una miniatura.
+
+    Binariza el centro de la miniatura (sin el `margin` de cada borde: fondo, dedos, bordes de
+    la foto) y busca el giro cuyo perfil horizontal tiene los cambios más bruscos (líneas de
+    texto alineadas con las filas): primero cada `coarse` grados en ±max_angle y luego cada
+    `fine` alrededor del mejor. El perfil se arma proyectando las coordenadas de los píxeles de
+    tinta, sin rotar la imagen: interpolar favorecería el ángulo 0. Mismo signo que
+    cv2.getRotationMatrix2D.
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    h, w = gray.shape
+    scale = thumb / max(h, w)
+    if scale < 1:
+        gray = cv2.resize(gray, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+    th, tw = gray.shape
+    my, mx = int(th * margin), int(tw * margin)
+    gray = gray[my:th - my, mx:tw - mx]
+    bw = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 15, 10)
+    ys, xs = np.nonzero(bw)
+    if len(xs) == 0:
+        return 0.0
+    xs = xs - bw.shape[1] / 2
+    ys = ys - bw.shape[0] / 2
+    offset = np.hypot(*bw.shape) / 2 + 1
+    bins = int(2 * offset) + 1
+
+    def score(angle):
+        t = np.deg2rad(angle)
+        rows = (ys * np.cos(t) - xs * np.sin(t) + offset).astype(np.int64)
+        profile = np.bincount(rows, minlength=bins).astype(np.float64)
+        return float(np.sum(np.diff(profile) ** 2))
+
+    best = max(np.arange(-max_angle, max_angle + 1e-6, coarse), key=score)
+    best = max(np.arange(best - coarse, best + coarse + 1e-6, fine), key=score)
+    return round(float(best), 2)
+
+def deskew(img, method: str | None = None):
+    method = method or settings.deskew_method
+    if method == "hough":
+        angle = estimate_skew_hough(img)
+    else:
+        angle = estimate_skew_projection(img, max_angle=settings.deskew_max_angle)
+    if abs(angle) < 0.05:
         return img, 0.0
-    median = float(np.median(angles))
-    rotated = _rotate_bound(img, median)
-    return rotated, median
+    # un solo warp sobre la imagen a resolución completa
+    return _rotate_bound(img, angle), angle
+
+_local = threading.local()
+
+def _clahe():
+    # cv2.CLAHE no es thread-safe: uno por hilo, reutilizado entre requests
+    c = getattr(_local, "clahe", None)
+    if c is None:
+        c = _local.clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    return c
 
 def clahe_gray(gray):
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-    return clahe.apply(gray)
+    return _clahe().apply(gray)
 
 def adaptive_thresh(gray):
     return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 9)
@@ -59,28 +120,94 @@ def unsharp_gray(gray):
     sharp = cv2.addWeighted(gray, 1.5, blur, -0.5, 0)
     return sharp
 
-def adjust_gamma(img, gamma=1.1):
+@lru_cache(maxsize=16)
+def _gamma_lut(gamma: float) -> np.ndarray:
     inv = 1.0 / max(gamma, 1e-6)
-    table = np.array([(i / 255.0) ** inv * 255 for i in np.arange(0, 256)]).astype("uint8")
-    return cv2.LUT(img, table)
+    table = ((np.arange(256) / 255.0) ** inv * 255).astype("uint8")
+    table.flags.writeable = False
+    return table
+
+def adjust_gamma(img, gamma=1.1):
+    return cv2.LUT(img, _gamma_lut(float(gamma)))
 
 def to_gray(img):
     return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
-def build_variants(image_bytes: bytes):
+# Grafo de preprocesado: nodo -> (función, nodo de entrada). "base" es la imagen decodificada,
+# reducida y enderezada. Los presets son nodos hoja; los intermedios comunes (gray, clahe) se
+# calculan una sola vez por request.
+NODES = {
+    "rgb": (to_rgb, "base"),
+    "gray": (to_gray, "base"),
+    "clahe": (clahe_gray, "gray"),
+    "clahe_thresh": (adaptive_thresh, "clahe"),
+    "unsharp": (unsharp_gray, "clahe"),
+    "unsharp_clahe_thresh": (adaptive_thresh, "unsharp"),
+    "gamma12": (lambda img: adjust_gamma(img, 1.2), "base"),
+    "gamma12_gray": (to_gray, "gamma12"),
+    "gamma12_clahe": (clahe_gray, "gamma12_gray"),
+    "gamma12_clahe_thresh": (adaptive_thresh, "gamma12_clahe"),
+}
+# preset -> nodo que lo produce, en el orden por defecto
+PRESETS = {
+    "original": "rgb",
+    "clahe_thresh": "clahe_thresh",
+    "unsharp_clahe_thresh": "unsharp_clahe_thresh",
+    "gamma12_clahe_thresh": "gamma12_clahe_thresh",
+}
+
+def _lineage(node: str) -> list[str]:
+    out = []
+    while node != "base":
+        out.append(node)
+        node = NODES[node][1]
+    return out
+
+class VariantGraph:
+    """Evalúa los presets bajo demanda.
+
+    Cada nodo se calcula como mucho una vez y se suelta en cuanto ningún preset pendiente
+    lo necesita, así el pico de memoria es el de una rama y no el de los cuatro presets.
+    """
+
+    def __init__(self, base, presets=None):
+        self.presets = list(presets or PRESETS)
+        self._cache = {"base": base}
+        # cuántos presets pendientes dependen de cada nodo
+        self._pending: dict[str, int] = {"base": len(self.presets)}
+        for name in self.presets:
+            for node in _lineage(PRESETS[name]):
+                self._pending[node] = self._pending.get(node, 0) + 1
+
+    def get(self, node: str):
+        if node not in self._cache:
+            fn, parent = NODES[node]
+            self._cache[node] = fn(self.get(parent))
+        return self._cache[node]
+
+    def preset(self, name: str):
+        return self.get(PRESETS[name])
+
+    def _release(self, name: str):
+        for node in _lineage(PRESETS[name]) + ["base"]:
+            self._pending[node] -= 1
+            if self._pending[node] <= 0:
+                self._cache.pop(node, None)
+
+    def variants(self, order=None):
+        """Genera (preset, imagen) en `order`; solo calcula lo que se llega a consumir."""
+        for name in (order or self.presets):
+            img = self.preset(name)
+            self._release(name)
+            yield name, img
+
+def prepare(image_bytes: bytes):
     img = imdecode_bytes(image_bytes)
     img = resize_max_side(img, 1600)
     base, angle = deskew(img)
-    variants = []
-    variants.append(("original", to_rgb(base)))
-    g = to_gray(base)
-    g1 = clahe_gray(g)
-    v1 = adaptive_thresh(g1)
-    variants.append(("clahe_thresh", v1))
-    g2 = unsharp_gray(g1)
-    v2 = adaptive_thresh(g2)
-    variants.append(("unsharp_clahe_thresh", v2))
-    g3 = to_gray(adjust_gamma(base, 1.2))
-    v3 = adaptive_thresh(clahe_gray(g3))
-    variants.append(("gamma12_clahe_thresh", v3))
-    return variants, angle
+    return VariantGraph(base), angle
+
+def build_variants(image_bytes: bytes):
+    # versión eager (lista completa), para quien necesite todas las variantes a la vez
+    graph, angle = prepare(image_bytes)
+    return list(graph.variants()), angle
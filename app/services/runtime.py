@@ -0,0 +1,94 @@
+import gc
+import logging
+import os
+import sys
+
+from ..config import settings
+
+log = logging.getLogger(__name__)
+
+_applied: dict | None = None
+
+def thread_budget(web_workers: int | None = None) -> dict:
+    """Hilos por proceso: lo configurado, o los núcleos repartidos entre los workers web."""
+    workers = max(1, web_workers or settings.web_workers)
+    share = max(1, (os.cpu_count() or 1) // workers)
+    return {
+        "intra": settings.torch_intra_threads or share,
+        "interop": settings.torch_interop_threads or share,
+        "cv2": settings.cv2_threads or share,
+    }
+
+def thread_env(budget: dict) -> dict:
+    # OpenMP/MKL leen estas variables al cargar la librería: hay que fijarlas antes de importar
+    # torch (en el proceso padre, para que los workers de uvicorn las hereden)
+    return {"OMP_NUM_THREADS": str(budget["intra"]), "MKL_NUM_THREADS": str(budget["intra"])}
+
+def uses_torch() -> bool:
+    """True si este proceso corre (o ya cargó) torch: Reader easyocr tal cual o YOLO con pesos .pt.
+
+    Con OCR_BACKEND=onnx/onnx-int8 importar torch solo para fijarle hilos cuesta segundos y memoria.
+    """
+    return (settings.ocr_backend == "torch" or (settings.warmup_yolo and settings.yolo_backend == "torch")
+            or "torch" in sys.modules)
+
+def configure_threads() -> dict:
+    """Aplica los hilos de torch y OpenCV a este proceso (una sola vez), antes de cargar el Reader."""
+    global _applied
+    if _applied is not None:
+        return _applied
+    budget = thread_budget()
+    for k, v in thread_env(budget).items():
+        os.environ.setdefault(k, v)
+    import cv2
+    if uses_torch():
+        import torch
+        torch.set_num_threads(budget["intra"])
+        try:
+            torch.set_interop_threads(budget["interop"])
+        except RuntimeError:
+            # solo se puede fijar antes del primer trabajo inter-op del proceso
+            log.warning("torch ya inició su pool inter-op; se mantiene en %d hilos", torch.get_num_interop_threads())
+    cv2.setNumThreads(budget["cv2"])
+    _applied = budget
+    log.info("hilos por proceso: torch intra=%d interop=%d, cv2=%d", budget["intra"], budget["interop"], budget["cv2"])
+    return budget
+
+def _freeze_module(net):
+    # eval (BatchNorm no actualiza estadísticas) y sin gradientes: la inferencia no escribe
+    # en los tensores de pesos, así que sus páginas siguen compartidas tras el fork
+    net.eval()
+    for p in net.parameters():
+        p.requires_grad_(False)
+
+def preload_models() -> list[str]:
+    """Carga los modelos en el proceso padre, antes de hacer fork de los workers.
+
+    Sin inferencia y con torch en un solo hilo: el pool de OpenMP no debe existir al hacer fork
+    (los hijos se colgarían en la primera inferencia). Cada worker fija sus hilos con
+    configure_threads al arrancar.
+    """
+    if uses_torch():
+        import torch
+        torch.set_num_threads(1)
+    loaded = []
+    if settings.ocr_backend == "torch":
+        from .ocr_reader import get_reader
+        reader = get_reader()
+        _freeze_module(reader.detector)
+        _freeze_module(reader.recognizer)
+        loaded.append("reader")
+    else:
+        # las sesiones de onnxruntime crean hilos al construirse: cada worker carga la suya
+        log.warning("OCR_BACKEND=%s no se precarga; cada worker carga su Reader", settings.ocr_backend)
+    if settings.warmup_yolo and settings.yolo_backend == "torch":
+        from .ocr_run import _field_detector
+        detector = _field_detector()
+        # ultralytics fusiona Conv+BN en la primera predicción; hecho aquí, los hijos no copian pesos
+        detector.model.fuse()
+        _freeze_module(detector.model.model)
+        loaded.append("yolo")
+    # objetos actuales a la generación permanente: el GC de los hijos no toca sus cabeceras
+    gc.collect()
+    gc.freeze()
+    return loaded
@@ -0,0 +1,104 @@
+import re
+from datetime import datetime
+
+from .parse_ticket import parse_ticket_text
+from ..utils.dates import format_ddmmyyyy, format_time_pmam
+
+# Subir este número cuando cambie la extracción: migrations vuelve a parsear los documentos
+# con una versión anterior.
+TICKET_FIELDS_VERSION = 1
+
+# peso neto de un camión en balanza; fuera de rango es un error de OCR (dígitos pegados de otra
+# línea) y no cabe necesariamente en BIGINT
+PESO_NETO_MAX_KG = 200_000
+
+def _kg_to_int_str(s: str | None) -> str | None:
+    if not s:
+        return None
+    digits = re.sub(r"\D", "", s)
+    return str(int(digits)) if digits else None
+
+def _combine_date_time(date_str: str | None, time_str: str | None) -> str | None:
+    """
+    date_str: 'dd/mm/yyyy'
+    time_str: 'HH:MM' ó 'HH:MM a.m/p.m'
+    return:  'dd-mm-yyyy HH:MM:00' (24h)
+    """
+    if not date_str or not time_str:
+        return None
+
+    # normaliza fecha a 'dd-mm-yyyy'
+    ds = date_str.strip().replace("/", "-")
+
+    # extrae hora y posible am/pm
+    m = re.match(r"^\s*(\d{2}):(\d{2})(?:\s*([ap])\.?\s*m\.?)?\s*$", time_str, re.IGNORECASE)
+    if not m:
+        return None
+    hh = int(m.group(1)); mm = int(m.group(2))
+    ap = (m.group(3) or "").lower()
+
+    # convierte a 24h si hay am/pm
+    if ap == "p" and hh < 12:
+        hh += 12
+    if ap == "a" and hh == 12:
+        hh = 0
+
+    return f"{ds} {hh:02d}:{mm:02d}:00"
+
+def extract_ticket_fields(full_text: str | None) -> dict:
+    """Campos del ticket tal como los devuelve la API (strings ya formateados)."""
+    return format_ticket_fields(parse_ticket_text(full_text or ""))
+
+def format_ticket_fields(parsed: dict) -> dict:
+    # salida de parse_ticket_text / parse_ticket_fields -> formato de la API
+    ingreso_fecha_fmt = format_ddmmyyyy(parsed.get("ingreso_fecha"))
+    salida_fecha_fmt = format_ddmmyyyy(parsed.get("salida_fecha"))
+    ingreso_hora_fmt = format_time_pmam(parsed.get("ingreso_hora"))
+    salida_hora_fmt = format_time_pmam(parsed.get("salida_hora"))
+    return {
+        "ticket_num": parsed.get("ticket_num"),
+        "placa": parsed.get("placa"),
+        "peso_neto": _kg_to_int_str(parsed.get("peso_neto")),  # sin 'Kg'
+        "ingreso_fecha_hora": _combine_date_time(ingreso_fecha_fmt, ingreso_hora_fmt),
+        "salida_fecha_hora": _combine_date_time(salida_fecha_fmt, salida_hora_fmt),
+    }
+
+def normalize_placa(placa: str | None) -> str | None:
+    # 'bzu 890' / 'BZU890' / 'BZU-890' -> 'BZU-890', igual al guardar y al consultar
+    if not placa:
+        return None
+    s = re.sub(r"[^A-Z0-9]", "", placa.upper())
+    if not s:
+        return None
+    return f"{s[:3]}-{s[3:]}" if len(s) == 6 else s
+
+def _to_datetime(s: str | None) -> datetime | None:
+    if not s:
+        return None
+    try:
+        return datetime.strptime(s, "%d-%m-%Y %H:%M:%S")
+    except ValueError:
+        return None
+
+def _peso_kg(peso: str | None) -> int | None:
+    try:
+        kg = int(peso) if peso else None
+    except ValueError:
+        return None
+    return kg if kg is not None and 0 < kg <= PESO_NETO_MAX_KG else None
+
+def ticket_columns(fields: dict) -> dict:
+    """Campos formateados -> columnas tipadas de Document.
+
+    Las fechas son hora local de la balanza (sin zona), igual que en el ticket.
+    """
+    peso = fields.get("peso_neto")
+    ticket_num = fields.get("ticket_num")
+    return {
+        "ticket_num": ticket_num[:50] if ticket_num else None,
+        "placa": normalize_placa(fields.get("placa")),
+        "peso_neto_kg": _peso_kg(peso),
+        "ingreso_at": _to_datetime(fields.get("ingreso_fecha_hora")),
+        "salida_at": _to_datetime(fields.get("salida_fecha_hora")),
+        "fields_version": TICKET_FIELDS_VERSION,
+    }
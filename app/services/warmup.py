@@ -0,0 +1,83 @@
+import logging
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from ..config import settings
+
+log = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_thread: threading.Thread | None = None
+_state = {"ready": False, "error": None, "steps_ms": {}, "started_at": None, "finished_at": None}
+
+def _dummy_page():
+    # página blanca con una línea de texto: el detector encuentra cajas y el reconocedor corre
+    img = np.full((240, 800, 3), 255, np.uint8)
+    cv2.putText(img, "TICKET 65825533 BTS-726", (20, 130), cv2.FONT_HERSHEY_SIMPLEX, 1.4, (0, 0, 0), 3)
+    return img
+
+def _step(name: str, fn):
+    t0 = time.perf_counter()
+    fn()
+    ms = round((time.perf_counter() - t0) * 1000, 1)
+    with _lock:
+        _state["steps_ms"][name] = ms
+    log.info("warm-up %s: %.0f ms", name, ms)
+
+def _warm_pool(img):
+    from .ocr_pool import submit_variant
+    # cada worker del pool carga su propio Reader al arrancar; una tarea por worker
+    futures = [submit_variant("warmup", img) for _ in range(max(1, settings.ocr_pool_size))]
+    for f in futures:
+        f.result()
+
+def run_warmup():
+    """Carga los modelos y hace una inferencia de prueba con cada uno."""
+    from .ocr_reader import read_ndarray
+    page = _dummy_page()
+    rgb = cv2.cvtColor(page, cv2.COLOR_BGR2RGB)
+    parallel = settings.ocr_exec_mode == "parallel"
+    # en modo parallel el OCR de página completa (y su detección) corre en el pool; el
+    # Reader del proceso principal solo hace falta para los recortes del modo roi
+    if not parallel or settings.warmup_yolo:
+        _step("reader", lambda: read_ndarray(rgb))
+    if parallel:
+        _step("pool", lambda: _warm_pool(rgb))
+    if settings.warmup_yolo:
+        from .ocr_run import _field_detector
+        _step("yolo", lambda: _field_detector().detect_regions(page, conf=settings.yolo_conf))
+
+def _run():
+    try:
+        run_warmup()
+        with _lock:
+            _state["ready"] = True
+    except Exception as e:
+        # sin modelos no hay tráfico: /ready queda en 503 con el error
+        log.exception("falló el warm-up")
+        with _lock:
+            _state["error"] = str(e)
+    finally:
+        with _lock:
+            _state["finished_at"] = time.time()
+
+def start_warmup():
+    """Lanza el warm-up en un hilo aparte (el servidor acepta /health mientras tanto)."""
+    global _thread
+    with _lock:
+        if _thread is not None or _state["ready"]:
+            return
+        _state["started_at"] = time.time()
+        if not settings.warmup_enabled:
+            _state["ready"] = True
+            _state["finished_at"] = _state["started_at"]
+            return
+        _thread = threading.Thread(target=_run, name="warmup", daemon=True)
+        _thread.start()
+
+def warmup_status() -> dict:
+    with _lock:
+        return {**_state, "steps_ms": dict(_state["steps_ms"])}
@@ -1,25 +1,95 @@
-import cv2
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from functools import lru_cache
+from pathlib import Path
+
 import numpy as np
-import torch
-from ultralytics import YOLO
+
+log = logging.getLogger(__name__)
+
+# clases de dataset/dataset.yaml, en el orden con que se entrenó runs/detect/train4
+FIELD_CLASSES = ("ticket_num", "placa", "peso_neto", "ingreso_fecha_hora", "salida_fecha_hora")
+
+YOLO_BACKENDS = ("torch", "onnx")
 
 class YOLODetector:
-    def __init__(self, model_path: str = 'yolov5s'):
-        self.model = YOLO(model_path)
+    def __init__(self, model_path: str = 'yolov5s', imgsz: int = 640):
+        # ultralytics (y torch) se importan recién aquí: solo mode=roi los necesita
+        from ultralytics import YOLO
+        # ultralytics elige el runtime por la extensión: .pt (PyTorch) o .onnx (onnxruntime)
+        self.model = YOLO(model_path, task="detect")
+        self.imgsz = imgsz
+        # la instancia se comparte entre los hilos del executor y el predictor de ultralytics
+        # guarda estado por llamada (imágenes, resultados): una predicción a la vez
+        self._lock = threading.Lock()
+        names = getattr(self.model, "names", None) or {}
+        self.names = {int(k): v for k, v in dict(names).items()} or dict(enumerate(FIELD_CLASSES))
 
-    def detect_regions(self, image: np.ndarray):
-        results = self.model.predict(image)
+    def _regions(self, result):
         regions = []
-        for result in results:
-            for box in result.boxes:
-                x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
-                regions.append({
-                    "bbox": (x1, y1, x2, y2),
-                    "confidence": float(box.conf),
-                    "class": int(box.cls)
-                })
+        for box in result.boxes:
+            x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
+            cls = int(box.cls)
+            regions.append({
+                "bbox": (x1, y1, x2, y2),
+                "confidence": float(box.conf),
+                "class": cls,
+                "label": self.names.get(cls, str(cls)),
+            })
         return regions
 
-# Example usage:
-# detector = YOLODetector('path/to/yolo_model.pt')
-# regions = detector.detect_regions(image)
\ No newline at end of file
+    def detect_regions(self, image: np.ndarray, conf: float = 0.25):
+        with self._lock:
+            results = self.model.predict(image, conf=conf, imgsz=self.imgsz, verbose=False)
+        return [r for result in results for r in self._regions(result)]
+
+    def detect_regions_batch(self, images: list[np.ndarray], conf: float = 0.25, batch_size: int = 8):
+        """Una lista de regiones por imagen, en el mismo orden; infiere de a batch_size imágenes."""
+        out = []
+        for i in range(0, len(images), max(1, batch_size)):
+            chunk = images[i:i + max(1, batch_size)]
+            with self._lock:
+                results = self.model.predict(chunk, conf=conf, imgsz=self.imgsz, verbose=False)
+            out.extend(self._regions(result) for result in results)
+        return out
+
+def export_onnx(model_path: str, imgsz: int = 640) -> str:
+    """Exporta los pesos .pt a .onnx al lado del original (si no existe ya) y devuelve la ruta.
+
+    dynamic=True deja libre el tamaño de lote, necesario para detect_regions_batch.
+    """
+    src = Path(model_path)
+    if src.suffix == ".onnx":
+        return str(src)
+    dst = src.with_suffix(".onnx")
+    if dst.exists() and dst.stat().st_mtime >= src.stat().st_mtime:
+        return str(dst)
+    from ultralytics import YOLO
+    log.info("exportando %s a ONNX (imgsz=%d)", src, imgsz)
+    # ultralytics escribe el .onnx junto a los pesos que recibe: se exporta una copia en un
+    # directorio temporal y el resultado se mueve con un rename, así nadie carga un archivo a medias
+    work = tempfile.mkdtemp(dir=src.parent, prefix=".export-")
+    try:
+        tmp_src = shutil.copy2(src, os.path.join(work, src.name))
+        os.replace(YOLO(tmp_src).export(format="onnx", imgsz=imgsz, dynamic=True), dst)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    return str(dst)
+
+@lru_cache(maxsize=4)
+def get_detector(model_path: str, backend: str = "torch", imgsz: int = 640) -> YOLODetector:
+    # cargar los pesos cuesta segundos: una instancia por modelo/backend y proceso
+    if backend not in YOLO_BACKENDS:
+        raise ValueError(f"backend YOLO desconocido: {backend!r} (use {', '.join(YOLO_BACKENDS)})")
+    if not Path(model_path).is_file():
+        # los pesos no se versionan: sin esto ultralytics intenta descargarlos por nombre
+        raise FileNotFoundError(
+            f"no existe el modelo YOLO {model_path!r}: entrenar con dataset/dataset.yaml "
+            f"o apuntar YOLO_MODEL_PATH a un best.pt / .onnx existente"
+        )
+    if backend == "onnx":
+        model_path = export_onnx(model_path, imgsz)
+    return YOLODetector(model_path, imgsz)
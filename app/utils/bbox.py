@@ -0,0 +1,42 @@
+import re
+import struct
+
+# Polígono de EasyOCR (4 vértices [x, y]) como float32 little-endian: 32 bytes por bloque
+_NP_SCALAR_RX = re.compile(r"np\.\w+\(([^()]*)\)")
+_NUM_RX = re.compile(r"-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?")
+
+def pack_poly(bbox) -> bytes | None:
+    if bbox is None:
+        return None
+    flat = [float(v) for pt in bbox for v in pt]
+    return struct.pack(f"<{len(flat)}f", *flat)
+
+def unpack_poly(blob: bytes | None):
+    if not blob:
+        return None
+    flat = struct.unpack(f"<{len(blob) // 4}f", blob)
+    vals = [int(v) if float(v).is_integer() else float(v) for v in flat]
+    return [[vals[i], vals[i + 1]] for i in range(0, len(vals), 2)]
+
+def bounds(bbox):
+    if not bbox:
+        return None
+    xs = [float(pt[0]) for pt in bbox]
+    ys = [float(pt[1]) for pt in bbox]
+    return min(xs), min(ys), max(xs), max(ys)
+
+def bbox_columns(bbox) -> dict:
+    """Valores de columnas de OcrBlock para un bbox de EasyOCR."""
+    b = bounds(bbox)
+    if b is None:
+        return {"x_min": None, "y_min": None, "x_max": None, "y_max": None, "bbox_poly": None}
+    return {"x_min": b[0], "y_min": b[1], "x_max": b[2], "y_max": b[3], "bbox_poly": pack_poly(bbox)}
+
+def parse_legacy_bbox(text: str | None):
+    """Convierte el str() guardado antes (p. ej. '[[np.int32(711), ...]]') en lista de vértices."""
+    if not text:
+        return None
+    nums = [float(n) for n in _NUM_RX.findall(_NP_SCALAR_RX.sub(r"\1", text))]
+    if not nums or len(nums) % 2:
+        return None
+    return [[nums[i], nums[i + 1]] for i in range(0, len(nums), 2)]
@@ -0,0 +1,137 @@
+from typing import NamedTuple
+
+try:
+    from python_multipart.exceptions import FormParserError
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.exceptions import FormParserError
+    from multipart.multipart import MultipartParser, parse_options_header
+
+from .storage import Spooler, SpooledFile, UploadTooLarge, discard
+
+class MultipartError(Exception):
+    pass
+
+class UploadedPart(NamedTuple):
+    field: str
+    filename: str
+    content_type: str
+    spool: SpooledFile | None  # None: superó max_file_bytes y se descartó lo recibido
+
+def _decode(value: bytes) -> str:
+    return value.decode("utf-8", errors="replace")
+
+class _SpoolingParser:
+    """Callbacks de python-multipart: cada archivo va directo a su Spooler mientras llega el cuerpo.
+
+    Los campos de texto se ignoran (los parámetros de la API van en la query).
+    """
+
+    def __init__(self, base_dir: str, max_file_bytes: int, max_files: int):
+        self.base_dir = base_dir
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.parts: list[UploadedPart] = []
+        self._header_name = b""
+        self._header_value = b""
+        self._headers: dict[bytes, bytes] = {}
+        self._field = ""
+        self._filename: str | None = None
+        self._spooler: Spooler | None = None
+        self._too_large = False
+
+    def on_part_begin(self):
+        self._headers = {}
+        self._filename = None
+        self._spooler = None
+        self._too_large = False
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if b"name" not in options:
+            raise MultipartError("Falta el nombre del campo en Content-Disposition")
+        self._field = _decode(options[b"name"])
+        if b"filename" not in options:
+            return
+        if len(self.parts) >= self.max_files:
+            raise MultipartError(f"Demasiados archivos (máximo {self.max_files})")
+        self._filename = _decode(options[b"filename"])
+        self._spooler = Spooler(self.base_dir, self.max_file_bytes)
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._spooler is None or self._too_large:
+            return
+        try:
+            self._spooler.write(data[start:end])
+        except UploadTooLarge:
+            # el resto de esta parte se lee y se descarta; las demás se siguen guardando
+            self._too_large = True
+            self._spooler.abort()
+
+    def on_part_end(self):
+        if self._spooler is None:
+            return
+        spool = None if self._too_large else self._spooler.finish()
+        content_type = _decode(self._headers.get(b"content-type", b""))
+        self.parts.append(UploadedPart(self._field, self._filename, content_type, spool))
+        self._spooler = None
+
+    def end(self):
+        # el cuerpo terminó a mitad de un archivo
+        if self._spooler is not None:
+            raise MultipartError("Cuerpo multipart incompleto")
+
+    def abort(self):
+        if self._spooler is not None:
+            self._spooler.abort()
+        discard_parts(self.parts)
+
+def discard_parts(parts: list[UploadedPart]):
+    for part in parts:
+        if part.spool is not None:
+            discard(part.spool.path)
+
+async def spool_multipart(headers, stream, base_dir: str, max_file_bytes: int, max_files: int = 1000) -> list[UploadedPart]:
+    """Parsea un cuerpo multipart/form-data escribiendo cada archivo a un spool en base_dir.
+
+    A diferencia de request.form(), no hay una copia intermedia en un SpooledTemporaryFile y el
+    límite por archivo se aplica mientras se recibe: un archivo que lo pasa deja de escribirse
+    en ese momento (queda con spool=None). Ante un error o una desconexión se borran los spools.
+    """
+    content_type = headers.get("content-type", "")
+    ctype, params = parse_options_header(content_type)
+    if ctype != b"multipart/form-data" or b"boundary" not in params:
+        raise MultipartError("Se esperaba multipart/form-data")
+    sp = _SpoolingParser(base_dir, max_file_bytes, max_files)
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": sp.on_part_begin,
+        "on_part_data": sp.on_part_data,
+        "on_part_end": sp.on_part_end,
+        "on_header_field": sp.on_header_field,
+        "on_header_value": sp.on_header_value,
+        "on_header_end": sp.on_header_end,
+        "on_headers_finished": sp.on_headers_finished,
+    })
+    try:
+        async for chunk in stream:
+            parser.write(chunk)
+        parser.finalize()
+        sp.end()
+    except FormParserError as e:
+        sp.abort()
+        raise MultipartError(str(e)) from e
+    except BaseException:
+        sp.abort()
+        raise
+    return sp.parts
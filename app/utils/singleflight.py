@@ -0,0 +1,35 @@
+import threading
+from concurrent.futures import Future
+
+class SingleFlight:
+    """Coalesce llamadas concurrentes con la misma clave: una ejecuta, el resto espera su resultado."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict = {}
+
+    def do(self, key, fn):
+        """Devuelve (resultado, compartido); compartido=True si se reutilizó el cálculo de otro hilo."""
+        with self._lock:
+            fut = self._calls.get(key)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._calls[key] = fut
+        if not leader:
+            return fut.result(), True
+        try:
+            res = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(res)
+            return res, False
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
@@ -1,15 +1,100 @@
 import os
+import hashlib
+import tempfile
+from contextlib import contextmanager
 from pathlib import Path
+from typing import NamedTuple
+
+CHUNK_SIZE = 1024 * 1024
 
 def ensure_dir(path: str):
     Path(path).mkdir(parents=True, exist_ok=True)
 
+def _safe_name(filename: str) -> str:
+    return filename.replace("..", "_").replace("\\", "_").replace("/", "_")
+
 def save_bytes(base_dir: str, filename: str, content: bytes) -> str | None:
     if not base_dir:
         return None
     ensure_dir(base_dir)
-    safe = filename.replace("..", "_").replace("\\", "_").replace("/", "_")
+    safe = _safe_name(filename)
     full = os.path.join(base_dir, safe)
     with open(full, "wb") as f:
         f.write(content)
     return full
+
+def save_file(base_dir: str, filename: str, src_path: str) -> str | None:
+    """Mueve un archivo ya escrito (p. ej. un spool) a base_dir con un rename, sin reescribirlo."""
+    if not base_dir:
+        discard(src_path)
+        return None
+    ensure_dir(base_dir)
+    full = os.path.join(base_dir, _safe_name(filename))
+    os.replace(src_path, full)
+    return full
+
+@contextmanager
+def atomic_path(dst: str | Path):
+    """Ruta temporal junto a dst; al salir sin error se renombra a dst (os.replace, atómico).
+
+    Un proceso que muere a mitad de la escritura deja solo el temporal, nunca un dst truncado que
+    otro worker cargaría como válido.
+    """
+    dst = Path(dst)
+    tmp = dst.with_name(f".{dst.name}.{os.getpid()}.tmp")
+    try:
+        yield tmp
+        os.replace(tmp, dst)
+    finally:
+        discard(str(tmp))
+
+def discard(path: str | None):
+    if path:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+class UploadTooLarge(Exception):
+    pass
+
+class SpooledFile(NamedTuple):
+    path: str
+    sha256: str
+    size: int
+
+class Spooler:
+    """Escribe un upload a disco por chunks, calculando el SHA-256 y cortando al pasar max_bytes."""
+
+    def __init__(self, base_dir: str, max_bytes: int):
+        base_dir = base_dir or tempfile.gettempdir()
+        ensure_dir(base_dir)
+        # mismo directorio que el destino final: save_file es un rename atómico
+        fd, self.path = tempfile.mkstemp(dir=base_dir, prefix=".upload-", suffix=".part")
+        self._out = os.fdopen(fd, "wb")
+        self._hash = hashlib.sha256()
+        self.max_bytes = max_bytes
+        self.size = 0
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge()
+        self._hash.update(chunk)
+        self._out.write(chunk)
+
+    def finish(self) -> SpooledFile:
+        self._out.close()
+        return SpooledFile(self.path, self._hash.hexdigest(), self.size)
+
+    def abort(self):
+        self._out.close()
+        discard(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+        return False
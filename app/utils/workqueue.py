@@ -0,0 +1,71 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+class QueueFullError(Exception):
+    pass
+
+class BoundedExecutor:
+    """ThreadPoolExecutor con cupo: max_workers ejecutando + max_queue esperando.
+
+    Cuando no queda cupo, submit lanza QueueFullError en vez de encolar sin límite.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, name: str = "ocr"):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._pending = 0  # en cola + ejecutando
+        self._running = 0
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                raise QueueFullError()
+            self._pending += 1
+
+        started = False
+
+        def _wrapped():
+            nonlocal started
+            with self._lock:
+                started = True
+                self._running += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._pending -= 1
+
+        def _release_if_cancelled(_future):
+            # cancelada mientras esperaba en cola (cliente desconectado, shutdown): _wrapped no
+            # llega a correr y el cupo se libera aquí
+            with self._lock:
+                if not started:
+                    self._pending -= 1
+
+        try:
+            future = self._pool.submit(_wrapped)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(_release_if_cancelled)
+        return future
+
+    async def run(self, fn, *args, **kwargs):
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": self._running,
+                "queued": self._pending - self._running,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+            }
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
@@ -7,68 +7,42 @@ if str(ROOT) not in sys.path:
 # -----------------------------------------------------------------------------
 
 # scripts/batch_cli.py
-import os, re, json, time, argparse, mimetypes
+import os, json, time, argparse, mimetypes
 from typing import List, Dict
 
 # --- importa tus piezas existentes del proyecto ---
 from app.database import SessionLocal
 from app.config import settings
 from app.utils.storage import save_bytes
-from app.services.ocr_run import run_ocr
-from app.services.parse_ticket import parse_ticket_text
+from app.services.ocr_run import run_ocr, run_ocr_roi, detect_fields_batch
+from app.services.ticket_fields import extract_ticket_fields
+from app.services.runtime import configure_threads
 from app import crud
 
-# formateadores que ya usas en tu router
-from app.utils.dates import format_ddmmyyyy, format_time_pmam
-
-# -------- helpers de presentación (idénticos a los que te pasé) ----------
-def _kg_to_int_str(s: str | None) -> str | None:
-    if not s:
-        return None
-    digits = re.sub(r"\D", "", s)
-    return str(int(digits)) if digits else None
-
-def _combine_date_time(date_str: str | None, time_str: str | None) -> str | None:
-    """
-    date_str: 'dd/mm/yyyy'
-    time_str: 'HH:MM' ó 'HH:MM a.m/p.m'
-    return:  'dd-mm-yyyy HH:MM:00' (24h)
-    """
-    if not date_str or not time_str:
-        return None
-
-    # normaliza fecha a 'dd-mm-yyyy'
-    ds = date_str.strip().replace("/", "-")
-
-    # extrae hora y posible am/pm
-    m = re.match(r"^\s*(\d{2}):(\d{2})(?:\s*([ap])\.?\s*m\.?)?\s*$", time_str, re.IGNORECASE)
-    if not m:
-        return None
-    hh = int(m.group(1)); mm = int(m.group(2))
-    ap = (m.group(3) or "").lower()
-
-    # convierte a 24h si hay am/pm
-    if ap == "p" and hh < 12: hh += 12
-    if ap == "a" and hh == 12: hh = 0
-
-    return f"{ds} {hh:02d}:{mm:02d}:00"
-
 # -------- core: procesa un archivo exactamente como tu endpoint ----------
-def process_file(path: str, db) -> Dict:
-    with open(path, "rb") as f:
-        raw = f.read()
+def process_file(path: str, db, mode: str = "full", regions=None, raw: bytes | None = None) -> Dict:
+    if raw is None:
+        with open(path, "rb") as f:
+            raw = f.read()
 
     # content-type “best effort” por extensión
     ct = mimetypes.guess_type(path)[0] or "image/unknown"
 
     t0 = time.perf_counter()
-    ocr = run_ocr(raw)
+    if mode == "roi":
+        # regiones ya detectadas en lote por main(); None = detecta aquí
+        ocr = run_ocr_roi(raw, regions=regions)
+    else:
+        ocr = run_ocr(raw)
 
     # guarda archivo en tu carpeta de uploads (respetando settings.upload_dir)
     storage_path = save_bytes(settings.upload_dir, os.path.basename(path), raw)
 
+    # parseo (los mismos campos se guardan como columnas del documento)
+    fields = ocr["fields"] if mode == "roi" else extract_ticket_fields(ocr.get("full_text"))
+
     # guarda registro del documento (igual que el endpoint)
-    doc = crud.create_document(
+    doc_id = crud.insert_document(
         db,
         filename=os.path.basename(path),
         content_type=ct,
@@ -76,36 +50,26 @@ def process_file(path: str, db) -> Dict:
         storage_path=storage_path,
         full_text=ocr.get("full_text"),
         blocks=ocr.get("blocks", []),
+        ticket=fields,
     )
 
-    # parseo
-    parsed = parse_ticket_text(ocr.get("full_text") or "")
-
-    # formatos finales (sin cambiar tu extracción)
-    peso_fmt = _kg_to_int_str(parsed.get("peso_neto"))
-    ingreso_fecha_fmt = format_ddmmyyyy(parsed.get("ingreso_fecha"))
-    salida_fecha_fmt  = format_ddmmyyyy(parsed.get("salida_fecha"))
-    ingreso_hora_fmt  = format_time_pmam(parsed.get("ingreso_hora"))
-    salida_hora_fmt   = format_time_pmam(parsed.get("salida_hora"))
-
-    ingreso_fecha_hora = _combine_date_time(ingreso_fecha_fmt, ingreso_hora_fmt)
-    salida_fecha_hora  = _combine_date_time(salida_fecha_fmt,  salida_hora_fmt)
-
     elapsed_ms = int((time.perf_counter() - t0) * 1000)
 
     return {
-        "document_id": doc.id,
-        "ticket_num": parsed.get("ticket_num"),
-        "placa": parsed.get("placa"),
-        "peso_neto": peso_fmt,  # sin 'Kg'
-        "ingreso_fecha_hora": ingreso_fecha_hora,  # 'DD-MM-YYYY HH:MM:00'
-        "salida_fecha_hora":  salida_fecha_hora,   # 'DD-MM-YYYY HH:MM:00'
+        "document_id": doc_id,
+        **fields,  # ticket_num, placa, peso_neto (sin 'Kg'), *_fecha_hora 'DD-MM-YYYY HH:MM:00'
         "processing_time_ms": elapsed_ms,
         "debug": {
             "best_preset": ocr.get("best_preset"),
             "rotation_deg": ocr.get("rotation_deg"),
             "confidence_mean": ocr.get("confidence_mean"),
             "variant_metrics": ocr.get("variant_metrics"),
+            "exec_mode": ocr.get("exec_mode"),
+            "detect_ms": ocr.get("detect_ms"),
+            "wall_time_ms": ocr.get("wall_time_ms"),
+            "variant_time_ms_total": ocr.get("variant_time_ms_total"),
+            "roi_missing": ocr.get("roi_missing"),
+            "roi_fallback": ocr.get("roi_fallback"),
         },
     }
 
@@ -122,8 +86,13 @@ def main():
     parser = argparse.ArgumentParser(description="Batch OCR CLI")
     parser.add_argument("--input", "-i", required=True, help="Carpeta con imágenes")
     parser.add_argument("--output", "-o", help="Archivo JSON de salida (opcional)")
+    parser.add_argument("--mode", choices=("full", "roi"), default="full",
+                        help="roi: OCR solo de los campos detectados por YOLO")
+    parser.add_argument("--batch-size", type=int, default=settings.yolo_batch_size,
+                        help="Imágenes por inferencia YOLO en modo roi")
     args = parser.parse_args()
 
+    configure_threads()
     imgs = find_images(args.input)
     if not imgs:
         print(json.dumps({"items": [], "total": 0}, ensure_ascii=False))
@@ -132,12 +101,22 @@ def main():
     db = SessionLocal()
     results = []
     try:
-        for p in imgs:
-            try:
-                res = process_file(p, db)
-                results.append({"file": p, "success": True, "result": res})
-            except Exception as e:
-                results.append({"file": p, "success": False, "error": str(e)})
+        step = max(1, args.batch_size) if args.mode == "roi" else len(imgs)
+        for start in range(0, len(imgs), step):
+            chunk = imgs[start:start + step]
+            raws, regions = {}, {}
+            if args.mode == "roi":
+                # una inferencia YOLO por tramo, luego OCR de los recortes imagen por imagen
+                for p in chunk:
+                    with open(p, "rb") as f:
+                        raws[p] = f.read()
+                regions = dict(zip(chunk, detect_fields_batch([raws[p] for p in chunk])))
+            for p in chunk:
+                try:
+                    res = process_file(p, db, args.mode, regions.get(p), raws.get(p))
+                    results.append({"file": p, "success": True, "result": res})
+                except Exception as e:
+                    results.append({"file": p, "success": False, "error": str(e)})
         payload = {"items": results, "total": len(results)}
 
         if args.output:
@@ -0,0 +1,76 @@
+# --- bootstrap para que se pueda importar "app" al ejecutar desde scripts/ ---
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]  # carpeta del proyecto (..)
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+# -----------------------------------------------------------------------------
+
+# scripts/bench_crud.py
+# Compara crud.create_document (ORM, un objeto por bloque + refresh) con
+# crud.insert_document (INSERT + executemany). Usa su propia BD, no toca local.db.
+import argparse, json, os, random, tempfile, time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.migrations import run_migrations
+from app import crud, models
+
+def fake_blocks(n: int):
+    out = []
+    for _ in range(n):
+        x, y = random.randint(0, 1500), random.randint(0, 2000)
+        out.append({
+            "bbox": [[x, y], [x + 120, y], [x + 120, y + 30], [x, y + 30]],
+            "text": "PESO NETO 41,510.00 Kg",
+            "confidence": random.random(),
+        })
+    return out
+
+def run(fn, Session, docs: int, blocks: int) -> dict:
+    payload = fake_blocks(blocks)
+    db = Session()
+    try:
+        t0 = time.perf_counter()
+        for i in range(docs):
+            fn(
+                db,
+                filename=f"{i}.jpeg",
+                content_type="image/jpeg",
+                size_bytes=123456,
+                storage_path=None,
+                full_text="texto de prueba",
+                blocks=payload,
+            )
+        dt = time.perf_counter() - t0
+    finally:
+        db.close()
+    rows = docs * (blocks + 1)
+    return {"seconds": round(dt, 3), "docs_per_s": round(docs / dt, 1), "rows_per_s": round(rows / dt, 1)}
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark de escritura de documentos + bloques")
+    ap.add_argument("--db", help="URL de BD (por defecto un SQLite temporal)")
+    ap.add_argument("--docs", type=int, default=300)
+    ap.add_argument("--blocks", type=int, default=80, help="Bloques OCR por documento")
+    args = ap.parse_args()
+
+    url = args.db or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)  # documents_fts, que insert_document alimenta
+    Session = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+    res = {
+        "db": url,
+        "docs": args.docs,
+        "blocks_per_doc": args.blocks,
+        "create_document": run(crud.create_document, Session, args.docs, args.blocks),
+        "insert_document": run(crud.insert_document, Session, args.docs, args.blocks),
+    }
+    res["speedup"] = round(res["insert_document"]["rows_per_s"] / res["create_document"]["rows_per_s"], 2)
+    print(json.dumps(res, indent=2))
+
+if __name__ == "__main__":
+    main()
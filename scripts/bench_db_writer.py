@@ -0,0 +1,106 @@
+# --- bootstrap para que se pueda importar "app" al ejecutar desde scripts/ ---
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]  # carpeta del proyecto (..)
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+# -----------------------------------------------------------------------------
+
+# scripts/bench_db_writer.py
+# Escrituras concurrentes de documentos en SQLite: journal por defecto vs WAL con pragmas
+# vs WAL + DbWriter (group commit). Cada modo usa su propio archivo temporal.
+import argparse, json, os, statistics, tempfile, threading, time
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, make_engine, SQLITE_PRAGMAS
+from app.migrations import run_migrations
+from app.services.db_writer import DbWriter
+from app.services.ticket_fields import extract_ticket_fields
+from app import crud
+
+TEXT = "BALANZA ELECTRONICA\nTICKET 65830559\nPLACA: BZU-890\nPESO NETO 41,510 Kg\nSAB,23AGO2025 18:53 p.m"
+
+def fake_blocks(n: int):
+    return [
+        {"bbox": [[10, 30 * i], [200, 30 * i], [200, 30 * i + 25], [10, 30 * i + 25]], "text": "PESO NETO", "confidence": 0.9}
+        for i in range(n)
+    ]
+
+def run_mode(mode: str, threads: int, docs: int, blocks: int, max_batch: int, max_delay_ms: float) -> dict:
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = make_engine(f"sqlite:///{path}", sqlite_production=(mode != "default"))
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    Session = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    writer = DbWriter(max_batch, max_delay_ms, session_factory=Session) if mode == "wal+group" else None
+    payload = fake_blocks(blocks)
+    ticket = extract_ticket_fields(TEXT)  # se parsea una vez; aquí solo se mide la escritura
+    latencies: list[float] = []
+    errors = []
+    lock = threading.Lock()
+
+    def store(db):
+        return crud.insert_document(
+            db, filename="t.jpeg", content_type="image/jpeg", size_bytes=1, storage_path=None,
+            full_text=TEXT, blocks=payload, ticket=ticket, commit=False,
+        )
+
+    def client():
+        db = Session()
+        try:
+            for _ in range(docs):
+                t0 = time.perf_counter()
+                try:
+                    if writer is not None:
+                        writer.run(store)
+                    else:
+                        store(db)
+                        db.commit()
+                except Exception as e:  # "database is locked" sin WAL
+                    db.rollback()
+                    with lock:
+                        errors.append(str(e)[:80])
+                    continue
+                with lock:
+                    latencies.append((time.perf_counter() - t0) * 1000)
+        finally:
+            db.close()
+
+    workers = [threading.Thread(target=client) for _ in range(threads)]
+    t0 = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    dt = time.perf_counter() - t0
+    out = {
+        "docs_per_s": round(len(latencies) / dt, 1),
+        "p50_ms": round(statistics.median(latencies), 2) if latencies else None,
+        "p99_ms": round(statistics.quantiles(latencies, n=100)[98], 2) if len(latencies) > 1 else None,
+        "errors": len(errors),
+    }
+    if writer is not None:
+        out.update(writer.stats())
+        writer.stop()
+    engine.dispose()
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark de escrituras concurrentes en SQLite")
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--docs", type=int, default=200, help="Documentos por hilo")
+    ap.add_argument("--blocks", type=int, default=40, help="Bloques OCR por documento")
+    ap.add_argument("--max-batch", type=int, default=64)
+    ap.add_argument("--max-delay-ms", type=float, default=10)
+    ap.add_argument("--modes", default="default,wal,wal+group")
+    ap.add_argument("--synchronous", default=SQLITE_PRAGMAS["synchronous"], help="PRAGMA synchronous de los modos WAL")
+    args = ap.parse_args()
+    SQLITE_PRAGMAS["synchronous"] = args.synchronous
+
+    res = {"synchronous": args.synchronous, "threads": args.threads, "docs_per_thread": args.docs, "blocks_per_doc": args.blocks}
+    for mode in args.modes.split(","):
+        res[mode] = run_mode(mode, args.threads, args.docs, args.blocks, args.max_batch, args.max_delay_ms)
+    print(json.dumps(res, indent=2))
+
+if __name__ == "__main__":
+    main()
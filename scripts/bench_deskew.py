@@ -0,0 +1,97 @@
+# --- bootstrap para que se pueda importar "app" al ejecutar desde scripts/ ---
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]  # carpeta del proyecto (..)
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+# -----------------------------------------------------------------------------
+
+# scripts/bench_deskew.py
+# Compara estimate_skew_hough (método original) con estimate_skew_projection sobre dataset/images:
+#  - acuerdo: |ángulo_projection - ángulo_hough| <= tolerancia, por imagen
+#  - recuperación: cada imagen se gira ángulos conocidos y se mide cuánto se desvía cada método
+#    del giro aplicado (la única referencia exacta; hough también tiene error propio)
+# Sale con código 1 si alguna imagen queda fuera de la tolerancia o si projection recupera peor
+# que hough (p90): DESKEW_METHOD=projection solo es seguro como default con el bench en 0.
+import argparse, json, os, time
+import numpy as np
+
+from app.config import settings
+from app.services.preprocess import (
+    imdecode_bytes, resize_max_side, _rotate_bound, estimate_skew_hough, estimate_skew_projection,
+)
+
+def find_images(input_dir: str):
+    exts = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+    return sorted(os.path.join(input_dir, f) for f in os.listdir(input_dir) if f.lower().endswith(exts))
+
+def timed(fn, img):
+    t0 = time.perf_counter()
+    angle = fn(img)
+    return angle, (time.perf_counter() - t0) * 1000
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark de estimación de inclinación")
+    ap.add_argument("--input", "-i", default=str(ROOT / "dataset" / "images"))
+    ap.add_argument("--tolerance", type=float, default=settings.deskew_tolerance_deg)
+    ap.add_argument("--synthetic", default="-6.5,3.3", help="Giros conocidos (no enteros: hough cuantiza a 1°); '' = ninguno")
+    args = ap.parse_args()
+
+    methods = {
+        "hough": estimate_skew_hough,
+        "projection": lambda img: estimate_skew_projection(img, max_angle=settings.deskew_max_angle),
+    }
+    synthetic = [float(a) for a in args.synthetic.split(",") if a.strip()]
+    times = {m: [] for m in methods}
+    recovery = {m: [] for m in methods}
+    rows = []
+    for path in find_images(args.input):
+        img = resize_max_side(imdecode_bytes(Path(path).read_bytes()), 1600)
+        base = {}
+        for name, fn in methods.items():
+            base[name], ms = timed(fn, img)
+            times[name].append(ms)
+        diff = abs(base["projection"] - base["hough"])
+        rows.append({
+            "file": os.path.basename(path),
+            "hough": round(base["hough"], 2),
+            "projection": round(base["projection"], 2),
+            "diff": round(diff, 2),
+            "within_tolerance": diff <= args.tolerance,
+        })
+        for applied in synthetic:
+            rotated = _rotate_bound(img, applied)
+            for name, fn in methods.items():
+                # girar `applied` grados debe mover la estimación en -applied
+                recovery[name].append(abs(fn(rotated) - base[name] + applied))
+
+    summary = {
+        "images": len(rows),
+        "tolerance_deg": args.tolerance,
+        "within_tolerance": sum(r["within_tolerance"] for r in rows),
+    }
+    for name in methods:
+        summary[name] = {"mean_ms": round(float(np.mean(times[name])), 1) if rows else None}
+        if recovery[name]:
+            summary[name]["recovery_err_median"] = round(float(np.median(recovery[name])), 2)
+            summary[name]["recovery_err_p90"] = round(float(np.percentile(recovery[name], 90)), 2)
+    if rows:
+        summary["speedup"] = round(summary["hough"]["mean_ms"] / summary["projection"]["mean_ms"], 1)
+    failures = gate(rows, summary)
+    summary["failures"] = failures
+    print(json.dumps({"items": rows, "summary": summary}, indent=2))
+    if failures:
+        sys.exit(1)
+
+def gate(rows: list, summary: dict) -> list[str]:
+    found = []
+    outside = [r["file"] for r in rows if not r["within_tolerance"]]
+    if outside:
+        found.append(f"{len(outside)}/{len(rows)} imágenes con |projection - hough| > {summary['tolerance_deg']}°")
+    p90 = {m: summary[m].get("recovery_err_p90") for m in ("hough", "projection")}
+    if None not in p90.values() and p90["projection"] > p90["hough"]:
+        found.append(f"recuperación p90: projection {p90['projection']}° > hough {p90['hough']}°")
+    return found
+
+if __name__ == "__main__":
+    main()
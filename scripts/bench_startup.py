@@ -0,0 +1,98 @@
+# --- bootstrap para que se pueda importar "app" al ejecutar desde scripts/ ---
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]  # carpeta del proyecto (..)
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+# -----------------------------------------------------------------------------
+
+# scripts/bench_startup.py
+# Tiempo de import y RSS de app.main, batch_cli y parse_ticket, cada uno en un intérprete limpio.
+# Con --baseline compara contra una corrida guardada (--save) y sale con código 1 si el tiempo o el
+# RSS crecen más que --tolerance, o si alguno vuelve a cargar torch/ultralytics/easyocr al importar.
+import argparse, json, os, statistics, subprocess
+
+TARGETS = {
+    "app.main": "app.main",
+    "batch_cli": "batch_cli",
+    "parse_ticket": "app.services.parse_ticket",
+}
+HEAVY = ("torch", "ultralytics", "easyocr", "onnxruntime")
+
+_PROBE = r"""
+import importlib, json, sys, time
+sys.path[:0] = [{root!r}, {scripts!r}]
+def rss_kb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+base = rss_kb()
+t0 = time.perf_counter()
+importlib.import_module({module!r})
+print(json.dumps({{
+    "import_ms": (time.perf_counter() - t0) * 1000,
+    "rss_mb": rss_kb() / 1024,
+    "rss_delta_mb": (rss_kb() - base) / 1024,
+    "heavy": sorted(m for m in {heavy!r} if m in sys.modules),
+}}))
+"""
+
+def probe(module: str) -> dict:
+    code = _PROBE.format(root=str(ROOT), scripts=str(ROOT / "scripts"), module=module, heavy=HEAVY)
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def measure(repeat: int) -> dict:
+    results = {}
+    for name, module in TARGETS.items():
+        runs = [probe(module) for _ in range(repeat)]
+        results[name] = {
+            "import_ms": round(statistics.median(r["import_ms"] for r in runs), 1),
+            "rss_mb": round(statistics.median(r["rss_mb"] for r in runs), 1),
+            "rss_delta_mb": round(statistics.median(r["rss_delta_mb"] for r in runs), 1),
+            "heavy": runs[-1]["heavy"],
+        }
+    return results
+
+def regressions(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    found = []
+    for name, cur in current.items():
+        if cur["heavy"]:
+            found.append(f"{name}: importa {', '.join(cur['heavy'])}")
+        ref = baseline.get(name)
+        if not ref:
+            continue
+        for key in ("import_ms", "rss_mb"):
+            if cur[key] > ref[key] * (1 + tolerance):
+                found.append(f"{name}: {key} {cur[key]} > {ref[key]} (+{tolerance:.0%})")
+    return found
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark de arranque: tiempo de import y RSS")
+    ap.add_argument("--repeat", type=int, default=5, help="Corridas por módulo (se reporta la mediana)")
+    ap.add_argument("--baseline", help="JSON de una corrida anterior para detectar regresiones")
+    ap.add_argument("--save", help="Guardar esta corrida como JSON (nuevo baseline)")
+    ap.add_argument("--tolerance", type=float, default=0.3, help="Crecimiento aceptado frente al baseline")
+    args = ap.parse_args()
+
+    results = measure(max(1, args.repeat))
+    report = {"python": sys.version.split()[0], "results": results}
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    found = regressions(results, baseline, args.tolerance)
+    report["regressions"] = found
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if found:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# --- bootstrap para que se pueda importar "app" al ejecutar desde scripts/ ---
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]  # carpeta del proyecto (..)
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+# -----------------------------------------------------------------------------
+
+# scripts/bench_yolo.py
+# Compara el detector de campos en PyTorch (.pt) y en ONNX (exportado con export_onnx):
+#  - imágenes/s de a una (detect_regions) y por lotes (detect_regions_batch), por backend
+#  - paridad: cada caja de onnx contra la de torch de la misma clase (IoU y desvío máximo en px)
+import argparse, json, os, time
+
+from app.config import settings
+from app.services.ocr_run import _roi_page
+from app.services.yolo_detector import get_detector, YOLO_BACKENDS
+
+def find_images(input_dir: str):
+    exts = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+    return sorted(os.path.join(input_dir, f) for f in os.listdir(input_dir) if f.lower().endswith(exts))
+
+def iou(a, b):
+    ix = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+def compare(ref, other, iou_tol: float):
+    # empareja cada caja de referencia con la de mayor IoU de la misma clase en `other`
+    ious, max_px, unmatched = [], 0, 0
+    for r in ref:
+        cands = [o for o in other if o["class"] == r["class"]]
+        if not cands:
+            unmatched += 1
+            continue
+        best = max(cands, key=lambda o: iou(r["bbox"], o["bbox"]))
+        v = iou(r["bbox"], best["bbox"])
+        ious.append(v)
+        if v < iou_tol:
+            unmatched += 1
+        max_px = max(max_px, max(abs(p - q) for p, q in zip(r["bbox"], best["bbox"])))
+    return ious, max_px, unmatched + max(0, len(other) - len(ref))
+
+def throughput(detector, pages, batch_size: int, repeat: int):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            detector.detect_regions(page, conf=settings.yolo_conf)
+    single = len(pages) * repeat / (time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        out = detector.detect_regions_batch(pages, conf=settings.yolo_conf, batch_size=batch_size)
+    batched = len(pages) * repeat / (time.perf_counter() - t0)
+    return round(single, 2), round(batched, 2), out
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark del detector YOLO: torch vs onnx")
+    ap.add_argument("--input", "-i", default=str(ROOT / "dataset" / "images"))
+    ap.add_argument("--model", default=settings.yolo_model_path, help="Pesos .pt (el .onnx se exporta al lado)")
+    ap.add_argument("--batch-size", type=int, default=settings.yolo_batch_size)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--iou-tol", type=float, default=0.9, help="IoU mínimo para dar una caja por igual")
+    args = ap.parse_args()
+
+    pages = [_roi_page(Path(p).read_bytes()) for p in find_images(args.input)]
+    if not pages:
+        print(json.dumps({"images": 0}))
+        return
+
+    summary = {"images": len(pages), "batch_size": args.batch_size, "imgsz": settings.yolo_imgsz}
+    boxes = {}
+    for backend in YOLO_BACKENDS:
+        t0 = time.perf_counter()
+        detector = get_detector(args.model, backend, settings.yolo_imgsz)
+        load_ms = (time.perf_counter() - t0) * 1000
+        detector.detect_regions(pages[0], conf=settings.yolo_conf)  # calentamiento
+        single, batched, boxes[backend] = throughput(detector, pages, args.batch_size, args.repeat)
+        summary[backend] = {"load_ms": round(load_ms, 1), "img_per_s": single, "img_per_s_batched": batched}
+
+    all_ious, max_px, mismatched = [], 0, 0
+    for ref, other in zip(boxes["torch"], boxes["onnx"]):
+        ious, px, bad = compare(ref, other, args.iou_tol)
+        all_ious += ious
+        max_px = max(max_px, px)
+        mismatched += bad
+    summary["parity"] = {
+        "boxes_torch": sum(len(b) for b in boxes["torch"]),
+        "boxes_onnx": sum(len(b) for b in boxes["onnx"]),
+        "min_iou": round(min(all_ious), 4) if all_ious else None,
+        "max_coord_diff_px": max_px,
+        "mismatched": mismatched,
+        "iou_tol": args.iou_tol,
+    }
+    summary["speedup_batched"] = round(summary["onnx"]["img_per_s_batched"] / summary["torch"]["img_per_s_batched"], 2)
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
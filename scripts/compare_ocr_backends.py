@@ -0,0 +1,93 @@
+# --- bootstrap para que se pueda importar "app" al ejecutar desde scripts/ ---
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]  # carpeta del proyecto (..)
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+# -----------------------------------------------------------------------------
+
+# scripts/compare_ocr_backends.py
+# Compara OCR_BACKEND=torch (referencia) con los backends ONNX sobre dataset/images:
+#  - latencia de readtext por imagen (media, p90) y speedup frente a la referencia
+#  - acuerdo de texto: difflib.SequenceMatcher.ratio() entre full_text de cada backend y el de torch
+#  - acuerdo de campos: cuántos campos del ticket (extract_ticket_fields) salen idénticos
+import argparse, contextlib, difflib, io, json, os, time
+import numpy as np
+
+from app.services.ocr_reader import build_reader, OCR_BACKENDS
+from app.services.preprocess import imdecode_bytes, resize_max_side, to_rgb
+from app.services.ticket_fields import extract_ticket_fields
+
+def find_images(input_dir: str):
+    exts = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+    return sorted(os.path.join(input_dir, f) for f in os.listdir(input_dir) if f.lower().endswith(exts))
+
+def ticket_fields(text: str) -> dict:
+    # el parser imprime trazas de depuración; la salida del script debe seguir siendo JSON
+    with contextlib.redirect_stdout(io.StringIO()):
+        return extract_ticket_fields(text)
+
+def run_backend(backend: str, images):
+    t0 = time.perf_counter()
+    reader = build_reader(backend)
+    load_ms = (time.perf_counter() - t0) * 1000
+    reader.readtext(images[0])  # calentamiento
+    texts, times = [], []
+    for img in images:
+        t0 = time.perf_counter()
+        blocks = reader.readtext(img)
+        times.append((time.perf_counter() - t0) * 1000)
+        texts.append("\n".join(b[1] for b in blocks))
+    return load_ms, texts, times
+
+def main():
+    ap = argparse.ArgumentParser(description="Acuerdo y latencia de los backends de OCR")
+    ap.add_argument("--input", "-i", default=str(ROOT / "dataset" / "images"))
+    ap.add_argument("--backends", default="onnx,onnx-int8", help=f"Candidatos, separados por coma ({', '.join(OCR_BACKENDS)})")
+    ap.add_argument("--baseline", default="torch")
+    ap.add_argument("--max-side", type=int, default=1600)
+    args = ap.parse_args()
+
+    paths = find_images(args.input)
+    if not paths:
+        print(json.dumps({"images": 0}))
+        return
+    # misma imagen que ve la variante "original" de run_ocr
+    images = [to_rgb(resize_max_side(imdecode_bytes(Path(p).read_bytes()), args.max_side)) for p in paths]
+
+    load_ms, base_texts, base_times = run_backend(args.baseline, images)
+    base_fields = [ticket_fields(t) for t in base_texts]
+    summary = {
+        "images": len(images),
+        args.baseline: {
+            "load_ms": round(load_ms, 1),
+            "mean_ms": round(float(np.mean(base_times)), 1),
+            "p90_ms": round(float(np.percentile(base_times, 90)), 1),
+        },
+    }
+    items = [{"file": os.path.basename(p)} for p in paths]
+    for backend in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        load_ms, texts, times = run_backend(backend, images)
+        ratios = []
+        fields_same = fields_total = 0
+        for item, ref, text, ref_fields in zip(items, base_texts, texts, base_fields):
+            ratio = difflib.SequenceMatcher(None, ref, text).ratio()
+            ratios.append(ratio)
+            fields = ticket_fields(text)
+            same = sum(1 for k, v in ref_fields.items() if fields.get(k) == v)
+            fields_same += same
+            fields_total += len(ref_fields)
+            item[backend] = {"agreement": round(ratio, 4), "fields_same": same}
+        summary[backend] = {
+            "load_ms": round(load_ms, 1),
+            "mean_ms": round(float(np.mean(times)), 1),
+            "p90_ms": round(float(np.percentile(times, 90)), 1),
+            "speedup": round(float(np.mean(base_times)) / float(np.mean(times)), 2),
+            "agreement_mean": round(float(np.mean(ratios)), 4),
+            "agreement_min": round(float(np.min(ratios)), 4),
+            "fields_same": f"{fields_same}/{fields_total}",
+        }
+    print(json.dumps({"items": items, "summary": summary}, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
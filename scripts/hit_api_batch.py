@@ -1,6 +1,7 @@
 # scripts/hit_api_batch.py
 import argparse, json, sys, time
 from pathlib import Path
+from urllib.parse import urljoin
 import requests
 
 EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp"}
@@ -21,6 +22,20 @@ def fmt_bytes(n: int) -> str:
         n /= 1024
     return f"{n:.1f} TB"
 
+def wait_ready(session, url: str, max_wait_s: float) -> bool:
+    # /ready responde 503 mientras el servidor carga y calienta los modelos
+    ready_url = urljoin(url, "/ready")
+    deadline = time.monotonic() + max_wait_s
+    while True:
+        try:
+            if session.get(ready_url, timeout=5).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(1)
+
 def main():
     ap = argparse.ArgumentParser(
         description="Enviar imágenes al endpoint /ocr de tu API y mostrar el JSON en consola."
@@ -31,6 +46,8 @@ def main():
     ap.add_argument("--timeout", type=int, default=240, help="Timeout por imagen (seg).")
     ap.add_argument("--ndjson", help="Archivo NDJSON para guardar resultados (opcional).")
     ap.add_argument("--absolute", action="store_true", help="Imprimir rutas absolutas.")
+    ap.add_argument("--wait-ready", type=float, default=0,
+                    help="Esperar hasta N seg. a que /ready responda 200 antes de enviar (0 = no esperar).")
     args = ap.parse_args()
 
     folder = Path(args.input)
@@ -49,6 +66,12 @@ def main():
     total = len(imgs)
     ok = 0
 
+    if args.wait_ready > 0:
+        if not wait_ready(session, args.url, args.wait_ready):
+            print(f"[ERROR] El servidor no quedó listo en {args.wait_ready:.0f} s", file=sys.stderr)
+            sys.exit(1)
+        print("[INFO] Servidor listo (/ready)")
+
     print(f"[INFO] Endpoint: {args.url}")
     print(f"[INFO] Imágenes encontradas: {total}")
     print("-" * 80)
@@ -0,0 +1,73 @@
+# scripts/mem_report.py
+# Memoria por proceso del servidor (Linux, /proc/<pid>/smaps_rollup):
+#  - USS: páginas privadas (Private_Clean + Private_Dirty), lo que libera matar ese worker
+#  - shared: páginas compartidas con otros procesos (Shared_Clean + Shared_Dirty)
+#  - PSS: RSS con las compartidas repartidas; la suma de PSS es el consumo real del grupo
+# Uso: python scripts/mem_report.py --parent <pid de scripts/serve.py>   (o --pids 1,2,3)
+import argparse, json, os
+
+FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+def smaps_rollup(pid: int) -> dict:
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].rstrip(":") in FIELDS:
+                values[parts[0].rstrip(":")] = int(parts[1])  # kB
+    return values
+
+def children_of(parent: int) -> list[int]:
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # el nombre del comando va entre paréntesis y puede tener espacios
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == parent:
+            pids.append(int(entry))
+    return sorted(pids)
+
+def report(pid: int, role: str) -> dict:
+    v = smaps_rollup(pid)
+    mb = lambda kb: round(kb / 1024, 1)
+    return {
+        "pid": pid,
+        "role": role,
+        "rss_mb": mb(v.get("Rss", 0)),
+        "pss_mb": mb(v.get("Pss", 0)),
+        "uss_mb": mb(v.get("Private_Clean", 0) + v.get("Private_Dirty", 0)),
+        "shared_mb": mb(v.get("Shared_Clean", 0) + v.get("Shared_Dirty", 0)),
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description="USS / PSS / memoria compartida por worker")
+    ap.add_argument("--parent", type=int, help="PID del proceso padre (se incluyen sus hijos directos)")
+    ap.add_argument("--pids", default="", help="PIDs explícitos, separados por coma")
+    args = ap.parse_args()
+
+    procs = []
+    if args.parent:
+        procs.append((args.parent, "parent"))
+        procs += [(pid, "worker") for pid in children_of(args.parent)]
+    procs += [(int(p), "process") for p in args.pids.split(",") if p.strip()]
+    if not procs:
+        ap.error("indique --parent o --pids")
+
+    rows = [report(pid, role) for pid, role in procs]
+    workers = [r for r in rows if r["role"] != "parent"] or rows
+    summary = {
+        "processes": len(rows),
+        "total_rss_mb": round(sum(r["rss_mb"] for r in rows), 1),   # cuenta las compartidas una vez por proceso
+        "total_pss_mb": round(sum(r["pss_mb"] for r in rows), 1),   # consumo real del grupo
+        "worker_uss_mb_mean": round(sum(r["uss_mb"] for r in workers) / len(workers), 1),
+        "worker_shared_mb_mean": round(sum(r["shared_mb"] for r in workers) / len(workers), 1),
+    }
+    print(json.dumps({"items": rows, "summary": summary}, indent=2))
+
+if __name__ == "__main__":
+    main()
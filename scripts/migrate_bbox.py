@@ -0,0 +1,49 @@
+# --- bootstrap para que se pueda importar "app" al ejecutar desde scripts/ ---
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]  # carpeta del proyecto (..)
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+# -----------------------------------------------------------------------------
+
+# scripts/migrate_bbox.py
+# Migración única de ocr_blocks.bbox (texto) a x_min..y_max + bbox_poly. Ejecutar una vez, con un
+# solo proceso, después de desplegar (init_db solo agrega las columnas nuevas):
+#   1) python scripts/migrate_bbox.py                -> convierte; la columna bbox queda intacta
+#   2) revisar las filas sin parsear que se listan y verificar la API
+#   3) python scripts/migrate_bbox.py --drop-legacy  -> copia (id, bbox) a ocr_blocks_bbox_backup
+#                                                       y elimina la columna
+import argparse, logging, os
+from sqlalchemy import create_engine
+
+from app.database import Base
+from app.migrations import migrate_block_bbox, convert_legacy_bbox, drop_legacy_bbox
+from app import models  # registra las tablas en Base.metadata
+
+def main():
+    ap = argparse.ArgumentParser(description="Convertir ocr_blocks.bbox al formato numérico")
+    ap.add_argument("--db", default=os.getenv("DATABASE_URL", "sqlite:///./local.db"), help="URL de la BD")
+    ap.add_argument("--batch-size", type=int, default=5000)
+    ap.add_argument("--drop-legacy", action="store_true",
+                    help="Eliminar la columna bbox (antes se copia a ocr_blocks_bbox_backup)")
+    ap.add_argument("--force", action="store_true", help="Con --drop-legacy: eliminar aunque queden filas sin parsear")
+    args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    engine = create_engine(args.db)
+    Base.metadata.create_all(bind=engine)
+    migrate_block_bbox(engine)
+    converted, unparseable = convert_legacy_bbox(engine, args.batch_size)
+    print(f"[OK] convertidos: {converted}  sin parsear: {len(unparseable)}")
+    if unparseable:
+        print(f"     ids sin parsear (bbox intacto): {unparseable[:50]}{' ...' if len(unparseable) > 50 else ''}")
+    if args.drop_legacy:
+        try:
+            if drop_legacy_bbox(engine, force=args.force):
+                print("[OK] columna bbox eliminada (copia en ocr_blocks_bbox_backup)")
+        except RuntimeError as e:
+            print(f"[ERROR] {e}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+# --- bootstrap para que se pueda importar "app" al ejecutar desde scripts/ ---
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]  # carpeta del proyecto (..)
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+# -----------------------------------------------------------------------------
+
+# scripts/migrate_db.py
+# Aplica las migraciones de app/migrations.py (también corren solas en init_db)
+# y, en SQLite, compacta el archivo para recuperar el espacio liberado. La conversión de
+# ocr_blocks.bbox va aparte, con scripts/migrate_bbox.py.
+import argparse, os
+from sqlalchemy import create_engine, text
+
+from app.database import Base
+from app.migrations import run_migrations
+from app import models  # registra las tablas en Base.metadata
+
+def main():
+    ap = argparse.ArgumentParser(description="Migrar la BD al esquema actual")
+    ap.add_argument("--db", default=os.getenv("DATABASE_URL", "sqlite:///./local.db"), help="URL de la BD")
+    ap.add_argument("--no-vacuum", action="store_true", help="No ejecutar VACUUM en SQLite")
+    args = ap.parse_args()
+
+    engine = create_engine(args.db)
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    if engine.dialect.name == "sqlite" and not args.no_vacuum:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM"))
+    print(f"[OK] Migración aplicada en {args.db}")
+
+if __name__ == "__main__":
+    main()
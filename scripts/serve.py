@@ -0,0 +1,107 @@
+# --- bootstrap para que se pueda importar "app" al ejecutar desde scripts/ ---
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]  # carpeta del proyecto (..)
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+# -----------------------------------------------------------------------------
+
+# scripts/serve.py
+# Arranca uvicorn con WEB_WORKERS procesos y reparte los núcleos entre ellos
+# (TORCH_INTRA_THREADS / TORCH_INTEROP_THREADS / CV2_THREADS, ver app/services/runtime.py).
+# Con --preload (WEB_PRELOAD=true) el proceso padre carga los modelos una sola vez y hace fork
+# de los workers, que comparten esas páginas copy-on-write (medir con scripts/mem_report.py).
+import argparse, os, signal, time
+
+import uvicorn
+
+from app.config import settings
+from app.services.runtime import thread_budget, thread_env
+
+def serve_preload(host: str, port: int, workers: int):
+    from app.main import app
+    from app.database import engine, init_db
+    from app.services.runtime import preload_models
+
+    # tablas y migraciones una sola vez (los workers en paralelo compiten por el CREATE TABLE);
+    # init_db marca el proceso y el on_startup de los hijos la saltea. Sin conexiones al hacer fork
+    init_db()
+    engine.dispose()
+    t0 = time.perf_counter()
+    loaded = preload_models()
+    print(f"[serve] precargado {', '.join(loaded) or 'nada'} en {time.perf_counter() - t0:.1f} s")
+
+    config = uvicorn.Config(app, host=host, port=port)
+    sock = config.bind_socket()  # un socket compartido; el kernel reparte las conexiones
+    children = set()
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            # worker: uvicorn instala sus propias señales; el startup de la app fija los hilos
+            # y hace el warm-up (la primera inferencia ocurre aquí, nunca en el padre)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                uvicorn.Server(config).run(sockets=[sock])
+            except BaseException:
+                code = 1
+            finally:
+                os._exit(code)
+        children.add(pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for _ in range(workers):
+        spawn()
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    print(f"[serve] workers: {sorted(children)}")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            print(f"[serve] worker {pid} terminó (estado {status}); se reemplaza")
+            time.sleep(1)  # evita un bucle de reinicios si falla al arrancar
+            spawn()
+    sock.close()
+
+def main():
+    ap = argparse.ArgumentParser(description="Servidor OCR API")
+    ap.add_argument("--host", default="0.0.0.0")
+    ap.add_argument("--port", type=int, default=settings.port)
+    ap.add_argument("--workers", type=int, default=settings.web_workers)
+    ap.add_argument("--preload", action="store_true", default=settings.web_preload,
+                    help="Cargar los modelos en el padre y hacer fork de los workers")
+    args = ap.parse_args()
+
+    workers = max(1, args.workers)
+    # los workers heredan el entorno: mismo reparto en todos, y OMP/MKL fijados antes de cargar torch
+    os.environ["WEB_WORKERS"] = str(workers)
+    settings.web_workers = workers  # los hijos de --preload heredan este objeto, no releen el entorno
+    budget = thread_budget(workers)
+    for k, v in thread_env(budget).items():
+        os.environ.setdefault(k, v)
+    print(f"[serve] workers={workers} torch intra={budget['intra']} interop={budget['interop']} cv2={budget['cv2']}")
+
+    os.chdir(ROOT)
+    if args.preload:
+        serve_preload(args.host, args.port, workers)
+    else:
+        uvicorn.run("app.main:app", host=args.host, port=args.port, workers=workers)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# --- bootstrap para que se pueda importar "app" al ejecutar desde scripts/ ---
+import sys
+from pathlib import Path
+ROOT = Path(__file__).resolve().parents[1]  # carpeta del proyecto (..)
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+# -----------------------------------------------------------------------------
+
+# scripts/sweep_threads.py
+# Barre combinaciones procesos x hilos de torch sobre dataset/images y reporta imágenes/s:
+# cada proceso simula un worker de uvicorn (configure_threads + get_reader + run_ocr) y toma
+# imágenes de una cola común; el tiempo corre desde que todos terminaron de cargar el Reader.
+import argparse, json, multiprocessing, os, time
+import numpy as np
+
+def find_images(input_dir: str):
+    exts = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+    return sorted(os.path.join(input_dir, f) for f in os.listdir(input_dir) if f.lower().endswith(exts))
+
+def _worker(env: dict, tasks, results, barrier):
+    # el entorno va antes de importar app/torch: Settings y OpenMP lo leen al cargar
+    os.environ.update(env)
+    from app.services.runtime import configure_threads
+    from app.services.ocr_reader import get_reader
+    from app.services.ocr_run import run_ocr
+    configure_threads()
+    get_reader()
+    barrier.wait()
+    latencies = []
+    while True:
+        path = tasks.get()
+        if path is None:
+            break
+        raw = Path(path).read_bytes()
+        t0 = time.perf_counter()
+        run_ocr(raw)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    results.put(latencies)
+
+def run_combo(workers: int, intra: int, interop: int, cv2_threads: int, paths, rounds: int) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    tasks, results = ctx.Queue(), ctx.Queue()
+    barrier = ctx.Barrier(workers + 1)
+    env = {
+        "WEB_WORKERS": str(workers),
+        "TORCH_INTRA_THREADS": str(intra),
+        "TORCH_INTEROP_THREADS": str(interop),
+        "CV2_THREADS": str(cv2_threads),
+        "OMP_NUM_THREADS": str(intra),
+        "MKL_NUM_THREADS": str(intra),
+        # las variantes en serie: el paralelismo lo ponen los procesos del barrido
+        "OCR_EXEC_MODE": "sequential",
+    }
+    procs = [ctx.Process(target=_worker, args=(env, tasks, results, barrier)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    for _ in range(rounds):
+        for path in paths:
+            tasks.put(path)
+    for _ in procs:
+        tasks.put(None)
+    barrier.wait()  # todos con el Reader cargado
+    t0 = time.perf_counter()
+    latencies = []
+    for _ in procs:
+        latencies += results.get()
+    elapsed = time.perf_counter() - t0
+    for p in procs:
+        p.join()
+    return {
+        "workers": workers,
+        "intra": intra,
+        "interop": interop,
+        "cv2": cv2_threads,
+        "img_per_s": round(len(latencies) / elapsed, 3),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 1),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 1),
+    }
+
+def main():
+    cores = os.cpu_count() or 1
+    ap = argparse.ArgumentParser(description="Barrido de procesos x hilos de torch")
+    ap.add_argument("--input", "-i", default=str(ROOT / "dataset" / "images"))
+    ap.add_argument("--workers", default="1,2,4", help="Procesos a probar")
+    ap.add_argument("--intra", default="", help="Hilos de torch a probar ('' = 1,2,4,... hasta núcleos/procesos)")
+    ap.add_argument("--interop", type=int, default=1)
+    ap.add_argument("--cv2", type=int, default=0, help="Hilos de OpenCV (0 = igual a intra)")
+    ap.add_argument("--rounds", type=int, default=1, help="Pasadas sobre las imágenes")
+    ap.add_argument("--oversubscribe", action="store_true", help="Incluir combinaciones con procesos x hilos > núcleos")
+    args = ap.parse_args()
+
+    paths = find_images(args.input)
+    if not paths:
+        print(json.dumps({"items": [], "best": None}))
+        return
+
+    combos = []
+    for w in (int(x) for x in args.workers.split(",") if x.strip()):
+        if args.intra:
+            intras = [int(x) for x in args.intra.split(",") if x.strip()]
+        else:
+            intras = sorted({t for t in (1, 2, 4, 8, 16) if t <= cores // w} | {max(1, cores // w)})
+        combos += [(w, t) for t in intras if args.oversubscribe or w * t <= cores]
+
+    rows = []
+    for w, t in combos:
+        row = run_combo(w, t, args.interop, args.cv2 or t, paths, args.rounds)
+        print(json.dumps(row), file=sys.stderr)
+        rows.append(row)
+    best = max(rows, key=lambda r: r["img_per_s"]) if rows else None
+    print(json.dumps({"cores": cores, "images": len(paths) * args.rounds, "items": rows, "best": best}, indent=2))
+    if best:
+        print(f"WEB_WORKERS={best['workers']} TORCH_INTRA_THREADS={best['intra']} "
+              f"TORCH_INTEROP_THREADS={best['interop']} CV2_THREADS={best['cv2']}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import create_engine, text
+from app.migrations import migrate_block_bbox, convert_legacy_bbox, drop_legacy_bbox
+from app.utils.bbox import pack_poly, unpack_poly, bbox_columns, parse_legacy_bbox
+
+QUAD = [[711, 341], [1006, 341], [1006, 390], [711, 390]]
+
+def test_pack_roundtrip_is_compact():
+    blob = pack_poly(QUAD)
+    assert len(blob) == 32
+    assert unpack_poly(blob) == QUAD
+    assert unpack_poly(pack_poly([[1.5, 2.25], [3, 4]])) == [[1.5, 2.25], [3, 4]]
+
+def test_bbox_columns_bounds():
+    cols = bbox_columns(QUAD)
+    assert (cols["x_min"], cols["y_min"], cols["x_max"], cols["y_max"]) == (711, 341, 1006, 390)
+    assert bbox_columns(None)["bbox_poly"] is None
+
+def test_parse_legacy_numpy_repr():
+    legacy = "[[np.int32(711), np.int32(341)], [np.int32(1006), np.int32(341)], [np.int32(1006), np.int32(390)], [np.int32(711), np.int32(390)]]"
+    assert parse_legacy_bbox(legacy) == QUAD
+    assert parse_legacy_bbox(str(QUAD)) == QUAD
+    assert parse_legacy_bbox("[[np.float64(1.5), 2], [3, np.float32(4e-1)]]") == [[1.5, 2], [3, 0.4]]
+    assert parse_legacy_bbox(None) is None
+
+def _legacy_db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE ocr_blocks (id INTEGER PRIMARY KEY, document_id INTEGER NOT NULL, "
+                          "text TEXT, confidence FLOAT, bbox TEXT)"))
+        conn.execute(text("INSERT INTO ocr_blocks (id, document_id, bbox) VALUES (1, 1, :a), (2, 1, 'basura'), (3, 1, NULL)"),
+                     {"a": str(QUAD)})
+    return engine
+
+def _rows(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT * FROM ocr_blocks ORDER BY id")).mappings().all()
+
+def test_startup_migration_only_adds_columns(tmp_path):
+    engine = _legacy_db(tmp_path)
+    assert migrate_block_bbox(engine) is True
+    rows = _rows(engine)
+    assert rows[0]["bbox"] == str(QUAD) and rows[0]["bbox_poly"] is None
+
+def test_convert_keeps_legacy_column_and_reports_unparseable(tmp_path, caplog):
+    engine = _legacy_db(tmp_path)
+    migrate_block_bbox(engine)
+    assert convert_legacy_bbox(engine, batch_size=1) == (1, [2])
+    assert "ocr_blocks.id=2" in caplog.text
+    rows = _rows(engine)
+    assert unpack_poly(rows[0]["bbox_poly"]) == QUAD and rows[0]["bbox"] == str(QUAD)
+    assert rows[1]["bbox"] == "basura" and rows[1]["bbox_poly"] is None
+    # idempotente: una segunda corrida no reconvierte nada
+    assert convert_legacy_bbox(engine) == (0, [2])
+
+    with pytest.raises(RuntimeError):
+        drop_legacy_bbox(engine)
+    assert drop_legacy_bbox(engine, force=True) is True
+    assert "bbox" not in _rows(engine)[0]
+    with engine.connect() as conn:
+        backup = conn.execute(text("SELECT id, bbox FROM ocr_blocks_bbox_backup ORDER BY id")).fetchall()
+    assert [tuple(r) for r in backup] == [(1, str(QUAD)), (2, "basura")]
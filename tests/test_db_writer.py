@@ -0,0 +1,59 @@
+import threading
+from sqlalchemy import event, text
+from sqlalchemy.orm import sessionmaker
+from app.database import make_engine
+from app.services.db_writer import DbWriter
+
+def _writer(tmp_path, **kw):
+    engine = make_engine(f"sqlite:///{tmp_path / 'w.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT UNIQUE)"))
+    return engine, DbWriter(session_factory=sessionmaker(bind=engine), **kw)
+
+def _insert(v):
+    def fn(db):
+        return db.execute(text("INSERT INTO t (v) VALUES (:v)"), {"v": v}).lastrowid
+    return fn
+
+def test_concurrent_writes_share_commits(tmp_path):
+    engine, writer = _writer(tmp_path, max_batch=64, max_delay_ms=50)
+    ids = []
+    threads = [threading.Thread(target=lambda i=i: ids.append(writer.run(_insert(f"v{i}")))) for i in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    writer.stop()
+    assert sorted(ids) == list(range(1, 21))
+    assert writer.batches < 20
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM t")).scalar() == 20
+
+def test_failed_write_does_not_roll_back_the_batch(tmp_path):
+    engine, writer = _writer(tmp_path, max_delay_ms=50)
+    ok = writer.submit(_insert("a"))
+    dup = writer.submit(_insert("a"))
+    other = writer.submit(_insert("b"))
+    assert ok.result() and other.result()
+    assert dup.exception() is not None
+    writer.stop()
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT v FROM t ORDER BY v")).scalars().all() == ["a", "b"]
+
+def test_one_commit_per_batch(tmp_path):
+    engine, writer = _writer(tmp_path, max_batch=64, max_delay_ms=50)
+    statements = []
+
+    @event.listens_for(engine, "connect")
+    def _trace(dbapi_conn, _record):
+        dbapi_conn.set_trace_callback(statements.append)
+
+    engine.dispose()  # las conexiones nuevas pasan por el trace
+    futures = [writer.submit(_insert(f"v{i}")) for i in range(10)]
+    assert all(f.result() for f in futures)
+    writer.stop()
+    commits = [s for s in statements if s.strip().upper() == "COMMIT"]
+    assert statements.count("BEGIN IMMEDIATE") == writer.batches
+    assert len(commits) == writer.batches < 10
+    # cada escritura en su savepoint, todas dentro del mismo BEGIN ... COMMIT
+    assert sum(1 for s in statements if s.startswith("SAVEPOINT")) == 10
@@ -0,0 +1,91 @@
+from pathlib import Path
+import cv2
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.config import Settings, DEDUP_MAX_INDEXED_DISTANCE
+from app.database import Base
+from app.services.dedupe import (image_dhash, split_bands, hamming, to_signed64, pixel_diff,
+                                 index_document, find_near_duplicate, MAX_INDEXED_DISTANCE)
+
+ROOT = Path(__file__).resolve().parents[1]
+IMAGES = ROOT / "dataset" / "images"
+UPLOADS = ROOT / "uploads"
+# tickets distintos del mismo formulario que colisionan en dHash (distancia 3)
+COLLIDING = [
+    ("WhatsApp Image 2025-09-23 at 9.35.12 AM.jpeg", "WhatsApp Image 2025-09-23 at 9.36.04 AM (1).jpeg"),
+    ("WhatsApp Image 2025-09-23 at 9.35.12 AM.jpeg", "WhatsApp Image 2025-09-23 at 9.39.26 AM (4).jpeg"),
+]
+
+def _recompress(raw: bytes, fx: float = 0.6, quality: int = 50) -> bytes:
+    img = cv2.imdecode(np.frombuffer(raw, np.uint8), cv2.IMREAD_COLOR)
+    ok, buf = cv2.imencode(".jpg", cv2.resize(img, None, fx=fx, fy=fx), [cv2.IMWRITE_JPEG_QUALITY, quality])
+    assert ok
+    return buf.tobytes()
+
+def test_recompressed_copy_is_near_duplicate():
+    raw = (IMAGES / "1.jpeg").read_bytes()
+    img = cv2.imdecode(np.frombuffer(raw, np.uint8), cv2.IMREAD_COLOR)
+    ok, buf = cv2.imencode(".jpg", cv2.resize(img, None, fx=0.6, fy=0.6), [cv2.IMWRITE_JPEG_QUALITY, 50])
+    assert ok
+    a = image_dhash(raw)
+    assert hamming(a, image_dhash(buf.tobytes())) <= 3
+    assert hamming(a, image_dhash((IMAGES / "2.jpeg").read_bytes())) > 3
+
+def test_bands_share_one_value_within_distance_three():
+    h = 0x0123_4567_89AB_CDEF
+    near = h ^ (1 << 3) ^ (1 << 20) ^ (1 << 40)
+    assert any(x == y for x, y in zip(split_bands(h), split_bands(near)))
+    assert hamming(h, to_signed64(near)) == 3
+
+def test_colliding_uploads_are_told_apart_by_pixels():
+    for a, b in COLLIDING:
+        ra, rb = (UPLOADS / a).read_bytes(), (UPLOADS / b).read_bytes()
+        assert hamming(image_dhash(ra), image_dhash(rb)) <= 3
+        assert pixel_diff(ra, rb) > 0.15
+        assert pixel_diff(ra, _recompress(ra)) <= 0.15
+
+def test_find_near_duplicate_confirms_against_stored_image():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    stored = UPLOADS / COLLIDING[0][0]
+    doc_id = crud.insert_document(db, filename=stored.name, content_type="image/jpeg", size_bytes=0,
+                               storage_path=str(stored), full_text="", blocks=[])
+    index_document(db, doc_id, image_dhash(stored.read_bytes()))
+
+    for _, other in COLLIDING:
+        raw = (UPLOADS / other).read_bytes()
+        assert find_near_duplicate(db, image_dhash(raw), 3) is not None  # solo dHash: falso positivo
+        assert find_near_duplicate(db, image_dhash(raw), 3, image_bytes=raw) is None
+
+    copy = _recompress(stored.read_bytes())
+    found = find_near_duplicate(db, image_dhash(copy), 3, image_bytes=copy)
+    assert found is not None and found[0].id == doc_id
+
+def test_distance_four_is_not_indexable():
+    # un bit distinto en cada banda: distancia 4 y ninguna banda en común
+    h = 0x0123_4567_89AB_CDEF
+    far = h ^ (1 << 3) ^ (1 << 20) ^ (1 << 40) ^ (1 << 60)
+    assert hamming(h, far) == 4
+    assert not any(x == y for x, y in zip(split_bands(h), split_bands(far)))
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    doc_id = crud.insert_document(db, filename="a.jpg", content_type="image/jpeg", size_bytes=0,
+                                  storage_path=None, full_text="", blocks=[])
+    index_document(db, doc_id, h)
+    assert crud.find_hash_candidates(db, split_bands(far)) == []  # el índice no lo encuentra
+    with pytest.raises(ValueError):
+        find_near_duplicate(db, far, 4)
+    assert find_near_duplicate(db, h ^ (1 << 3) ^ (1 << 20) ^ (1 << 40), MAX_INDEXED_DISTANCE) is not None
+
+def test_settings_reject_unindexable_distance():
+    assert DEDUP_MAX_INDEXED_DISTANCE == MAX_INDEXED_DISTANCE
+    assert Settings(dedup_max_distance=3).dedup_max_distance == 3
+    with pytest.raises(ValueError, match="DEDUP_MAX_DISTANCE"):
+        Settings(dedup_max_distance=4)
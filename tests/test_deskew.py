@@ -0,0 +1,23 @@
+from pathlib import Path
+import numpy as np
+from app.services.preprocess import imdecode_bytes, resize_max_side, _rotate_bound, estimate_skew_projection
+
+IMAGES = Path(__file__).resolve().parents[1] / "dataset" / "images"
+
+def test_projection_recovers_known_rotation():
+    img = resize_max_side(imdecode_bytes((IMAGES / "3.jpeg").read_bytes()), 1600)
+    base = estimate_skew_projection(img)
+    for applied in (-6.5, 3.3):
+        assert abs(estimate_skew_projection(_rotate_bound(img, applied)) - (base - applied)) <= 0.5
+
+def test_projection_recovers_rotations_across_dataset():
+    # el mismo criterio que scripts/bench_deskew.py: girar `applied` mueve la estimación en -applied
+    errors = {}
+    for path in sorted(IMAGES.glob("*.jpeg")):
+        img = resize_max_side(imdecode_bytes(path.read_bytes()), 1600)
+        base = estimate_skew_projection(img)
+        for applied in (-6.5, 3.3):
+            errors[(path.name, applied)] = abs(estimate_skew_projection(_rotate_bound(img, applied)) - base + applied)
+    assert len(errors) >= 30
+    assert np.percentile(list(errors.values()), 90) <= 0.5
+    assert max(errors.values()) <= 2.0, max(errors.items(), key=lambda kv: kv[1])
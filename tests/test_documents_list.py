@@ -0,0 +1,85 @@
+from datetime import datetime
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+import pytest
+
+from app import crud, models
+from app.database import Base
+from app.routers import ocr
+
+@pytest.fixture
+def docs():
+    """TestClient sobre un SQLite en memoria; docs.add(n) inserta n documentos y devuelve sus ids."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    app = FastAPI()
+    app.include_router(ocr.router)
+    def get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+    app.dependency_overrides[ocr.get_db] = get_db
+
+    class Docs:
+        client = TestClient(app)
+
+        def add(self, n):
+            with Session() as db:
+                ids = [crud.insert_document(db, filename=f"{i}.jpg", content_type="image/jpeg", size_bytes=1,
+                                            storage_path=None, full_text=None, blocks=[]) for i in range(n)]
+                # todos con el mismo created_at: el orden no puede depender de él
+                db.execute(update(models.Document).values(created_at=datetime(2024, 1, 1)))
+                db.commit()
+            return ids
+
+        def page(self, **params):
+            r = self.client.get("/documents", params=params)
+            assert r.status_code == 200, r.text
+            return r.json()
+
+        def walk(self, limit):
+            seen, cursor, pages = [], None, 0
+            while True:
+                params = {"limit": limit} if cursor is None else {"limit": limit, "cursor": cursor}
+                body = self.page(**params)
+                pages += 1
+                seen += [d["id"] for d in body["items"]]
+                cursor = body["next_cursor"]
+                if cursor is None:
+                    return seen, pages
+                assert cursor == seen[-1]
+
+    yield Docs()
+    engine.dispose()
+
+def test_total_defaults_to_exact_int(docs):
+    docs.add(3)
+    body = docs.page(limit=1)
+    assert body["total"] == 3 and len(body["items"]) == 1
+    assert docs.page(limit=1, total="approx")["total"] == 3
+    assert docs.client.get("/documents", params={"total": "none"}).status_code == 422
+
+def test_empty_list_has_zero_total(docs):
+    assert docs.page() == {"items": [], "total": 0, "next_cursor": None}
+
+def test_cursor_round_trips_through_every_page(docs):
+    ids = docs.add(7)
+    seen, pages = docs.walk(limit=3)
+    assert seen == sorted(ids, reverse=True)  # sin repetidos ni huecos aunque created_at empate
+    assert pages == 3
+
+def test_last_page_boundary(docs):
+    # justo 2*limit filas: la 2.ª página llega llena y el limit+1 sabe que no hay más
+    ids = docs.add(4)
+    first = docs.page(limit=2)
+    assert first["next_cursor"] == sorted(ids)[2]
+    last = docs.page(limit=2, cursor=first["next_cursor"])
+    assert [d["id"] for d in last["items"]] == sorted(ids)[1::-1]
+    assert last["next_cursor"] is None
+    assert docs.page(limit=2, cursor=min(ids))["items"] == []
@@ -0,0 +1,66 @@
+import asyncio
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+import pytest
+from app.services.fetch import download_to_spool, DownloadError
+from app.utils.storage import UploadTooLarge
+
+BODY = os.urandom(300_000)
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/missing":
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        if self.path == "/chunked":
+            # sin Content-Length: el límite se aplica contando bytes
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i in range(0, len(BODY), 64_000):
+                part = BODY[i:i + 64_000]
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(part), part))
+            self.wfile.write(b"0\r\n\r\n")
+            return
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture(scope="module")
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+
+def _download(url, tmp_path, max_bytes):
+    async def run():
+        async with httpx.AsyncClient() as client:
+            return await download_to_spool(url, str(tmp_path), max_bytes, client=client)
+    return asyncio.run(run())
+
+def test_download_spools_and_hashes(server, tmp_path):
+    spool, ct = _download(f"{server}/img.jpg", tmp_path, 1_000_000)
+    assert ct == "image/jpeg"
+    assert spool.size == len(BODY)
+    assert spool.sha256 == hashlib.sha256(BODY).hexdigest()
+    with open(spool.path, "rb") as f:
+        assert f.read() == BODY
+
+@pytest.mark.parametrize("path", ["/img.jpg", "/chunked"])
+def test_download_aborts_over_limit(server, tmp_path, path):
+    with pytest.raises(UploadTooLarge):
+        _download(f"{server}{path}", tmp_path, 100_000)
+    assert os.listdir(tmp_path) == []
+
+def test_download_http_error(server, tmp_path):
+    with pytest.raises(DownloadError):
+        _download(f"{server}/missing", tmp_path, 1_000_000)
@@ -0,0 +1,55 @@
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models
+from app.database import Base
+from app.migrations import ensure_fulltext_index
+from app.services.dedupe import index_document
+
+TEXT = "TICKET N° 000123\nPLACA: ABX-123\nPESO NETO: 12,340 KG\nINGRESO: 23/09/2025 09:35"
+BLOCKS = [
+    {"text": "TICKET N° 000123", "confidence": 0.91, "bbox": [[711, 341], [1006, 341], [1006, 390], [711, 390]]},
+    {"text": "ABX-123", "confidence": 0.5, "bbox": [[10.5, 20.25], [80, 20], [80, 44], [10, 44]]},
+    {"text": "sin caja", "confidence": None, "bbox": None},
+]
+PHASH = 0xF0E1D2C3B4A59687  # bit 63 encendido: pasa por to_signed64
+
+def _session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    ensure_fulltext_index(engine)
+    return sessionmaker(bind=engine)()
+
+def _snapshot(db, doc_id):
+    """Todo lo que queda guardado de un documento, sin ids ni fechas propias de cada fila."""
+    doc = db.execute(select(models.Document.__table__).where(models.Document.id == doc_id)).mappings().one()
+    blocks = db.execute(
+        select(models.OcrBlock.__table__).where(models.OcrBlock.document_id == doc_id).order_by(models.OcrBlock.id)
+    ).mappings().all()
+    image_hash = db.execute(
+        select(models.ImageHash.__table__).where(models.ImageHash.document_id == doc_id)
+    ).mappings().one()
+    fts = db.execute(text("SELECT full_text FROM documents_fts WHERE rowid = :id"), {"id": doc_id}).all()
+    return {
+        "document": {k: v for k, v in doc.items() if k not in ("id", "created_at")},
+        "blocks": [{k: v for k, v in b.items() if k not in ("id", "document_id")} for b in blocks],
+        "image_hash": {k: v for k, v in image_hash.items() if k != "document_id"},
+        "fts": [tuple(r) for r in fts],
+        "matches": [h["id"] == doc_id for h in crud.search_documents(db, "ABX-123")],
+    }
+
+def test_core_insert_matches_orm_insert():
+    kw = dict(filename="t.jpg", content_type="image/jpeg", size_bytes=123, storage_path="uploads/t.jpg",
+              full_text=TEXT, blocks=BLOCKS)
+    orm_db, core_db = _session(), _session()
+
+    orm_id = crud.create_document(orm_db, **kw).id
+    index_document(orm_db, orm_id, PHASH)
+    core_id = crud.insert_document(core_db, **kw)
+    index_document(core_db, core_id, PHASH)
+
+    orm, core = _snapshot(orm_db, orm_id), _snapshot(core_db, core_id)
+    assert core == orm
+    assert core["document"]["placa"] == "ABX-123" and len(core["blocks"]) == 3
+    assert core["blocks"][0]["x_max"] == 1006 and core["blocks"][2]["bbox_poly"] is None
+    assert core["fts"] == [(TEXT,)] and core["matches"] == [True]
@@ -0,0 +1,109 @@
+from datetime import timedelta
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+import pytest
+
+from app import crud, models
+from app.config import settings
+from app.database import Base
+from app.routers import ocr
+from app.services import job_worker
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    monkeypatch.setattr(job_worker, "SessionLocal", Session)
+    monkeypatch.setattr(settings, "upload_dir", str(tmp_path / "uploads"))
+
+    def get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+    app = FastAPI()
+    app.include_router(ocr.router)
+    app.dependency_overrides[ocr.get_db] = get_db
+    return TestClient(app), Session
+
+def _post(client, data=b"imagen"):
+    resp = client.post("/ocr/jobs", files=[("file", ("t.jpg", data, "image/jpeg"))])
+    assert resp.status_code == 202
+    return resp.json()["job_id"]
+
+def _workers(handler):
+    return job_worker.JobWorkers(handler, workers=1, lease_s=60, max_attempts=2)
+
+def test_job_runs_and_reports_result(api):
+    client, _ = api
+    job_id = _post(client)
+    queued = client.get(f"/ocr/jobs/{job_id}").json()
+    assert queued["status"] == "queued" and queued["attempts"] == 0
+
+    seen = []
+    def handler(job, db):
+        with open(job.storage_path, "rb") as f:
+            seen.append(f.read())
+        return {"document_id": None, "placa": "BZU-890"}
+    assert _workers(handler)._run_one() is True
+    done = client.get(f"/ocr/jobs/{job_id}").json()
+    assert seen == [b"imagen"]
+    assert done["status"] == "done" and done["attempts"] == 1
+    assert done["result"]["placa"] == "BZU-890" and done["finished_at"] is not None
+
+def test_failed_job_reports_error(api):
+    client, _ = api
+    job_id = _post(client)
+    def handler(job, db):
+        raise RuntimeError("imagen ilegible")
+    _workers(handler)._run_one()
+    body = client.get(f"/ocr/jobs/{job_id}").json()
+    assert body["status"] == "failed" and body["error"] == "imagen ilegible"
+
+def test_unknown_job_is_404(api):
+    client, _ = api
+    assert client.get("/ocr/jobs/nope").status_code == 404
+
+def _age_lease(Session, job_id, seconds):
+    with Session() as db:
+        db.execute(update(models.OcrJob).where(models.OcrJob.id == job_id)
+                   .values(heartbeat_at=crud._utcnow() - timedelta(seconds=seconds)))
+        db.commit()
+
+def test_only_expired_leases_are_requeued_until_max_attempts(api):
+    client, Session = api
+    live, dead = _post(client), _post(client)
+    with Session() as db:
+        assert {crud.claim_next_job(db).id, crud.claim_next_job(db).id} == {live, dead}
+    workers = _workers(lambda job, db: None)
+
+    # otro proceso sigue con `live` (heartbeat reciente): no se toca
+    _age_lease(Session, dead, 120)
+    workers.maintain_leases()
+    assert client.get(f"/ocr/jobs/{live}").json()["status"] == "processing"
+    assert client.get(f"/ocr/jobs/{dead}").json()["status"] == "queued"
+
+    # segundo intento también abandonado: con max_attempts=2 queda fallido
+    with Session() as db:
+        assert crud.claim_next_job(db).id == dead
+    _age_lease(Session, dead, 120)
+    workers.maintain_leases()
+    body = client.get(f"/ocr/jobs/{dead}").json()
+    assert body["status"] == "failed" and body["attempts"] == 2 and "intentos" in body["error"]
+
+def test_heartbeat_keeps_own_jobs_alive(api):
+    client, Session = api
+    job_id = _post(client)
+    workers = _workers(None)
+    def handler(job, db):
+        _age_lease(Session, job.id, 120)
+        workers.maintain_leases()  # el hilo de lease corre mientras el handler trabaja
+        return {"document_id": None}
+    workers.handler = handler
+    workers._run_one()
+    body = client.get(f"/ocr/jobs/{job_id}").json()
+    assert body["status"] == "done" and body["attempts"] == 1
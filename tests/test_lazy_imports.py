@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+def _loaded_after_import(module: str) -> list[str]:
+    code = (
+        f"import sys, {module}\n"
+        "print(','.join(m for m in ('torch', 'ultralytics', 'easyocr', 'onnxruntime') if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return [m for m in out.stdout.strip().split(",") if m]
+
+def test_ocr_run_import_does_not_load_models():
+    assert _loaded_after_import("app.services.ocr_run") == []
+
+def test_app_main_import_does_not_load_models():
+    assert _loaded_after_import("app.main") == []
+
+def test_configure_threads_skips_torch_with_onnx_backend():
+    code = (
+        "import sys\n"
+        "from app.services.runtime import configure_threads\n"
+        "configure_threads()\n"
+        "print('torch' in sys.modules)"
+    )
+    env = {**os.environ, "OCR_BACKEND": "onnx", "WARMUP_YOLO": "false"}
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
@@ -0,0 +1,57 @@
+import asyncio
+import hashlib
+import os
+import pytest
+from app.utils.multipart_spool import spool_multipart, MultipartError
+
+BOUNDARY = "xYzBoundary"
+HEADERS = {"content-type": f"multipart/form-data; boundary={BOUNDARY}"}
+
+def _body(parts):
+    out = b""
+    for name, filename, data in parts:
+        disp = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename else "")
+        out += f"--{BOUNDARY}\r\nContent-Disposition: {disp}\r\nContent-Type: image/jpeg\r\n\r\n".encode()
+        out += data + b"\r\n"
+    return out + f"--{BOUNDARY}--\r\n".encode()
+
+def _stream(body, chunk=1000):
+    async def gen():
+        for i in range(0, len(body), chunk):
+            yield body[i:i + chunk]
+    return gen()
+
+def _spool(body, tmp_path, max_bytes):
+    return asyncio.run(spool_multipart(HEADERS, _stream(body), str(tmp_path), max_bytes))
+
+def _files(tmp_path):
+    return sorted(os.listdir(tmp_path))
+
+def test_files_go_straight_to_disk_with_hash(tmp_path):
+    a, b = os.urandom(5000), os.urandom(3000)
+    parts = _spool(_body([("files", "a.jpg", a), ("note", None, b"hola"), ("files", "b.jpg", b)]), tmp_path, 10_000)
+    assert [(p.field, p.filename, p.content_type) for p in parts] == [
+        ("files", "a.jpg", "image/jpeg"), ("files", "b.jpg", "image/jpeg")]
+    for part, data in zip(parts, (a, b)):
+        assert part.spool.size == len(data)
+        assert part.spool.sha256 == hashlib.sha256(data).hexdigest()
+        with open(part.spool.path, "rb") as f:
+            assert f.read() == data
+
+def test_oversized_file_is_cut_while_receiving(tmp_path):
+    small = os.urandom(2000)
+    parts = _spool(_body([("files", "big.jpg", os.urandom(50_000)), ("files", "small.jpg", small)]), tmp_path, 10_000)
+    assert parts[0].spool is None
+    assert parts[1].spool.size == len(small)
+    # del archivo grande no queda nada en disco
+    assert _files(tmp_path) == [os.path.basename(parts[1].spool.path)]
+
+def test_broken_body_removes_spools(tmp_path):
+    body = _body([("files", "a.jpg", os.urandom(5000)), ("files", "b.jpg", os.urandom(5000))])
+    with pytest.raises(MultipartError):
+        _spool(body[:-2000], tmp_path, 10_000)
+    assert _files(tmp_path) == []
+
+def test_rejects_non_multipart(tmp_path):
+    with pytest.raises(MultipartError):
+        asyncio.run(spool_multipart({"content-type": "application/json"}, _stream(b"{}"), str(tmp_path), 10))
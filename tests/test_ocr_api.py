@@ -0,0 +1,272 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import httpx
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+import pytest
+
+from app.config import settings
+from app.database import Base, make_engine
+from app.migrations import run_migrations
+from app.routers import ocr
+from app.services import fetch
+from app.services.db_writer import DbWriter
+from app.utils.workqueue import BoundedExecutor
+from app import models  # registra las tablas en Base.metadata
+
+TEXT = "TICKET N° 000123\nPLACA: ABX-123\nPESO NETO: 12,340 KG"
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    """App con solo el router de OCR sobre un SQLite en archivo; el OCR es de mentira."""
+    def make(sqlite_production=False, group_commit=False, workers=4):
+        engine = make_engine(f"sqlite:///{tmp_path / 'api.db'}", sqlite_production)
+        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        writer = DbWriter(session_factory=Session)
+        executor = BoundedExecutor(workers, 16)
+        monkeypatch.setattr(ocr, "SessionLocal", Session)
+        monkeypatch.setattr(ocr, "db_writer", writer)
+        monkeypatch.setattr(ocr, "ocr_executor", executor)
+        monkeypatch.setattr(settings, "upload_dir", str(tmp_path / "uploads"))
+        monkeypatch.setattr(settings, "db_group_commit", group_commit)
+        monkeypatch.setattr(settings, "ocr_cache_enabled", True)
+        monkeypatch.setattr(settings, "dedup_max_distance", -1)
+        monkeypatch.setattr(ocr, "run_ocr", lambda raw: state.ocr(raw))
+
+        def get_db():
+            db = Session()
+            try:
+                yield db
+            finally:
+                db.close()
+        app = FastAPI()
+        app.include_router(ocr.router)
+        app.dependency_overrides[ocr.get_db] = get_db
+        state.app, state.client, state.Session, state.engine = app, TestClient(app), Session, engine
+        state.executor, state.upload_dir = executor, tmp_path / "uploads"
+        cleanup.append((writer, executor, engine))
+        return state
+
+    state = _Api(make)
+    cleanup = []
+    yield state
+    for writer, executor, engine in cleanup:
+        writer.stop(timeout=5)
+        executor.shutdown()
+        engine.dispose()
+
+class _Api:
+    def __init__(self, make):
+        self.make = make
+        self.calls = []
+        self.ocr = self._ocr
+
+    def _ocr(self, raw):
+        self.calls.append(raw)
+        return {"full_text": TEXT, "blocks": [{"text": "ABX-123", "confidence": 0.9,
+                                               "bbox": [[0, 0], [10, 0], [10, 5], [0, 5]]}]}
+
+    def post(self, data: bytes, path="/ocr", name="t.jpg"):
+        return self.client.post(path, files=[("file", (name, data, "image/jpeg"))])
+
+    def count(self, table: str) -> int:
+        with self.engine.connect() as conn:
+            return conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+
+@pytest.mark.parametrize("production,group_commit", [(False, False), (True, False), (True, True)])
+def test_concurrent_uploads_do_not_lock_each_other(api, production, group_commit):
+    api.make(sqlite_production=production, group_commit=group_commit)
+    # los 4 requests quedan dentro del OCR a la vez: si la lectura de la caché dejara una
+    # transacción abierta, el INSERT de después fallaría con "database is locked"
+    barrier = threading.Barrier(4, timeout=10)
+    base = api.ocr
+    def ocr_together(raw):
+        barrier.wait()
+        return base(raw)
+    api.ocr = ocr_together
+
+    with ThreadPoolExecutor(4) as pool:
+        responses = list(pool.map(lambda i: api.post(f"imagen-{i}".encode(), name=f"{i}.jpg"), range(4)))
+    assert [r.status_code for r in responses] == [200] * 4, [r.text for r in responses]
+    assert {r.json()["debug"]["cache"] for r in responses} == {"miss"}
+    assert api.count("documents") == 4 and api.count("ocr_cache") == 4
+
+def test_cache_hit_skips_ocr(api):
+    api.make(workers=1)
+    first = api.post(b"imagen")
+    second = api.post(b"imagen", name="copia.jpg")
+    assert first.status_code == second.status_code == 200
+    assert len(api.calls) == 1
+    assert (first.json()["debug"]["cache"], second.json()["debug"]["cache"]) == ("miss", "hit")
+    assert second.json()["document_id"] == first.json()["document_id"]
+    assert second.json()["placa"] == first.json()["placa"] == "ABX-123"
+    assert api.count("documents") == 1
+
+def _stream(app, names_and_data, on_line=None, disconnect=None):
+    """POST /ocr/batch/stream por ASGI directo; devuelve las líneas NDJSON que llegaron.
+
+    TestClient junta todo el cuerpo antes de devolverlo: aquí cada línea se ve al llegar
+    (on_line) y el cliente corta la conexión cuando se activa `disconnect` (threading.Event).
+    """
+    req = httpx.Request("POST", "http://test/ocr/batch/stream",
+                        files=[("files", (n, d, "image/jpeg")) for n, d in names_and_data])
+    body = req.read()
+    lines, buf, status = [], b"", []
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        while disconnect is None or not (disconnect.is_set() and lines):
+            await asyncio.sleep(0.01)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal buf
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+            return
+        buf += message.get("body", b"")
+        while b"\n" in buf:
+            line, buf = buf.split(b"\n", 1)
+            lines.append(json.loads(line))
+            if on_line:
+                on_line(lines[-1])
+
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+             "scheme": "http", "path": "/ocr/batch/stream", "raw_path": b"/ocr/batch/stream",
+             "query_string": b"", "root_path": "", "server": ("test", 80), "client": ("test", 1),
+             "headers": [(k.lower().encode(), v.encode()) for k, v in req.headers.items()]}
+    asyncio.run(app(scope, receive, send))
+    assert status == [200]
+    assert buf == b""  # cada línea termina en \n, sin restos
+    return lines
+
+def test_stream_emits_items_as_they_finish(api, monkeypatch):
+    api.make(workers=2)
+    monkeypatch.setattr(settings, "batch_concurrency", 2)
+    second_done = threading.Event()
+    base = api.ocr
+    def ocr_slow_first(raw):
+        if raw == b"primera":
+            # no termina hasta que el cliente ya recibió la línea de la segunda
+            assert second_done.wait(10)
+        return base(raw)
+    api.ocr = ocr_slow_first
+
+    def on_line(item):
+        if item.get("filename") == "2.jpg":
+            second_done.set()
+    lines = _stream(api.app, [("1.jpg", b"primera"), ("2.jpg", b"segunda")], on_line)
+    assert [i.get("filename") for i in lines] == ["2.jpg", "1.jpg", None]
+    assert all(i["success"] and i["result"]["placa"] == "ABX-123" for i in lines[:2])
+    assert lines[-1] == {"summary": True, "total": 2, "succeeded": 2, "failed": 0}
+
+def test_stream_reports_item_errors_and_continues(api, monkeypatch):
+    api.make(workers=2)
+    monkeypatch.setattr(settings, "batch_concurrency", 2)
+    base = api.ocr
+    def ocr(raw):
+        if raw == b"rota":
+            raise ValueError("imagen ilegible")
+        return base(raw)
+    api.ocr = ocr
+    lines = _stream(api.app, [("a.jpg", b"buena"), ("b.jpg", b"rota"), ("c.jpg", b"otra")])
+    items = {i["filename"]: i for i in lines[:-1]}
+    assert items["b.jpg"] == {"filename": "b.jpg", "success": False, "error": "imagen ilegible"}
+    assert items["a.jpg"]["success"] and items["c.jpg"]["success"]
+    assert lines[-1] == {"summary": True, "total": 3, "succeeded": 2, "failed": 1}
+    assert api.count("documents") == 2
+
+def test_stream_disconnect_closes_sessions(api, monkeypatch):
+    api.make(workers=1)
+    monkeypatch.setattr(settings, "batch_concurrency", 1)
+    opened, closed = [], []
+    def tracked_session():
+        db = api.Session()
+        close = db.close
+        def traced_close():
+            closed.append(db)
+            close()
+        db.close = traced_close
+        opened.append(db)
+        return db
+    monkeypatch.setattr(ocr, "SessionLocal", tracked_session)
+    gate, gone = threading.Event(), threading.Event()
+    base = api.ocr
+    def ocr_blocking(raw):
+        if raw == b"1":
+            gone.set()  # el cliente se va con este item ya en su hilo
+            gate.wait(10)
+        return base(raw)
+    api.ocr = ocr_blocking
+
+    try:
+        lines = _stream(api.app, [(f"{i}.jpg", str(i).encode()) for i in range(3)], disconnect=gone)
+    finally:
+        gate.set()
+    assert [i["filename"] for i in lines] == ["0.jpg"]
+    api.executor.shutdown(wait=True)  # el item que ya estaba en un hilo termina allí
+    # el tercero esperaba turno y se canceló sin abrir Session ni correr el OCR
+    assert api.calls == [b"0", b"1"]
+    assert len(opened) == 2 and sorted(map(id, closed)) == sorted(map(id, opened))
+    assert not [p.name for p in api.upload_dir.iterdir() if p.name.startswith(".upload-")]
+
+@pytest.fixture
+def urls(api, monkeypatch):
+    """Descargas por un transporte httpx de mentira: /missing da 404, el resto devuelve la ruta."""
+    def handler(request):
+        if request.url.path == "/missing":
+            return httpx.Response(404)
+        return httpx.Response(200, content=request.url.path.encode(), headers={"content-type": "image/jpeg"})
+    monkeypatch.setattr(fetch, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return api
+
+def _spools_on_disk(api):
+    return len([p for p in api.upload_dir.iterdir() if p.name.startswith(".upload-")])
+
+def test_url_batch_reports_each_url(urls):
+    urls.make(workers=2)
+    r = urls.client.post("/ocr/by-url/batch", json={"urls": ["http://x/a.jpg", "http://x/missing", "http://x/b.jpg"]})
+    assert r.status_code == 200
+    body = r.json()
+    assert [i["filename"] for i in body["items"]] == ["a.jpg", "missing", "b.jpg"]
+    assert [i["success"] for i in body["items"]] == [True, False, True]
+    assert body["items"][1]["error"] == "No se pudo descargar (HTTP 404)"
+    assert (body["total"], body["succeeded"], body["failed"]) == (3, 2, 1)
+    assert sorted(urls.calls) == [b"/a.jpg", b"/b.jpg"]
+
+def test_url_batch_bounds_files_waiting_for_ocr(urls, monkeypatch):
+    urls.make(workers=1)
+    monkeypatch.setattr(settings, "fetch_concurrency", 2)
+    monkeypatch.setattr(settings, "batch_concurrency", 1)
+    seen = []
+    base = urls.ocr
+    def slow_ocr(raw):
+        # mientras el OCR va lento, las descargas no pueden seguir llenando el disco
+        time.sleep(0.02)
+        seen.append(_spools_on_disk(urls))
+        return base(raw)
+    urls.ocr = slow_ocr
+    r = urls.client.post("/ocr/by-url/batch", json={"urls": [f"http://x/{i}.jpg" for i in range(12)]})
+    assert r.json()["succeeded"] == 12
+    # como mucho fetch_concurrency + batch_concurrency items tienen su spool en disco a la vez
+    # (sin el cupo, las 12 descargas terminan antes del primer OCR)
+    assert len(seen) == 12 and max(seen) <= 3
+    assert _spools_on_disk(urls) == 0
+
+def test_url_batch_rejects_too_many_urls(urls, monkeypatch):
+    urls.make()
+    monkeypatch.setattr(settings, "url_batch_max", 3)
+    r = urls.client.post("/ocr/by-url/batch", json={"urls": [f"http://x/{i}.jpg" for i in range(4)]})
+    assert r.status_code == 422 and "máximo 3" in r.json()["detail"]
+    assert urls.calls == []
@@ -0,0 +1,80 @@
+import os
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+import pytest
+
+from app.config import settings
+from app.routers import ocr
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "upload_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "yolo_batch_size", 2)
+    app = FastAPI()
+    app.include_router(ocr.router)
+    app.dependency_overrides[ocr.get_db] = lambda: None
+    return TestClient(app)
+
+def _files(n):
+    return [("files", (f"{i}.jpg", b"x" * 10, "image/jpeg")) for i in range(n)]
+
+def _leftover_spools(tmp_path):
+    return [p for p in os.listdir(tmp_path) if not p.startswith(".")]
+
+def test_roi_detection_error_falls_back_to_per_file(client, tmp_path, monkeypatch):
+    seen = []
+    def boom(raws):
+        raise RuntimeError("yolo roto")
+    def process(spool, filename, content_type, db, mode="full", regions=None):
+        seen.append((filename, regions))
+        ocr.discard(spool.path)
+        return {"document_id": len(seen)}
+    monkeypatch.setattr(ocr, "detect_fields_batch", boom)
+    monkeypatch.setattr(ocr, "_process_spooled", process)
+
+    body = client.post("/ocr/batch?mode=roi", files=_files(3)).json()
+    assert body["succeeded"] == 3 and body["failed"] == 0
+    assert seen == [("0.jpg", None), ("1.jpg", None), ("2.jpg", None)]
+    assert _leftover_spools(tmp_path) == []
+
+def test_busy_mid_batch_fails_the_rest_and_keeps_earlier_results(client, tmp_path, monkeypatch):
+    calls = []
+    def detect(raws):
+        calls.append(len(raws))
+        if len(calls) == 2:
+            raise ocr.QueueFullError()
+        return [[] for _ in raws]
+    def process(spool, filename, content_type, db, mode="full", regions=None):
+        ocr.discard(spool.path)
+        return {"document_id": filename}
+    monkeypatch.setattr(ocr, "detect_fields_batch", detect)
+    monkeypatch.setattr(ocr, "_process_spooled", process)
+    # el executor lanza QueueFullError al encolar; aquí la lanza la detección del segundo tramo
+    async def run_blocking(fn, *args):
+        try:
+            return fn(*args)
+        except ocr.QueueFullError:
+            raise HTTPException(status_code=429, detail="Servidor ocupado, reintente más tarde")
+    monkeypatch.setattr(ocr, "_run_blocking", run_blocking)
+
+    resp = client.post("/ocr/batch?mode=roi", files=_files(5))
+    assert resp.status_code == 200
+    body = resp.json()
+    assert [i["success"] for i in body["items"]] == [True, True, False, False, False]
+    assert body["items"][2]["error"] == "Servidor ocupado, reintente más tarde"
+    assert calls == [2, 2]  # tras el 429 no se vuelve a encolar
+    assert _leftover_spools(tmp_path) == []
+
+def test_oversized_file_fails_alone(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "max_upload_mb", 1)
+    def process(spool, filename, content_type, db, mode="full", regions=None):
+        ocr.discard(spool.path)
+        return {"document_id": filename}
+    monkeypatch.setattr(ocr, "_process_spooled", process)
+    files = _files(2) + [("files", ("big.jpg", b"x" * (1024 * 1024 + 1), "image/jpeg"))]
+    body = client.post("/ocr/batch", files=files).json()
+    assert [i["success"] for i in body["items"]] == [True, True, False]
+    assert body["items"][2]["error"] == "Archivo demasiado grande"
+    assert _leftover_spools(tmp_path) == []
+    assert client.post("/ocr", files=[("file", ("big.jpg", b"x" * (1024 * 1024 + 1), "image/jpeg"))]).status_code == 413
+    assert client.post("/ocr", files=[("otro", ("a.jpg", b"x", "image/jpeg"))]).status_code == 422
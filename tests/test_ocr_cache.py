@@ -0,0 +1,78 @@
+from datetime import timedelta
+import itertools
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+import pytest
+
+from app import crud, models
+from app.database import Base
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)()
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Reloj de crud controlado por el test (UTC naive, como _utcnow)."""
+    now = [crud._utcnow()]
+    monkeypatch.setattr(crud, "_utcnow", lambda: now[0])
+    def advance(seconds):
+        now[0] += timedelta(seconds=seconds)
+    return advance
+
+def _put(db, key, max_entries=0, max_age_s=0, evict_every=1):
+    crud.put_cached_result(db, key, document_id=1, payload={"document_id": 1, "placa": key}, size_bytes=10,
+                           max_entries=max_entries, max_age_s=max_age_s, evict_every=evict_every)
+
+def _keys(db):
+    return sorted(db.scalars(select(models.OcrCacheEntry.sha256)))
+
+def test_hit_returns_payload_and_counts(db):
+    _put(db, "a")
+    assert crud.get_cached_result(db, "a", 3600) == {"document_id": 1, "placa": "a"}
+    assert crud.get_cached_result(db, "a", 3600) is not None
+    assert db.get(models.OcrCacheEntry, "a").hits == 2
+    assert crud.get_cached_result(db, "b", 3600) is None
+
+def test_miss_ends_the_read_transaction(db):
+    _put(db, "a")
+    assert crud.get_cached_result(db, "otro", 3600) is None
+    assert not db.in_transaction()
+
+def test_expired_entry_is_a_miss(db, clock):
+    _put(db, "a")
+    clock(3599)
+    assert crud.get_cached_result(db, "a", 3600) is not None
+    clock(2)
+    assert crud.get_cached_result(db, "a", 3600) is None
+    assert crud.get_cached_result(db, "a", 0) is not None  # 0 = sin límite de edad
+
+def test_eviction_keeps_the_most_recently_hit(db, clock):
+    for key in "abc":
+        _put(db, key)
+        clock(1)
+    crud.get_cached_result(db, "a", 0)  # "a" pasa a ser el más reciente
+    clock(1)
+    _put(db, "d", max_entries=3)
+    assert _keys(db) == ["a", "c", "d"]
+
+def test_eviction_drops_expired(db, clock):
+    _put(db, "viejo")
+    clock(100)
+    _put(db, "nuevo", max_age_s=50)
+    assert _keys(db) == ["nuevo"]
+
+def test_eviction_runs_every_n_puts(db, monkeypatch):
+    monkeypatch.setattr(crud, "_cache_puts", itertools.count(1))
+    counts = []
+    evict = crud.evict_cache
+    def traced(db, **kw):
+        counts.append(db.query(func.count(models.OcrCacheEntry.sha256)).scalar())
+        return evict(db, **kw)
+    monkeypatch.setattr(crud, "evict_cache", traced)
+    for i in range(7):
+        _put(db, f"k{i}", max_entries=2, evict_every=3)
+    assert counts == [3, 5]  # solo en el 3.º y 6.º put
+    assert len(_keys(db)) == 2 + 1  # el 7.º queda hasta la próxima limpieza
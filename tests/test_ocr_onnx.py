@@ -0,0 +1,46 @@
+import types
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("easyocr")
+
+from app.services.ocr_onnx import export_models, _OrtNet
+
+class _TinyDetector(torch.nn.Module):
+    # misma firma que CRAFT: (y [b, h, w, 2], feature)
+    def __init__(self):
+        super().__init__()
+        self.conv = torch.nn.Conv2d(3, 2, 3, padding=1)
+
+    def forward(self, x):
+        y = self.conv(x)
+        return y.permute(0, 2, 3, 1), y
+
+class _TinyRecognizer(torch.nn.Module):
+    # misma firma que los reconocedores de easyocr: (image [b, 1, H, W], text) -> [b, pasos, clases]
+    def __init__(self):
+        super().__init__()
+        self.conv = torch.nn.Conv2d(1, 5, 3, padding=1)
+
+    def forward(self, image, text):
+        return self.conv(image).mean(dim=2).permute(0, 2, 1)
+
+def test_ort_net_matches_torch_on_exported_modules(tmp_path):
+    torch.manual_seed(0)
+    reader = types.SimpleNamespace(detector=_TinyDetector().eval(), recognizer=_TinyRecognizer().eval())
+    det_path, rec_path = export_models(reader, tmp_path, ["es"])
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted([det_path.name, rec_path.name])
+
+    x = torch.rand(2, 3, 96, 160)  # otro lote y tamaño que el de la exportación
+    with torch.no_grad():
+        y_ref, _ = reader.detector(x)
+        y, feature = _OrtNet(det_path, detector=True)(x)
+    assert feature is None
+    torch.testing.assert_close(y, y_ref, rtol=1e-4, atol=1e-5)
+
+    line = torch.rand(3, 1, 64, 200)
+    with torch.no_grad():
+        preds_ref = reader.recognizer(line, None)
+        preds = _OrtNet(rec_path, detector=False)(line, None)
+    torch.testing.assert_close(preds, preds_ref, rtol=1e-4, atol=1e-5)
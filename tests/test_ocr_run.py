@@ -0,0 +1,253 @@
+import collections
+import sys
+import threading
+import time
+import types
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+import cv2
+import numpy as np
+import pytest
+
+from app.services import ocr_run
+from app.services.yolo_detector import YOLODetector, get_detector, export_onnx, FIELD_CLASSES
+
+def _page_bytes(w=400, h=200):
+    ok, buf = cv2.imencode(".png", np.full((h, w, 3), 255, np.uint8))
+    assert ok
+    return buf.tobytes()
+
+def _region(label, bbox, conf):
+    return {"label": label, "bbox": bbox, "confidence": conf, "class": FIELD_CLASSES.index(label)}
+
+class _StubDetector:
+    def __init__(self, regions):
+        self.regions = regions
+        self.calls = 0
+
+    def detect_regions(self, image, conf=0.25):
+        self.calls += 1
+        return self.regions
+
+PRESETS = ["original", "clahe_thresh", "unsharp_clahe_thresh", "gamma12_clahe_thresh"]
+
+class _Graph:
+    """VariantGraph de mentira: cada preset es una imagen 4x4 marcada con su índice."""
+    def __init__(self):
+        self.presets = list(PRESETS)
+        self.built = []
+
+    def preset(self, name):
+        self.built.append(name)
+        return np.full((4, 4, 3), PRESETS.index(name) + 1, np.uint8)
+
+    def variants(self, order=None):
+        for name in order or self.presets:
+            yield name, self.preset(name)
+
+@pytest.fixture
+def variants(monkeypatch):
+    """Lector de mentira con confianza fija por preset; registra detecciones y reconocimientos."""
+    state = types.SimpleNamespace(conf=dict.fromkeys(PRESETS, 0.5), graphs=[], detected=0, read=[],
+                                  detected_in_pool=0, hold={}, queued=set(),
+                                  started=collections.defaultdict(threading.Event))
+    def prepare(image_bytes):
+        state.graphs.append(_Graph())
+        return state.graphs[-1], 0.0
+    def blocks(img):
+        name = PRESETS[int(img[0, 0, 0]) - 1]
+        state.read.append(name)
+        return [([[0, 0], [4, 0], [4, 4], [0, 4]], name, state.conf[name])]
+    def detect(img):
+        state.detected += 1
+        return [], []
+    def submit(name, img, boxes=None):
+        if name in state.queued:
+            return Future()  # en la cola del pool: ningún worker la tomó todavía
+        def run():
+            state.started[name].set()
+            if name in state.hold:
+                state.hold[name].wait(5)
+            return name, blocks(img) if boxes is None else ocr_run.recognize_ndarray(img, *boxes), 1.0
+        return pool.submit(run)
+    def submit_detect(img):
+        def run():
+            state.detected_in_pool += 1
+            return ([], []), 1.0
+        return pool.submit(run)
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(ocr_run, "prepare", prepare)
+    monkeypatch.setattr(ocr_run, "read_ndarray", blocks)
+    monkeypatch.setattr(ocr_run, "recognize_ndarray", lambda img, horizontal, free: blocks(img))
+    monkeypatch.setattr(ocr_run, "detect_ndarray", detect)
+    monkeypatch.setattr(ocr_run, "submit_variant", submit)
+    monkeypatch.setattr(ocr_run, "submit_detect", submit_detect)
+    monkeypatch.setattr(ocr_run, "_preset_runs", {})
+    monkeypatch.setattr(ocr_run, "_preset_wins", {})
+    yield state
+    pool.shutdown()
+
+def test_early_exit_stops_building_and_reading_variants(variants):
+    variants.conf.update(clahe_thresh=0.95, unsharp_clahe_thresh=0.99)
+    res = ocr_run.run_ocr(b"", early_exit_conf=0.9, adaptive_order=False, mode="sequential", shared_detection=False)
+    assert variants.read == ["original", "clahe_thresh"]
+    assert variants.graphs[0].built == ["original", "clahe_thresh"]  # el resto ni se construye
+    assert res["best_preset"] == "clahe_thresh"
+    assert [m["skipped"] for m in res["variant_metrics"]] == [False, False, True, True]
+
+def test_win_rate_reorders_presets(variants):
+    assert ocr_run._order_presets(PRESETS) == PRESETS
+    variants.conf["gamma12_clahe_thresh"] = 0.9
+    for _ in range(3):
+        ocr_run.run_ocr(b"", early_exit_conf=0, adaptive_order=True, mode="sequential", shared_detection=False)
+    assert ocr_run._order_presets(PRESETS)[0] == "gamma12_clahe_thresh"
+    variants.read.clear()
+    ocr_run.run_ocr(b"", early_exit_conf=0.85, adaptive_order=True, mode="sequential", shared_detection=False)
+    # el ganador habitual va primero y el early exit corta ahí
+    assert variants.read == ["gamma12_clahe_thresh"]
+
+def test_parallel_and_sequential_agree(variants):
+    variants.conf.update(clahe_thresh=0.7, unsharp_clahe_thresh=0.8)
+    kw = dict(early_exit_conf=0, adaptive_order=False, shared_detection=True)
+    seq = ocr_run.run_ocr(b"", mode="sequential", **kw)
+    par = ocr_run.run_ocr(b"", mode="parallel", **kw)
+    for key in ("best_preset", "confidence_mean", "blocks", "full_text", "rotation_deg"):
+        assert seq[key] == par[key]
+    assert seq["best_preset"] == "unsharp_clahe_thresh"
+    assert (seq["exec_mode"], par["exec_mode"]) == ("sequential", "parallel")
+
+def test_shared_detection_runs_once_per_image(variants):
+    for mode in ("sequential", "parallel"):
+        variants.detected = variants.detected_in_pool = 0
+        variants.read.clear()
+        ocr_run.run_ocr(b"", early_exit_conf=0, adaptive_order=False, mode=mode, shared_detection=True)
+        assert variants.detected + variants.detected_in_pool == 1
+        assert sorted(variants.read) == sorted(PRESETS)  # solo reconocimiento por variante
+    variants.detected = 0
+    ocr_run.run_ocr(b"", early_exit_conf=0, adaptive_order=False, mode="sequential", shared_detection=False)
+    assert variants.detected == 0
+
+def test_parallel_detects_in_the_pool(variants):
+    # el proceso principal no debe cargar un Reader propio solo para detectar
+    res = ocr_run.run_ocr(b"", early_exit_conf=0, adaptive_order=False, mode="parallel", shared_detection=True)
+    assert (variants.detected, variants.detected_in_pool) == (0, 1)
+    assert res["detect_ms"] == 1.0
+
+def test_parallel_early_exit_reports_started_variants_as_abandoned(variants):
+    variants.conf["original"] = 0.95
+    variants.hold["clahe_thresh"] = gate = threading.Event()
+    variants.queued.update(PRESETS[2:])
+    variants.hold["original"] = variants.started["clahe_thresh"]  # el early exit llega con ella ya en un worker
+    try:
+        res = ocr_run.run_ocr(b"", early_exit_conf=0.9, adaptive_order=False, mode="parallel", shared_detection=False)
+    finally:
+        gate.set()
+    metrics = {m["preset"]: m for m in res["variant_metrics"]}
+    assert res["best_preset"] == "original"
+    assert metrics["original"]["status"] == "ran"
+    # ya estaba en un worker: no se canceló, sigue corriendo y no cuenta como skipped
+    assert metrics["clahe_thresh"]["status"] == "abandoned" and metrics["clahe_thresh"]["skipped"] is False
+    # las dos que esperaban en la cola sí se cancelaron
+    assert [metrics[p]["status"] for p in PRESETS[2:]] == ["skipped", "skipped"]
+    assert all(metrics[p]["skipped"] for p in PRESETS[2:])
+
+@pytest.fixture
+def roi(monkeypatch):
+    """Lector y parser de mentira: cada recorte se lee como '<ancho>x<alto>'."""
+    crops = []
+    def read(img):
+        h, w = img.shape[:2]
+        crops.append((w, h))
+        return [([[0, 0], [w, 0], [w, h], [0, h]], f"{w}x{h}", 0.9)]
+    monkeypatch.setattr(ocr_run, "read_ndarray", read)
+    monkeypatch.setattr(ocr_run, "parse_ticket_fields", lambda texts: dict(texts))
+    monkeypatch.setattr(ocr_run, "format_ticket_fields", lambda parsed: {k: parsed.get(k) for k in FIELD_CLASSES})
+    monkeypatch.setattr(ocr_run.settings, "roi_pad_px", 0)
+    return crops
+
+def test_roi_reads_only_the_best_box_per_label(roi, monkeypatch):
+    regions = [_region(k, (10 * i, 0, 10 * i + 20 + i, 30), 0.8) for i, k in enumerate(FIELD_CLASSES)]
+    regions.append(_region("placa", (0, 100, 100, 150), 0.3))  # otra placa, menos confiable
+    detector = _StubDetector(regions)
+    monkeypatch.setattr(ocr_run, "_field_detector", lambda model_path=None: detector)
+    monkeypatch.setattr(ocr_run, "run_ocr", lambda b: pytest.fail("no debe correr la página completa"))
+
+    res = ocr_run.run_ocr_roi(_page_bytes())
+    assert detector.calls == 1
+    assert len(roi) == len(FIELD_CLASSES)
+    assert res["fields"]["placa"] == "21x30"
+    assert res["roi_missing"] == [] and res["roi_fallback"] is False
+    # cajas del recorte llevadas a coordenadas de la página
+    placa = next(b for b in res["blocks"] if b["field"] == "placa")
+    assert placa["bbox"][0] == [10.0, 0.0]
+
+def test_roi_fallback_fills_only_missing_fields(roi, monkeypatch):
+    regions = [_region("ticket_num", (0, 0, 40, 20), 0.9), _region("placa", (50, 0, 80, 20), 0.9)]
+    monkeypatch.setattr(ocr_run, "_field_detector", lambda model_path=None: _StubDetector(regions))
+    page = {k: f"pagina-{k}" for k in FIELD_CLASSES}
+    monkeypatch.setattr(ocr_run, "run_ocr", lambda b: {"full_text": "texto", "blocks": [], "exec_mode": "sequential"})
+    monkeypatch.setattr(ocr_run, "extract_ticket_fields", lambda text: page)
+
+    res = ocr_run.run_ocr_roi(_page_bytes())
+    assert res["roi_fallback"] is True
+    assert res["roi_missing"] == ["peso_neto", "ingreso_fecha_hora", "salida_fecha_hora"]
+    assert res["fields"]["ticket_num"] == "40x20" and res["fields"]["placa"] == "30x20"
+    assert res["fields"]["peso_neto"] == "pagina-peso_neto"
+    assert res["full_text"] == "texto" and res["exec_mode"] == "roi"
+
+def test_roi_reuses_batch_regions(roi, monkeypatch):
+    monkeypatch.setattr(ocr_run, "_field_detector", lambda model_path=None: pytest.fail("ya detectado"))
+    regions = [_region(k, (0, 0, 10, 10), 0.9) for k in FIELD_CLASSES]
+    res = ocr_run.run_ocr_roi(_page_bytes(), fallback=False, regions=regions)
+    assert res["detect_ms"] is None and len(roi) == len(FIELD_CLASSES)
+
+def test_shared_detector_predicts_one_call_at_a_time():
+    active = []
+    overlap = []
+    class Model:
+        def predict(self, image, **kw):
+            active.append(1)
+            overlap.append(len(active))
+            time.sleep(0.01)
+            active.pop()
+            return []
+    det = YOLODetector.__new__(YOLODetector)
+    det.model, det.imgsz, det.names, det._lock = Model(), 640, {}, threading.Lock()
+    threads = [threading.Thread(target=det.detect_regions, args=(None,)) for _ in range(4)]
+    threads += [threading.Thread(target=det.detect_regions_batch, args=([None, None],)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert overlap and max(overlap) == 1
+
+def test_missing_weights_fail_clearly(tmp_path):
+    with pytest.raises(FileNotFoundError, match="YOLO_MODEL_PATH"):
+        get_detector(str(tmp_path / "best.pt"))
+
+def test_yolo_onnx_export_lands_atomically(tmp_path, monkeypatch):
+    class YOLO:
+        fail = False
+        def __init__(self, weights):
+            self.weights = Path(weights)
+        def export(self, **kw):
+            # como ultralytics: escribe el .onnx junto a los pesos recibidos
+            out = self.weights.with_suffix(".onnx")
+            out.write_bytes(b"onnx a medias")
+            if YOLO.fail:
+                raise RuntimeError("export interrumpido")
+            out.write_bytes(b"onnx")
+            return str(out)
+    monkeypatch.setitem(sys.modules, "ultralytics", types.SimpleNamespace(YOLO=YOLO))
+    weights = tmp_path / "best.pt"
+    weights.write_bytes(b"pt")
+
+    YOLO.fail = True
+    with pytest.raises(RuntimeError):
+        export_onnx(str(weights))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["best.pt"]
+
+    YOLO.fail = False
+    assert export_onnx(str(weights)) == str(tmp_path / "best.onnx")
+    assert (tmp_path / "best.onnx").read_bytes() == b"onnx"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["best.onnx", "best.pt"]
@@ -43,3 +43,18 @@ def test_parse_with_variations_and_noise():
     assert normalize_weight_kg_text(parsed["peso_neto"]) == "35600.00 Kg"
     assert to_iso_lima(parsed["ingreso_fecha"]) is not None
     assert to_iso_lima(parsed["salida_fecha"]) is not None
+
+def test_parse_ticket_fields_from_crops():
+    from app.services.parse_ticket import parse_ticket_fields
+    parsed = parse_ticket_fields({
+        "ticket_num": "N° R: 6582 5533",
+        "placa": "bts 726",
+        "peso_neto": "45,200.00 Kg",
+        "ingreso_fecha_hora": "SÁB,23AGO2025\n12:50 p. m.",
+    })
+    assert parsed["ticket_num"] == "65825533"
+    assert parsed["placa"] == "BTS-726"
+    assert parsed["peso_neto"] == "45200 Kg"
+    assert parsed["ingreso_fecha"].endswith("23AGO2025")
+    assert parsed["ingreso_hora"] == "12:50 p.m"
+    assert parsed["salida_fecha"] is None and parsed["salida_hora"] is None
@@ -0,0 +1,26 @@
+import numpy as np
+from app.services import preprocess
+from app.services.preprocess import VariantGraph, PRESETS
+
+def _base():
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 255, size=(120, 160, 3), dtype=np.uint8)
+
+def test_variants_are_lazy_and_release_intermediates():
+    graph = VariantGraph(_base())
+    gen = graph.variants(["clahe_thresh", "unsharp_clahe_thresh", "original"])
+    name, _ = next(gen)
+    assert name == "clahe_thresh"
+    # clahe sigue en caché porque unsharp_clahe_thresh lo necesita; la rama gamma ni se tocó
+    assert "clahe" in graph._cache
+    assert not any(k.startswith("gamma12") for k in graph._cache)
+    next(gen)
+    assert "clahe" not in graph._cache and "gray" not in graph._cache
+
+def test_graph_matches_each_preset_pipeline():
+    base = _base()
+    out = dict(VariantGraph(base).variants())
+    assert list(out) == list(PRESETS)
+    g = preprocess.to_gray(base)
+    expected = preprocess.adaptive_thresh(preprocess.unsharp_gray(preprocess.clahe_gray(g)))
+    assert np.array_equal(out["unsharp_clahe_thresh"], expected)
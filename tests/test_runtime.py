@@ -0,0 +1,95 @@
+from app.config import settings
+from app.services import runtime
+
+def test_thread_budget_splits_cores_between_workers(monkeypatch):
+    monkeypatch.setattr(runtime.os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(settings, "torch_intra_threads", 0)
+    monkeypatch.setattr(settings, "torch_interop_threads", 1)
+    monkeypatch.setattr(settings, "cv2_threads", 0)
+    assert runtime.thread_budget(4) == {"intra": 2, "interop": 1, "cv2": 2}
+    assert runtime.thread_budget(16)["intra"] == 1
+
+def test_thread_budget_explicit_settings_win(monkeypatch):
+    monkeypatch.setattr(runtime.os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(settings, "torch_intra_threads", 3)
+    monkeypatch.setattr(settings, "torch_interop_threads", 2)
+    monkeypatch.setattr(settings, "cv2_threads", 1)
+    assert runtime.thread_budget(2) == {"intra": 3, "interop": 2, "cv2": 1}
+    assert runtime.thread_env(runtime.thread_budget(2))["OMP_NUM_THREADS"] == "3"
+
+def test_configure_threads_sets_torch_only_when_used(monkeypatch):
+    import sys, types
+    calls = []
+    torch = types.SimpleNamespace(set_num_threads=lambda n: calls.append(("intra", n)),
+                                  set_interop_threads=lambda n: calls.append(("interop", n)))
+    monkeypatch.setattr(settings, "torch_intra_threads", 3)
+    monkeypatch.setattr(settings, "torch_interop_threads", 2)
+    monkeypatch.setattr(settings, "warmup_yolo", False)
+    monkeypatch.setattr(runtime.os, "environ", dict(runtime.os.environ))  # OMP_NUM_THREADS y compañía
+    for backend, loaded, expected in (("onnx", False, []), ("torch", True, [("intra", 3), ("interop", 2)]),
+                                      ("onnx-int8", True, [("intra", 3), ("interop", 2)])):
+        calls.clear()
+        monkeypatch.setattr(runtime, "_applied", None)
+        monkeypatch.setattr(settings, "ocr_backend", backend)
+        if loaded:
+            monkeypatch.setitem(sys.modules, "torch", torch)
+        else:
+            monkeypatch.delitem(sys.modules, "torch", raising=False)
+        runtime.configure_threads()
+        assert calls == expected, backend
+
+class _Param:
+    def __init__(self):
+        self.requires_grad = True
+
+    def requires_grad_(self, flag):
+        self.requires_grad = flag
+
+class _Module:
+    """Lo que usa _freeze_module de un torch.nn.Module."""
+    def __init__(self):
+        self.training = True
+        self.params = [_Param(), _Param()]
+
+    def eval(self):
+        self.training = False
+        return self
+
+    def parameters(self):
+        return iter(self.params)
+
+def _frozen(net):
+    return not net.training and not any(p.requires_grad for p in net.params)
+
+def test_preload_models_freezes_reader_and_yolo(monkeypatch):
+    import gc, sys, types
+    from app.services import ocr_reader, ocr_run
+
+    threads = []
+    monkeypatch.setitem(sys.modules, "torch", types.SimpleNamespace(set_num_threads=threads.append))
+    reader = types.SimpleNamespace(detector=_Module(), recognizer=_Module())
+    monkeypatch.setattr(ocr_reader, "get_reader", lambda: reader)
+    fused = []
+    yolo = types.SimpleNamespace(model=types.SimpleNamespace(fuse=lambda: fused.append(1), model=_Module()))
+    monkeypatch.setattr(ocr_run, "_field_detector", lambda model_path=None: yolo)
+    monkeypatch.setattr(settings, "ocr_backend", "torch")
+    monkeypatch.setattr(settings, "warmup_yolo", True)
+    monkeypatch.setattr(settings, "yolo_backend", "torch")
+    try:
+        assert runtime.preload_models() == ["reader", "yolo"]
+    finally:
+        gc.unfreeze()
+    assert threads == [1]  # sin pool OpenMP antes del fork
+    assert _frozen(reader.detector) and _frozen(reader.recognizer) and _frozen(yolo.model.model)
+    assert fused == [1]
+
+def test_init_db_runs_once_per_process(monkeypatch):
+    # el padre de serve.py --preload la corre antes del fork; los workers heredan el flag
+    from app import database, migrations
+    calls = []
+    monkeypatch.setattr(database, "_initialized", False)
+    monkeypatch.setattr(database.Base.metadata, "create_all", lambda **kw: calls.append("create_all"))
+    monkeypatch.setattr(migrations, "run_migrations", lambda engine: calls.append("migrations"))
+    database.init_db()
+    database.init_db()
+    assert calls == ["create_all", "migrations"]
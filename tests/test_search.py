@@ -0,0 +1,72 @@
+from sqlalchemy import create_engine, delete, text, update
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.migrations import ensure_fulltext_index
+from app import crud, models
+
+def _session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    ensure_fulltext_index(engine)
+    return sessionmaker(bind=engine)()
+
+def _add(db, text):
+    return crud.insert_document(
+        db, filename="t.jpg", content_type="image/jpeg", size_bytes=1, storage_path=None, full_text=text, blocks=[]
+    )
+
+def test_search_matches_fragments_and_paginates():
+    db = _session()
+    a = _add(db, "TRANSPORTES ANDINOS SAC\nPLACA: ABX-123")
+    b = _add(db, "Transportes del Sur\nPLACA: QWE-987")
+    _add(db, "BALANZA INDUSTRIAL")
+
+    hits = crud.search_documents(db, "ABX-1")
+    assert [h["id"] for h in hits] == [a]
+    assert "[ABX-1]" in hits[0]["snippet"]
+
+    page = crud.search_documents(db, "transportes", limit=1)
+    assert len(page) == 2  # limit+1: hay otra página
+    rest = crud.search_documents(db, "transportes", limit=1, offset=1)
+    assert {page[0]["id"], rest[0]["id"]} == {a, b}
+
+    # las comillas del usuario no rompen la sintaxis FTS5
+    assert crud.search_documents(db, 'SAC"') == []
+
+def _fts_ids(db, q):
+    return [h["id"] for h in crud.search_documents(db, q)]
+
+def test_index_follows_updates_and_deletes():
+    db = _session()
+    a = _add(db, "PLACA: ABX-123")
+    b = _add(db, "PLACA: QWE-987")
+    empty = _add(db, None)
+
+    db.execute(update(models.Document).where(models.Document.id == a).values(full_text="PLACA: ZZZ-555"))
+    db.commit()
+    assert _fts_ids(db, "ABX-123") == []
+    assert _fts_ids(db, "ZZZ-555") == [a]
+
+    db.execute(update(models.Document).where(models.Document.id == empty).values(full_text="BALANZA NORTE"))
+    db.execute(update(models.Document).where(models.Document.id == b).values(full_text=None))
+    db.commit()
+    assert _fts_ids(db, "BALANZA") == [empty]
+    assert _fts_ids(db, "QWE-987") == []
+
+    db.execute(delete(models.Document).where(models.Document.id.in_([a, b])))
+    db.commit()
+    assert _fts_ids(db, "ZZZ-555") == []
+    # el índice quedó igual que uno reconstruido desde documents
+    db.execute(text("INSERT INTO documents_fts(documents_fts) VALUES ('integrity-check')"))
+
+def test_triggers_are_added_to_an_existing_index():
+    db = _session()
+    engine = db.get_bind()
+    with engine.begin() as conn:
+        conn.execute(text("DROP TRIGGER documents_fts_ad"))
+        conn.execute(text("DROP TRIGGER documents_fts_au"))
+    assert ensure_fulltext_index(engine) is False  # la tabla ya existía
+    a = _add(db, "PLACA: ABX-123")
+    db.execute(delete(models.Document).where(models.Document.id == a))
+    db.commit()
+    assert _fts_ids(db, "ABX-123") == []
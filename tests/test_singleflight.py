@@ -0,0 +1,32 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app.utils.singleflight import SingleFlight
+
+def test_concurrent_calls_share_one_computation():
+    sf = SingleFlight()
+    calls = []
+    gate = threading.Event()
+
+    def compute():
+        calls.append(1)
+        gate.wait(5)
+        return "resultado"
+
+    with ThreadPoolExecutor(max_workers=4) as ex:
+        futs = [ex.submit(sf.do, "k", compute) for _ in range(4)]
+        time.sleep(0.1)
+        gate.set()
+        out = [f.result(timeout=5) for f in futs]
+
+    assert len(calls) == 1
+    assert [r for r, _ in out] == ["resultado"] * 4
+    assert sorted(shared for _, shared in out) == [False, True, True, True]
+    assert sf.in_flight() == 0
+
+def test_errors_propagate_and_key_is_released():
+    sf = SingleFlight()
+    with pytest.raises(ValueError):
+        sf.do("k", lambda: (_ for _ in ()).throw(ValueError("x")))
+    assert sf.do("k", lambda: 1) == (1, False)
@@ -0,0 +1,16 @@
+import pytest
+from app.utils.storage import atomic_path
+
+def test_atomic_path_replaces_only_on_success(tmp_path):
+    dst = tmp_path / "model.onnx"
+    dst.write_bytes(b"viejo")
+    with pytest.raises(RuntimeError):
+        with atomic_path(dst) as tmp:
+            tmp.write_bytes(b"a medias")
+            raise RuntimeError("export interrumpido")
+    assert dst.read_bytes() == b"viejo"
+    with atomic_path(dst) as tmp:
+        assert tmp.parent == dst.parent and tmp != dst
+        tmp.write_bytes(b"nuevo")
+    assert dst.read_bytes() == b"nuevo"
+    assert [p.name for p in tmp_path.iterdir()] == ["model.onnx"]
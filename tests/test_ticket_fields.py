@@ -0,0 +1,53 @@
+from datetime import datetime
+from app.services.ticket_fields import ticket_columns, normalize_placa, TICKET_FIELDS_VERSION
+
+def test_ticket_columns_are_typed():
+    cols = ticket_columns({
+        "ticket_num": "65830559",
+        "placa": "bzu 890",
+        "peso_neto": "41510",
+        "ingreso_fecha_hora": "23-08-2025 18:53:00",
+        "salida_fecha_hora": None,
+    })
+    assert cols == {
+        "ticket_num": "65830559",
+        "placa": "BZU-890",
+        "peso_neto_kg": 41510,
+        "ingreso_at": datetime(2025, 8, 23, 18, 53),
+        "salida_at": None,
+        "fields_version": TICKET_FIELDS_VERSION,
+    }
+
+def test_normalize_placa_matches_stored_form():
+    assert normalize_placa("BZU890") == normalize_placa("bzu-890") == "BZU-890"
+    assert normalize_placa(" - ") is None
+
+def test_implausible_peso_is_stored_as_null():
+    assert ticket_columns({"peso_neto": "41510"})["peso_neto_kg"] == 41510
+    # dígitos de otras líneas pegados por el OCR: no caben en BIGINT
+    for peso in ("0", "4151065830559230820251853", "99999999999"):
+        assert ticket_columns({"peso_neto": peso})["peso_neto_kg"] is None
+
+def test_backfill_skips_implausible_peso(monkeypatch):
+    from sqlalchemy import create_engine, text
+    from app import models  # registra las tablas en Base
+    from app.database import Base
+    from app.migrations import migrate_ticket_fields
+    from app.services import ticket_fields
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        # documento anterior a las columnas de campos (fields_version NULL)
+        doc_id = conn.execute(text(
+            "INSERT INTO documents (filename, content_type, size_bytes, status, full_text) "
+            "VALUES ('t.jpg', 'image/jpeg', 0, 'processed', 'PESO NETO ...')"
+        )).lastrowid
+    monkeypatch.setattr(ticket_fields, "extract_ticket_fields",
+                        lambda full_text: {"peso_neto": "4151065830559230820251853", "placa": "BZU890"})
+
+    assert migrate_ticket_fields(engine) == 1
+    with engine.connect() as conn:
+        row = conn.execute(text("SELECT peso_neto_kg, placa, fields_version FROM documents WHERE id = :id"),
+                           {"id": doc_id}).one()
+    assert tuple(row) == (None, "BZU-890", TICKET_FIELDS_VERSION)
@@ -0,0 +1,27 @@
+import threading
+from app.services import warmup
+
+def _fresh(monkeypatch, fn):
+    monkeypatch.setattr(warmup, "_thread", None)
+    monkeypatch.setattr(warmup, "_state", {"ready": False, "error": None, "steps_ms": {}, "started_at": None, "finished_at": None})
+    monkeypatch.setattr(warmup.settings, "warmup_enabled", True)
+    monkeypatch.setattr(warmup, "run_warmup", fn)
+
+def test_ready_only_after_warmup_finishes(monkeypatch):
+    gate = threading.Event()
+    _fresh(monkeypatch, gate.wait)
+    warmup.start_warmup()
+    assert warmup.warmup_status()["ready"] is False
+    gate.set()
+    warmup._thread.join(5)
+    status = warmup.warmup_status()
+    assert status["ready"] is True and status["error"] is None and status["finished_at"] is not None
+
+def test_failed_warmup_stays_not_ready(monkeypatch):
+    def boom():
+        raise RuntimeError("sin pesos")
+    _fresh(monkeypatch, boom)
+    warmup.start_warmup()
+    warmup._thread.join(5)
+    status = warmup.warmup_status()
+    assert status["ready"] is False and status["error"] == "sin pesos"
@@ -0,0 +1,43 @@
+import threading
+import pytest
+from app.utils.workqueue import BoundedExecutor, QueueFullError
+
+def test_rejects_when_queue_is_full():
+    ex = BoundedExecutor(max_workers=1, max_queue=1)
+    gate = threading.Event()
+    running = ex.submit(gate.wait)
+    queued = ex.submit(lambda: "ok")
+    with pytest.raises(QueueFullError):
+        ex.submit(lambda: "no")
+    stats = ex.stats()
+    assert stats["queued"] + stats["in_flight"] == 2
+    gate.set()
+    running.result(timeout=5)
+    assert queued.result(timeout=5) == "ok"
+    assert ex.stats() == {"in_flight": 0, "queued": 0, "max_workers": 1, "max_queue": 1}
+    ex.shutdown()
+
+def test_errors_release_the_slot():
+    ex = BoundedExecutor(max_workers=1, max_queue=0)
+    fut = ex.submit(lambda: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        fut.result(timeout=5)
+    assert ex.submit(lambda: 2).result(timeout=5) == 2
+    ex.shutdown()
+
+def test_cancelled_queued_futures_release_their_slot():
+    ex = BoundedExecutor(max_workers=1, max_queue=2)
+    gate = threading.Event()
+    try:
+        running = ex.submit(gate.wait)
+        queued = [ex.submit(lambda: "x") for _ in range(2)]
+        assert all(f.cancel() for f in queued)
+        assert ex.stats()["queued"] == 0
+        # los cupos liberados se pueden volver a usar
+        again = [ex.submit(lambda: "ok") for _ in range(2)]
+    finally:
+        gate.set()
+    running.result(timeout=5)
+    assert [f.result(timeout=5) for f in again] == ["ok", "ok"]
+    assert ex.stats() == {"in_flight": 0, "queued": 0, "max_workers": 1, "max_queue": 2}
+    ex.shutdown()